@@ -0,0 +1,540 @@
+#!/usr/bin/env python
+"""
+Binary model artifact, opened through a read-only memory map
+
+model.pkl carries the spelling index as dicts of strings and pickled
+class instances, so every process that loads it pays the
+deserialization and keeps a private copy. model.bin stores the same
+model as flat NumPy arrays plus packed string tables:
+
+    magic (8 bytes) | format version, header length (uint32) | JSON header
+    | arrays, each aligned to 64 bytes
+
+Loading only parses the header and wraps the arrays with np.frombuffer
+over the map, so cold-load time does not grow with the lexicon and
+processes opening the same file share its pages. The correction lexicon
+(vocab words with their frequency and tie-break rank, and the deletion
+buckets of the spelling index) is searched in place by binary search.
+
+Only the words that can be correction targets are kept (as in the
+Lexicon of model.pkl); the precomputed correction table is dropped (the
+LRU in CorrectionCache fills in for the table).
+
+    python model/artifact.py model/model.pkl
+    python model/artifact.py model/model.pkl -o model/model.bin --texts data.csv
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import random
+import struct
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from runtime import TFIDFVectorizer, MultinomialNB, SpellingIndex, Lexicon, preprocess_text
+
+MAGIC = b"HSDMODEL"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+_PREFIX = struct.Struct("<II")
+
+
+# ============================================================================
+# STRING TABLES
+# ============================================================================
+
+def pack_strings(strings):
+    """Concatenate UTF-8 encoded strings into (blob, offsets)"""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(blob, offsets):
+    """Inverse of pack_strings"""
+    data = bytes(blob)
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+class StringTable:
+    """Sorted strings packed in one buffer, looked up by binary search.
+    
+    blob can be bytes or the mmap itself (base is then the byte offset of
+    the packed strings in the file); offsets can be any int sequence.
+    """
+    def __init__(self, blob, offsets, base=0):
+        self._blob = blob
+        self._offsets = offsets
+        self._base = base
+    
+    @classmethod
+    def from_strings(cls, strings):
+        """Build an in-memory table from any iterable of strings"""
+        blob, offsets = pack_strings(sorted(set(strings)))
+        return cls(blob.tobytes(), offsets.tolist())
+    
+    def __len__(self):
+        return len(self._offsets) - 1
+    
+    def __bool__(self):
+        return len(self) > 0
+    
+    def __getitem__(self, i):
+        off, base = self._offsets, self._base
+        return self._blob[base + off[i]:base + off[i + 1]].decode("utf-8")
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+    
+    def find(self, word):
+        """Position of word, or -1"""
+        key = word.encode("utf-8")
+        blob, off, base = self._blob, self._offsets, self._base
+        lo, hi = 0, len(off) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            s = blob[base + off[mid]:base + off[mid + 1]]
+            if s < key:
+                lo = mid + 1
+            elif s > key:
+                hi = mid
+            else:
+                return mid
+        return -1
+    
+    def __contains__(self, word):
+        return self.find(word) >= 0
+
+
+class WordValues:
+    """Read-only word -> int mapping over a StringTable and a parallel array.
+    
+    Positions of words found so far are memoized, so repeated tokens skip
+    the binary search; the memo is bounded by the size of the table.
+    """
+    def __init__(self, words, values):
+        self.words = words
+        self.values = values
+        self._found = {}
+    
+    def _position(self, word):
+        i = self._found.get(word)
+        if i is None:
+            i = self.words.find(word)
+            if i >= 0:
+                self._found[word] = i
+        return i
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def __iter__(self):
+        return iter(self.words)
+    
+    def __contains__(self, word):
+        return self._position(word) >= 0
+    
+    def __getitem__(self, word):
+        i = self._position(word)
+        if i < 0:
+            raise KeyError(word)
+        return self.values[i]
+    
+    def get(self, word, default=None):
+        i = self._position(word)
+        return self.values[i] if i >= 0 else default
+    
+    def items(self):
+        for i, word in enumerate(self.words):
+            yield word, self.values[i]
+
+
+class DeletionBuckets:
+    """Read-only deletion variant -> [vocab words] mapping (SpellingIndex.deletes)"""
+    def __init__(self, keys, indptr, ids, words):
+        self.keys = keys
+        self.indptr = indptr
+        self.ids = ids
+        self.words = words
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def get(self, key, default=None):
+        k = self.keys.find(key)
+        if k < 0:
+            return default
+        words = self.words
+        return [words[i] for i in self.ids[self.indptr[k]:self.indptr[k + 1]]]
+    
+    def union(self, keys):
+        """Set of the words registered under any of keys"""
+        found = set()
+        for key in keys:
+            bucket = self.get(key)
+            if bucket:
+                found.update(bucket)
+        return found
+
+
+# ============================================================================
+# WRITE
+# ============================================================================
+
+def _lexicon_arrays(index):
+    """Flatten a SpellingIndex into sorted words, freq, rank and deletion buckets"""
+    words = sorted(index.rank)
+    word_id = {w: i for i, w in enumerate(words)}
+    freq = np.array([index.freq[w] for w in words], dtype=np.int64)
+    rank = np.array([index.rank[w] for w in words], dtype=np.int64)
+    
+    keys = sorted(index.deletes)
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum([len(index.deletes[k]) for k in keys], out=indptr[1:])
+    ids = np.array([word_id[w] for k in keys for w in index.deletes[k]], dtype=np.int32)
+    
+    words_blob, words_offsets = pack_strings(words)
+    keys_blob, keys_offsets = pack_strings(keys)
+    return {
+        'lexicon.words': words_blob,
+        'lexicon.words.offsets': words_offsets,
+        'lexicon.freq': freq,
+        'lexicon.rank': rank,
+        'lexicon.deletes': keys_blob,
+        'lexicon.deletes.offsets': keys_offsets,
+        'lexicon.deletes.indptr': indptr,
+        'lexicon.deletes.ids': ids
+    }
+
+
+def save_artifact(model_data, path):
+    """Write model_data (as returned by load_model) as a binary artifact, atomically"""
+    model = model_data['model']
+    vectorizer = model_data['vectorizer']
+    index = model_data.get('spelling_index')
+    if index is None and model_data.get('vocab') and model_data.get('word_freq'):
+        index = SpellingIndex(max_dist=2).build(model_data['vocab'], model_data['word_freq'])
+    
+    terms_blob, terms_offsets = pack_strings(vectorizer.feature_names)
+    arrays = {
+        'nb.classes': model.classes_,
+        'nb.class_count': model.class_count_,
+        'nb.class_log_prior': model.class_log_prior_,
+        'nb.feature_count': model.feature_count_,
+        'nb.feature_prob': model.feature_prob_,
+        'nb.feature_log_prob': model.feature_log_prob_,
+        'tfidf.idf': vectorizer.idf,
+        'tfidf.df': vectorizer.document_frequencies(),
+        'tfidf.terms': terms_blob,
+        'tfidf.terms.offsets': terms_offsets
+    }
+    if index is not None:
+        arrays.update(_lexicon_arrays(index))
+    
+    meta = {
+        'alpha': model.alpha,
+        'n_features': int(model.n_features_),
+        'max_features': vectorizer.max_features,
+        'n_docs': int(vectorizer.n_docs),
+        'max_dist': index.max_dist if index is not None else None,
+        'map_target': model_data['map_target'],
+        'reverse': [[int(k), v] for k, v in model_data['reverse'].items()]
+    }
+    for key in ('version', 'parent_version', 'created_at', 'update_samples'):
+        if key in model_data:
+            meta[key] = model_data[key]
+    
+    # Lay out arrays after the header, each on an ALIGN boundary
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    table = {}
+    header = b""
+    data_start = 0
+    while len(MAGIC) + _PREFIX.size + len(header) > data_start:
+        # The header lists the offsets, so its length can move them; repeat until it fits
+        data_start = -(-(len(MAGIC) + _PREFIX.size + len(header)) // ALIGN) * ALIGN
+        offset = data_start
+        for name, a in arrays.items():
+            table[name] = {'dtype': a.dtype.str, 'shape': list(a.shape), 'offset': offset}
+            offset = -(-(offset + a.nbytes) // ALIGN) * ALIGN
+        header = json.dumps({'meta': meta, 'arrays': table}, ensure_ascii=False).encode("utf-8")
+    header += b" " * (data_start - len(MAGIC) - _PREFIX.size - len(header))
+    
+    path = Path(path)
+    temp = path.with_name(path.name + ".tmp")
+    with open(temp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_PREFIX.pack(FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, a in arrays.items():
+            f.write(b"\0" * (table[name]['offset'] - f.tell()))
+            f.write(a.tobytes())
+    temp.replace(path)
+    return path
+
+
+# ============================================================================
+# LOAD
+# ============================================================================
+
+def is_artifact(path):
+    """True if path starts with the binary artifact magic"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class MappedArtifact:
+    """Read-only memory map of a binary artifact.
+    
+    Components built on the map pickle as (path, name) and are reopened on
+    the other side, so a process pool never copies the lexicon.
+    """
+    _opened = {}
+    
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a binary model artifact")
+        version, header_len = _PREFIX.unpack_from(self._map, len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact format {version}, expected {FORMAT_VERSION}")
+        start = len(MAGIC) + _PREFIX.size
+        header = json.loads(self._map[start:start + header_len].decode("utf-8"))
+        self.meta = header['meta']
+        self._table = header['arrays']
+        self._components = {}
+    
+    @classmethod
+    def open(cls, path):
+        """One map per file per process; a file replaced on disk gets a new map"""
+        path = str(Path(path).resolve())
+        st = os.stat(path)
+        key = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+        mapped = cls._opened.get(key)
+        if mapped is None:
+            # Older maps of this path stay valid for whoever still holds them
+            for old in [k for k in cls._opened if k[0] == path]:
+                del cls._opened[old]
+            mapped = cls._opened[key] = cls(path)
+        return mapped
+    
+    def __reduce__(self):
+        return (MappedArtifact.open, (self.path,))
+    
+    def __contains__(self, name):
+        return name in self._table
+    
+    def array(self, name):
+        """Read-only ndarray view of one stored array"""
+        spec = self._table[name]
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        return np.frombuffer(self._map, dtype=dtype, count=count,
+                             offset=spec['offset']).reshape(spec['shape'])
+    
+    def _ints(self, name):
+        """Stored integer array as a memoryview (fast scalar indexing)"""
+        spec = self._table[name]
+        dtype = np.dtype(spec['dtype'])
+        nbytes = int(np.prod(spec['shape'], dtype=np.int64)) * dtype.itemsize
+        view = memoryview(self._map)[spec['offset']:spec['offset'] + nbytes]
+        return view.cast({'<i8': 'q', '<i4': 'i'}[dtype.str])
+    
+    def component(self, name):
+        """Shared lexicon objects: 'words', 'word_freq', 'rank', 'deletes'"""
+        obj = self._components.get(name)
+        if obj is None:
+            obj = self._build_component(name)
+            self._components[name] = obj
+        return obj
+    
+    def _build_component(self, name):
+        if name == 'words':
+            obj = _MappedStrings(self._map, self._ints('lexicon.words.offsets'),
+                                 self._table['lexicon.words']['offset'])
+        elif name == 'word_freq':
+            obj = _MappedWordValues(self.component('words'), self._ints('lexicon.freq'))
+        elif name == 'rank':
+            obj = _MappedWordValues(self.component('words'), self._ints('lexicon.rank'))
+        elif name == 'deletes':
+            keys = StringTable(self._map, self._ints('lexicon.deletes.offsets'),
+                               self._table['lexicon.deletes']['offset'])
+            obj = _MappedDeletionBuckets(keys, self._ints('lexicon.deletes.indptr'),
+                                         self._ints('lexicon.deletes.ids'), self.component('words'))
+        else:
+            raise KeyError(name)
+        obj._source = (self, name)
+        return obj
+
+
+def _reopen(source):
+    mapped, name = source
+    return mapped.component(name)
+
+
+class _MappedComponent:
+    """Pickle by reference to the artifact file"""
+    _source = None
+    
+    def __reduce__(self):
+        return (_reopen, (self._source,))
+
+
+class _MappedStrings(_MappedComponent, StringTable):
+    pass
+
+
+class _MappedWordValues(_MappedComponent, WordValues):
+    pass
+
+
+class _MappedDeletionBuckets(_MappedComponent, DeletionBuckets):
+    pass
+
+
+def load_artifact(path):
+    """Open a binary artifact as a model_data dict (same keys as model.pkl)"""
+    mapped = MappedArtifact.open(path)
+    meta = mapped.meta
+    
+    model = MultinomialNB(alpha=meta['alpha'])
+    model.classes_ = mapped.array('nb.classes')
+    model.class_count_ = mapped.array('nb.class_count')
+    model.class_log_prior_ = mapped.array('nb.class_log_prior')
+    model.feature_count_ = mapped.array('nb.feature_count')
+    model.feature_prob_ = mapped.array('nb.feature_prob')
+    model.feature_log_prob_ = mapped.array('nb.feature_log_prob')
+    model.n_features_ = meta['n_features']
+    
+    vectorizer = TFIDFVectorizer(max_features=meta['max_features'])
+    terms = unpack_strings(mapped.array('tfidf.terms'), mapped.array('tfidf.terms.offsets'))
+    vectorizer.vocab = Lexicon.build(terms, {term: idx for idx, term in enumerate(terms)})
+    vectorizer.feature_names = terms
+    vectorizer.n_features = len(terms)
+    vectorizer.n_docs = meta['n_docs']
+    vectorizer.df = mapped.array('tfidf.df')
+    vectorizer.idf = mapped.array('tfidf.idf')
+    
+    data = {
+        'model': model,
+        'vectorizer': vectorizer,
+        'vocab': None,
+        'word_freq': None,
+        'spelling_index': None,
+        'correction_table': None,
+        'map_target': meta['map_target'],
+        'reverse': {k: v for k, v in meta['reverse']}
+    }
+    for key in ('version', 'parent_version', 'created_at', 'update_samples'):
+        if key in meta:
+            data[key] = meta[key]
+    
+    if 'lexicon.words' in mapped:
+        index = SpellingIndex(max_dist=meta['max_dist'])
+        index.deletes = mapped.component('deletes')
+        index.freq = mapped.component('word_freq')
+        index.rank = mapped.component('rank')
+        data['vocab'] = mapped.component('words')
+        data['word_freq'] = index.freq
+        data['spelling_index'] = index
+    
+    return data
+
+
+# ============================================================================
+# CONVERT
+# ============================================================================
+
+def sample_texts(model_data, n_texts=2000, seed=42):
+    """Texts drawn from the model's own lexicon, with typos and noise"""
+    rng = random.Random(seed)
+    words = sorted(model_data['vocab'] or []) + list(model_data['vectorizer'].feature_names)
+    if not words:
+        words = ["kosong"]
+    noise = ["@user", "#tag", "https://t.co/x", "123", "!!", "yg", "gak", "😂"]
+    texts = []
+    for _ in range(n_texts):
+        tokens = []
+        for _ in range(rng.randint(1, 25)):
+            w = rng.choice(words) if rng.random() < 0.9 else rng.choice(noise)
+            if len(w) > 3 and rng.random() < 0.15:
+                i = rng.randrange(len(w))
+                w = w[:i] + rng.choice("aeiouknrst") + w[i + 1:]
+            tokens.append(w)
+        texts.append(" ".join(tokens))
+    return texts
+
+
+def compare_predictions(model_a, model_b, texts):
+    """Preprocessed tokens, labels and probabilities must match exactly"""
+    def run(model_data):
+        index = model_data['spelling_index']
+        docs = [preprocess_text(t, model_data['vocab'], model_data['word_freq'], index=index)
+                for t in texts]
+        X = model_data['vectorizer'].transform(docs, sparse=True)
+        preds, proba = model_data['model'].predict_with_proba(X)
+        return docs, preds, proba
+    
+    docs_a, preds_a, proba_a = run(model_a)
+    docs_b, preds_b, proba_b = run(model_b)
+    return {
+        'n_texts': len(texts),
+        'tokens_equal': docs_a == docs_b,
+        'labels_equal': bool(np.array_equal(preds_a, preds_b)),
+        'proba_equal': bool(np.array_equal(proba_a, proba_b))
+    }
+
+
+def main():
+    from predict import load_model
+    
+    parser = argparse.ArgumentParser(description="Convert model.pkl to the binary artifact format")
+    parser.add_argument("model", nargs="?", default="model/model.pkl")
+    parser.add_argument("-o", "--output", help="output path (default: model.bin next to the input)")
+    parser.add_argument("--texts", help="usn;text;class CSV used for the parity check "
+                                        "(default: texts sampled from the lexicon)")
+    args = parser.parse_args()
+    
+    output = Path(args.output) if args.output else Path(args.model).with_suffix(".bin")
+    
+    start = time.perf_counter()
+    source = load_model(args.model)
+    t_pickle = time.perf_counter() - start
+    save_artifact(source, output)
+    print(f"✓ {output} saved ({output.stat().st_size / 1024:.1f} KB, "
+          f"{args.model} is {Path(args.model).stat().st_size / 1024:.1f} KB)")
+    
+    start = time.perf_counter()
+    converted = load_model(str(output))
+    t_binary = time.perf_counter() - start
+    print(f"  load: pickle {t_pickle * 1000:.1f} ms, binary {t_binary * 1000:.1f} ms")
+    
+    if args.texts:
+        import pandas as pd
+        texts = pd.read_csv(args.texts, sep=";", header=None, dtype=str)[1].dropna().tolist()
+    else:
+        texts = sample_texts(source)
+    
+    report = compare_predictions(source, converted, texts)
+    ok = report['tokens_equal'] and report['labels_equal'] and report['proba_equal']
+    print(f"{'✓' if ok else '✗'} parity on {report['n_texts']} texts: tokens {report['tokens_equal']}, "
+          f"labels {report['labels_equal']}, probabilities {report['proba_equal']}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Cold-load benchmark: model.pkl vs the memory-mapped model.bin
+
+Each load runs in a fresh interpreter after the imports, so the numbers
+cover load_model alone: its time and the resident memory it adds, plus
+the first prediction. Converts model.pkl first if model.bin is missing.
+
+    python model/benchmarks/bench_artifact.py
+    python model/benchmarks/bench_artifact.py --model model/model.pkl --runs 10
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+MODEL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(MODEL_DIR))
+
+from artifact import save_artifact
+from predict import load_model
+
+PROBE = """
+import sys, time, json, resource
+sys.path.insert(0, {model_dir!r})
+from predict import load_model, predict_text
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+data = load_model({path!r})
+load = time.perf_counter() - start
+start = time.perf_counter()
+predict_text("dasar kalian semua bodoh", data)
+first = time.perf_counter() - start
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'load': load, 'first': first, 'rss_kb': after - before}}))
+"""
+
+
+def probe(path, runs):
+    """Best load/first-prediction time and median RSS growth over fresh processes"""
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(model_dir=str(MODEL_DIR), path=str(path))],
+                             capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    rss = sorted(r['rss_kb'] for r in results)
+    return (min(r['load'] for r in results), min(r['first'] for r in results), rss[len(rss) // 2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=str(MODEL_DIR / "model.pkl"))
+    parser.add_argument("--binary", help="binary artifact (default: model.bin next to --model)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    
+    binary = Path(args.binary) if args.binary else Path(args.model).with_suffix(".bin")
+    if not binary.exists():
+        save_artifact(load_model(args.model), binary)
+        print(f"✓ {binary} written")
+    
+    print(f"{'artifact':<40} {'size (KB)':>10} {'load (ms)':>10} {'1st pred (ms)':>14} {'RSS +KB':>8}")
+    for path in (Path(args.model), binary):
+        load, first, rss = probe(path, args.runs)
+        print(f"{str(path):<40} {path.stat().st_size / 1024:>10.1f} {load * 1000:>10.2f} "
+              f"{first * 1000:>14.2f} {rss:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+Parity, crash/resume check and throughput of sharded bulk scoring
+
+bulk_score.score_sharded must write exactly the bytes predict.score_file
+writes for the same file, for JSONL (ids missing on some records, blank
+lines) and for CSV (separators, quotes and newlines inside quoted texts,
+so records span lines and shard cuts have to follow csv.reader), with
+every combination of --workers and --shard-sizes. The crash check kills
+a bulk_score.py run once some shards are checkpointed, truncates one
+shard output, and reruns it: only the missing and damaged shards may be
+scored again, and the output must still be identical.
+
+--model is converted to model.bin once and both sides use it: the
+references are written by score_file with that model.bin (a model.pkl
+without a pickled spelling index ranks vocab ties in set order, which
+changes with PYTHONHASHSEED, so another interpreter may correct a few
+tokens differently). A model.pkl given to score_sharded directly is
+checked once in this process. Throughput is texts/sec of the whole call
+(model load, planning, merge) against a freshly loaded single-process
+score_file; on a machine with fewer cores than workers it measures
+overhead, not speedup.
+
+    python model/benchmarks/bench_bulk_score.py
+    python model/benchmarks/bench_bulk_score.py --texts 200000 --workers 1 4 8 --shard-sizes 20000
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from predict import load_model, score_file
+from artifact import is_artifact, save_artifact
+from bulk_score import score_sharded
+from corpus import make_texts
+
+
+def write_jsonl(path, texts, seed):
+    """Records with and without ids, plain-string records and blank lines"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i, text in enumerate(texts):
+            r = rng.random()
+            if r < 0.02:
+                f.write("\n")
+            if r < 0.5:
+                record = {'id': f"c{i}", 'text': text}
+            elif r < 0.9:
+                record = {'text': text, 'user': rng.randint(1, 1000)}
+            else:
+                record = text
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def write_csv(path, texts, seed):
+    """usn;text;class rows, some texts with ';', quotes and line breaks"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        for i, text in enumerate(texts):
+            r = rng.random()
+            if r < 0.05:
+                text = text.replace(" ", "\n", 1)
+            elif r < 0.1:
+                text = f'"{text}"; katanya'
+            writer.writerow([i, text, rng.randint(0, 2)])
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def crash_and_resume(input_path, reference, model, shard_size, tmp):
+    """Kill a run after two checkpoints, damage one shard, resume; True if only those were redone"""
+    output = Path(tmp) / "crash.jsonl"
+    work_dir = Path(tmp) / "crash.shards"
+    script = Path(__file__).resolve().parent.parent / "bulk_score.py"
+    process = subprocess.Popen([sys.executable, str(script), str(input_path), str(output), "--model", model,
+                                "--workers", "2", "--shard-size", str(shard_size), "--work-dir", str(work_dir)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.time() + 300
+    while len(list(work_dir.glob("shard-*.json"))) < 2 and process.poll() is None and time.time() < deadline:
+        time.sleep(0.01)
+    os.killpg(process.pid, signal.SIGKILL)  # the pool workers too
+    process.wait()
+    
+    checkpoints = sorted(work_dir.glob("shard-*.json"))
+    with open(checkpoints[0].with_suffix(".jsonl"), "r+b") as f:
+        f.truncate(f.seek(0, 2) // 2)
+    report, _ = timed(score_sharded, input_path, output, model_path=model, workers=2,
+                      shard_size=shard_size, work_dir=work_dir)
+    ok = (output.read_bytes() == reference and report['resumed_shards'] == len(checkpoints) - 1
+          and report['resumed_shards'] + sum(w['shards'] for w in report['workers']) == report['shards'])
+    print(f"  {'✓' if ok else '✗'} killed after {len(checkpoints)} checkpoints, one shard truncated: "
+          f"{report['resumed_shards']}/{report['shards']} shards reused, "
+          f"{report['scored_texts']}/{report['texts']} texts rescored, output identical="
+          f"{output.read_bytes() == reference}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--texts", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--shard-sizes", type=int, nargs="+", default=[1000, 7777])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    texts = make_texts(args.texts, seed=args.seed)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model
+        if not is_artifact(model):
+            model = str(Path(tmp) / "model.bin")
+            save_artifact(load_model(args.model, result_cache_size=0), model)
+        
+        for name, writer, options in (("jsonl", write_jsonl, {}),
+                                      ("csv", write_csv, {'skip_header': False})):
+            input_path = Path(tmp) / f"comments.{name}"
+            writer(input_path, texts, args.seed)
+            reference_path = Path(tmp) / f"reference.{name}.jsonl"
+            (n, _), t_single = timed(lambda: score_file(input_path, reference_path, load_model(model), **options))
+            reference = reference_path.read_bytes()
+            print(f"\n{name}: {n} texts, score_file {n / t_single:.0f} texts/s")
+            print(f"{'workers':>9} {'shard size':>11} {'shards':>7} {'texts/s':>9} {'vs single':>10} "
+                  f"{'min/max worker texts/s':>23} {'equal':>6}")
+            for workers in args.workers:
+                for shard_size in args.shard_sizes:
+                    output = Path(tmp) / f"bulk.{name}.jsonl"
+                    report, seconds = timed(score_sharded, input_path, output, model_path=model,
+                                            workers=workers, shard_size=shard_size, **options)
+                    equal = output.read_bytes() == reference
+                    ok = ok and equal and report['texts'] == n
+                    rates = [w['texts_per_sec'] for w in report['workers']]
+                    print(f"{workers:>9} {shard_size:>11} {report['shards']:>7} {n / seconds:>9.0f} "
+                          f"{t_single / seconds:>9.2f}x {min(rates):>11.0f} / {max(rates):<9.0f} "
+                          f"{'✓' if equal else '✗':>6}")
+            
+            if model != args.model:
+                output = Path(tmp) / f"bulk.{name}.jsonl"
+                timed(score_sharded, input_path, output, model_path=args.model, workers=args.workers[-1],
+                      shard_size=args.shard_sizes[0], **options)
+                equal = output.read_bytes() == reference
+                ok = ok and equal
+                print(f"  {'✓' if equal else '✗'} from {args.model} (converted in the work directory), "
+                      f"output identical={equal}")
+            ok = crash_and_resume(input_path, reference, model, args.shard_sizes[0], tmp) and ok
+    
+    if not ok:
+        print("✗ sharded scoring differs from score_file")
+        sys.exit(1)
+    print("\n✓ sharded scoring identical to score_file")
+
+
+if __name__ == "__main__":
+    main()
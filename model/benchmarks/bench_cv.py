@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+Parity check and benchmark for sufficient-statistics cross-validation
+
+legacy_nb_kfold below is a verbatim copy of the original nb_kfold, which
+shuffles the dense matrix and refits MultinomialNB on every fold.
+cross_validate must give the same per-fold accuracies on the same folds;
+for stratified folds its out-of-fold predictions are compared against a
+fresh MultinomialNB fitted on each fold's training rows.
+
+    python model/benchmarks/bench_cv.py
+    python model/benchmarks/bench_cv.py --rows 50000 --features 2000 --folds 5 10 20
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from train_model import TFIDFVectorizer, MultinomialNB
+from cross_validation import cross_validate, stratified_kfold_assignment
+
+
+def legacy_nb_kfold(X, y, alpha=2.0, n_folds=5, random_state=42):
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y).ravel()
+    n_samples = X.shape[0]
+    
+    np.random.seed(random_state)
+    indices = np.random.permutation(n_samples)
+    X_shuffled = X[indices]
+    y_shuffled = y[indices]
+    
+    fold_sizes = np.full(n_folds, n_samples // n_folds, dtype=int)
+    fold_sizes[:n_samples % n_folds] += 1
+    fold_indices = np.cumsum(np.concatenate([[0], fold_sizes]))
+    
+    fold_accuracies = np.zeros(n_folds)
+    
+    for fold in range(n_folds):
+        val_start = fold_indices[fold]
+        val_end = fold_indices[fold + 1]
+        
+        val_mask = np.zeros(n_samples, dtype=bool)
+        val_mask[val_start:val_end] = True
+        
+        X_train_cv = X_shuffled[~val_mask]
+        y_train_cv = y_shuffled[~val_mask]
+        X_val_cv = X_shuffled[val_mask]
+        y_val_cv = y_shuffled[val_mask]
+        
+        model_cv = MultinomialNB(alpha=alpha)
+        model_cv.fit(X_train_cv, y_train_cv)
+        y_pred_cv = model_cv.predict(X_val_cv)
+        
+        fold_accuracies[fold] = np.mean(y_val_cv == y_pred_cv)
+    
+    mean_accuracy = fold_accuracies.mean()
+    std_accuracy = fold_accuracies.std()
+    return mean_accuracy, std_accuracy, fold_accuracies
+
+
+def make_dataset(n_docs, n_terms, n_classes=3, doc_len=20, seed=42):
+    """Zipf-like token lists whose class shifts part of the vocabulary"""
+    rng = np.random.default_rng(seed)
+    y = rng.choice(n_classes, size=n_docs, p=[0.5, 0.3, 0.2][:n_classes])
+    p = 1.0 / np.arange(1, n_terms + 1) ** 0.8
+    ids = rng.choice(n_terms, size=(n_docs, doc_len), p=p / p.sum())
+    shifted = rng.random((n_docs, doc_len)) < 0.3
+    ids = np.where(shifted, (ids + 7 * (y[:, None] + 1)) % n_terms, ids)
+    names = np.array([f"t{i}" for i in range(n_terms)])
+    return [list(row) for row in names[ids]], y
+
+
+def refit_oof(X, y, folds, alpha):
+    """Out-of-fold predictions and probabilities from one fresh fit per fold"""
+    pred = np.empty(len(y), dtype=y.dtype)
+    proba = np.empty((len(y), np.unique(y).size))
+    for f in np.unique(folds):
+        val = folds == f
+        model = MultinomialNB(alpha=alpha).fit(X[~val], y[~val])
+        pred[val], proba[val] = model.predict_with_proba(X[val])
+    return pred, proba
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--features", type=int, default=1000)
+    parser.add_argument("--folds", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--alpha", type=float, default=2.0)
+    args = parser.parse_args()
+    
+    docs, y = make_dataset(args.rows, args.features * 2)
+    vectorizer = TFIDFVectorizer(max_features=args.features)
+    vectorizer.fit(docs)
+    X_sparse = vectorizer.transform(docs, sparse=True)
+    X_dense = X_sparse.toarray().astype(np.float64)
+    print(f"{args.rows} rows, {vectorizer.n_features} features, {X_sparse.nnz} stored values, "
+          f"dense matrix {X_dense.nbytes / 1e6:.0f} MB")
+    
+    ok = True
+    print("\nParity")
+    for n_folds in args.folds:
+        _, _, legacy_folds = legacy_nb_kfold(X_dense, y, alpha=args.alpha, n_folds=n_folds)
+        for name, X in (("dense", X_dense), ("sparse", X_sparse)):
+            result = cross_validate(X, y, alpha=args.alpha, n_folds=n_folds, random_state=42)
+            folds = np.array([m['accuracy'] for m in result['folds']])
+            same = np.array_equal(folds, legacy_folds)
+            ok = ok and same
+            print(f"  {'✓' if same else '✗'} k={n_folds} {name}: per-fold accuracy equal to nb_kfold "
+                  f"(max |Δ| {np.abs(folds - legacy_folds).max():.1e})")
+    
+    folds = stratified_kfold_assignment(y, args.folds[0])
+    pred, proba = refit_oof(X_dense, y, folds, args.alpha)
+    result = cross_validate(X_sparse, y, alpha=args.alpha, stratified=True, n_folds=args.folds[0])
+    same = np.array_equal(result['pred'], pred) and np.abs(result['proba'] - proba).max() < 1e-9
+    ok = ok and same
+    balance = np.bincount(folds * 3 + y).reshape(args.folds[0], 3)
+    print(f"  {'✓' if same else '✗'} stratified k={args.folds[0]}: out-of-fold results equal to refitting "
+          f"(max |Δp| {np.abs(result['proba'] - proba).max():.1e}), "
+          f"per-fold class counts {balance.min(axis=0).tolist()}..{balance.max(axis=0).tolist()}")
+    
+    print(f"\n{'folds':>6} {'nb_kfold s':>11} {'dense s':>8} {'sparse s':>9} {'speedup':>8}")
+    for n_folds in args.folds:
+        _, t_legacy = timed(lambda: legacy_nb_kfold(X_dense, y, alpha=args.alpha, n_folds=n_folds))
+        _, t_dense = timed(lambda: cross_validate(X_dense, y, alpha=args.alpha, n_folds=n_folds))
+        _, t_sparse = timed(lambda: cross_validate(X_sparse, y, alpha=args.alpha, n_folds=n_folds))
+        print(f"{n_folds:>6} {t_legacy:>11.3f} {t_dense:>8.3f} {t_sparse:>9.3f} {t_legacy / t_sparse:>7.1f}x")
+    
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+"""
+Memory, lookup latency and equivalence of the packed correction Lexicon
+
+For the model, the vocab set and full word_freq dict (as model.pkl
+stored them) are compared with the Lexicon that replaces them, and the
+SpellingIndex as it used to be pickled (freq, rank and deletes dicts of
+word strings) with the one over the Lexicon (freq and rank by Lexicon
+position, deletion buckets of int32 positions): memory held after
+unpickling (tracemalloc), pickled size, and latency of the queries
+correct_word and the index need (membership, frequency, length buckets,
+lookup) and of correct_word itself. The TF-IDF term -> column dict is
+measured the same way. Synthetic vocabularies of --sizes words (plus
+--singletons singleton tokens per word in word_freq) show how both scale.
+
+The check fails unless the Lexicon iterates in vocab order, answers
+membership and frequency like the set and dict for every vocab word and
+for out-of-vocabulary tokens, corrects the tokens of --texts texts
+exactly like correct_word over the set, the index over it holds the same
+ranks, frequencies and deletion buckets and corrects like the dict index
+(also when compact_lexicon rebuilds one from an old pickle), the TF-IDF
+Lexicon maps every term to its column, and a model saved with them (without
+the index, which load_model rebuilds in the same vocab order) predicts
+exactly what the original model.pkl predicts.
+
+    python model/benchmarks/bench_lexicon.py
+    python model/benchmarks/bench_lexicon.py --sizes 10000 100000 500000 --queries 50
+"""
+
+import argparse
+import pickle
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import repeat
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from runtime import (
+    Lexicon, SpellingIndex, compact_lexicon, correct_word, preprocess_text, text_cleaning, _deletes
+)
+from predict import _ModelUnpickler, load_model, predict_text
+from corpus import make_texts, make_words
+
+
+def traced(build):
+    """(object, bytes still allocated once build() returns)"""
+    tracemalloc.start()
+    try:
+        obj = build()
+        return obj, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def unpickled_size(obj):
+    """Bytes held by a fresh unpickled copy of obj"""
+    blob = pickle.dumps(obj)
+    return traced(lambda: pickle.loads(blob))[1]
+
+
+def per_call_ns(func, args, repeat=5):
+    """Best-of-repeat mean nanoseconds of func(*a) over args"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for a in args:
+            func(*a)
+        best = min(best, time.perf_counter() - start)
+    return best / len(args) * 1e9
+
+
+class DictSpellingIndex(SpellingIndex):
+    """The SpellingIndex as it was pickled before: freq, rank and deletes dicts of word strings"""
+    def build(self, vocab, word_freq):
+        self.deletes = {}
+        self.freq = {}
+        self.rank = {}
+        for rank, v in enumerate(vocab):
+            self.rank[v] = rank
+            self.freq[v] = word_freq.get(v, 0)
+            for d in _deletes(v, self.max_dist):
+                self.deletes.setdefault(d, []).append(v)
+        return self
+    
+    def candidates(self, word, max_dist=None):
+        found = set()
+        for d in _deletes(word, self.max_dist if max_dist is None else max_dist):
+            found.update(self.deletes.get(d, ()))
+        return found
+
+
+def bucket_scan(vocab, word, max_dist=2):
+    """The length filter correct_word applies to a vocab it has to scan"""
+    return [v for v in vocab if abs(len(v) - len(word)) <= max_dist]
+
+
+def print_latency(rows):
+    print(f"  {'query':<30} {'set/dict ns':>12} {'Lexicon ns':>11} {'ratio':>7}")
+    for name, before, after in rows:
+        print(f"  {name:<30} {before:>12.0f} {after:>11.0f} {after / before:>6.1f}x")
+
+
+def print_memory(rows):
+    print(f"  {'structure':<30} {'before KB':>10} {'after KB':>9} {'saved':>7}")
+    for name, before, after in rows:
+        print(f"  {name:<30} {before / 1024:>10.1f} {after / 1024:>9.1f} {1 - after / before:>6.1%}")
+
+
+def lookup_rows(vocab, word_freq, lexicon, words, oov, queries):
+    rows = [
+        ("membership (vocab word)", per_call_ns(vocab.__contains__, [(w,) for w in words]),
+         per_call_ns(lexicon.__contains__, [(w,) for w in words])),
+        ("membership (OOV token)", per_call_ns(vocab.__contains__, [(w,) for w in oov]),
+         per_call_ns(lexicon.__contains__, [(w,) for w in oov])),
+        ("frequency", per_call_ns(word_freq.get, [(w, 0) for w in words]),
+         per_call_ns(lexicon.get, [(w, 0) for w in words])),
+        ("length bucket (len ± 2)", per_call_ns(bucket_scan, [(vocab, w) for w in queries], repeat=1),
+         per_call_ns(lambda w: list(lexicon.length_range(len(w) - 2, len(w) + 2)),
+                     [(w,) for w in queries], repeat=1)),
+    ]
+    return rows
+
+
+def check_model(args):
+    """Memory, latency and equivalence for the model's lexicon; True if equivalent"""
+    with open(args.model, "rb") as f:
+        raw = _ModelUnpickler(f).load()
+    vocab, word_freq = raw['vocab'], raw['word_freq']
+    if not isinstance(vocab, (set, frozenset)):
+        print(f"{args.model} is already saved with a Lexicon, comparing against a set and dict rebuilt from it")
+        vocab, word_freq = set(vocab), dict(zip(vocab, (vocab[w] for w in vocab)))
+    
+    lexicon, built = traced(lambda: Lexicon.build(vocab, word_freq))
+    before = DictSpellingIndex(max_dist=2).build(vocab, word_freq)
+    after = SpellingIndex(max_dist=2).build(lexicon, lexicon)
+    print(f"\n{args.model}: {len(vocab)} vocab words, {len(word_freq)} word_freq entries, "
+          f"{len(before.deletes)} deletion variants")
+    vectorizer = raw['vectorizer']
+    term_columns = vectorizer.vocab if isinstance(vectorizer.vocab, dict) else dict(vectorizer.vocab.items())
+    terms = Lexicon.build(vectorizer.feature_names, term_columns)
+    old_data = dict(raw, vocab=vocab, word_freq=word_freq, spelling_index=before)
+    compact = compact_lexicon(old_data)
+    # What save_model writes: load_model rebuilds the index from the Lexicon
+    saved = {k: v for k, v in compact.items() if k != 'spelling_index'}
+    print_memory([
+        ("vocab set + word_freq dict", unpickled_size((vocab, word_freq)), unpickled_size(lexicon)),
+        ("SpellingIndex (w/o the Lexicon)", unpickled_size(before), unpickled_size(after) - unpickled_size(lexicon)),
+        ("vocab + word_freq + index", unpickled_size((vocab, word_freq, before)),
+         unpickled_size((lexicon, lexicon, after))),
+        ("TF-IDF vocab dict", unpickled_size(term_columns), unpickled_size(terms)),
+        ("model pickle (file bytes)", len(pickle.dumps(old_data)), len(pickle.dumps(saved))),
+    ])
+    lexicon._table()
+    terms._table()
+    print(f"  (Lexicon.build: {built / 1024:.1f} KB held; lookup tables built on first use: "
+          f"{lexicon._slots[0].nbytes / 1024:.1f} KB for the vocab, {terms._slots[0].nbytes / 1024:.1f} KB "
+          f"for the TF-IDF terms)")
+    
+    texts = make_texts(args.texts, seed=args.seed)
+    tokens = [w for t in texts for w in text_cleaning(t).split()]
+    oov = sorted({w for w in tokens if w not in vocab})
+    words = list(vocab)
+    rng = random.Random(args.seed)
+    queries = rng.sample(oov, min(args.queries, len(oov)))
+    rows = lookup_rows(vocab, word_freq, lexicon, words, oov, queries)
+    rows.append(("correct_word (OOV token)",
+                 per_call_ns(correct_word, [(w, vocab, word_freq) for w in queries], repeat=1),
+                 per_call_ns(correct_word, [(w, lexicon, lexicon) for w in queries], repeat=1)))
+    rows.append(("SpellingIndex.lookup (OOV token)", per_call_ns(before.lookup, [(w,) for w in queries]),
+                 per_call_ns(after.lookup, [(w,) for w in queries])))
+    rows.append(("TF-IDF term -> column", per_call_ns(term_columns.get, [(w, -1) for w in tokens[:20000]]),
+                 per_call_ns(terms.get, [(w, -1) for w in tokens[:20000]])))
+    rows.append(("TF-IDF columns (per token, batch)",
+                 per_call_ns(lambda: list(map(term_columns.get, tokens, repeat(-1))), [()]) / len(tokens),
+                 per_call_ns(lambda: terms.get_many(tokens, -1), [()]) / len(tokens)))
+    print_latency(rows)
+    
+    problems = []
+    if list(lexicon) != list(vocab):
+        problems.append("iteration order differs from the vocab set")
+    if any(w not in lexicon or lexicon[w] != word_freq.get(w, 0) for w in words):
+        problems.append("membership or frequency differs for vocab words")
+    if any(w in lexicon or lexicon.get(w) is not None for w in oov):
+        problems.append("an OOV token is found in the Lexicon")
+    distinct = sorted(set(tokens))[:args.corrections]
+    if any(correct_word(w, vocab, word_freq) != correct_word(w, lexicon, lexicon) for w in distinct):
+        problems.append("correct_word differs")
+    if ({w: after.rank[w] for w in after.rank} != before.rank
+            or {w: after.freq[w] for w in after.rank} != before.freq
+            or len(after.deletes) != len(before.deletes)
+            or any(sorted(after.deletes[d]) != sorted(bucket) for d, bucket in before.deletes.items())):
+        problems.append("SpellingIndex built from the Lexicon holds different ranks, frequencies or buckets")
+    if any(before.lookup(w) != after.lookup(w) for w in distinct):
+        problems.append("SpellingIndex.lookup differs")
+    rebuilt = compact['spelling_index']
+    if not isinstance(rebuilt.freq, Lexicon) or {w: rebuilt.rank[w] for w in rebuilt.rank} != before.rank:
+        problems.append("compact_lexicon did not rebuild the dict index with its ranks")
+    if dict(terms.items()) != term_columns or list(terms) != vectorizer.feature_names:
+        problems.append("the TF-IDF Lexicon maps terms to different columns")
+    if any(preprocess_text(t, vocab, word_freq, index=before) != preprocess_text(t, lexicon, lexicon, index=after)
+           for t in texts):
+        problems.append("preprocess_text differs")
+    
+    reference = load_model(args.model, result_cache_size=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "model.pkl"
+        with open(path, "wb") as f:
+            pickle.dump(saved, f)
+        reloaded = load_model(path, result_cache_size=0)
+    if not isinstance(reloaded['vocab'], Lexicon):
+        problems.append("the saved model was not loaded with a Lexicon")
+    if list(reloaded['spelling_index'].rank) != list(before.rank):
+        problems.append("the spelling index rebuilt at load has a different vocab order")
+    if any(predict_text(t, reference) != predict_text(t, reloaded) for t in texts):
+        problems.append("predictions differ after saving with the Lexicon")
+    
+    for problem in problems:
+        print(f"  ✗ {problem}")
+    return not problems
+
+
+def synthetic(n_words, singletons, n_queries, seed):
+    """Memory and latency for a vocab of n_words plus singletons * n_words singleton tokens"""
+    words = make_words(int(n_words * (1 + singletons)), seed=seed)
+    rng = random.Random(seed)
+    vocab = set(words[:n_words])
+    word_freq = {w: max(2, int(100000 / (i + 1))) if i < n_words else 1 for i, w in enumerate(words)}
+    lexicon = Lexicon.build(vocab, word_freq)
+    
+    print(f"\nsynthetic: {n_words} vocab words, {len(word_freq)} word_freq entries")
+    print_memory([("vocab set + word_freq dict", unpickled_size((vocab, word_freq)), unpickled_size(lexicon))])
+    sample = rng.sample(words[:n_words], min(20000, n_words))
+    oov = words[n_words:n_words + 20000] or ["zzzz"]
+    print_latency(lookup_rows(vocab, word_freq, lexicon, sample, oov, rng.sample(sample, min(n_queries, n_words))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--texts", type=int, default=2000, help="texts whose tokens are checked and timed")
+    parser.add_argument("--corrections", type=int, default=300,
+                        help="distinct tokens corrected both ways (correct_word scans the vocab)")
+    parser.add_argument("--queries", type=int, default=20, help="tokens timed for buckets and correct_word")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--singletons", type=float, default=2, help="singleton tokens per vocab word")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    ok = check_model(args)
+    for n_words in args.sizes:
+        synthetic(n_words, args.singletons, args.queries, args.seed)
+    
+    if not ok:
+        print("\n✗ the Lexicon differs from the vocab set and word_freq dict")
+        sys.exit(1)
+    print("\n✓ the Lexicon answers like the vocab set and word_freq dict, same predictions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+"""
+Parity check and benchmark for the vectorized evaluation metrics
+
+The legacy_* functions below are verbatim copies of the confusion matrix,
+precision/recall/F1 and 200-threshold AUC that used to live in
+train_model. The confusion matrix and precision/recall/F1 must match them
+exactly. The legacy AUC only approximates the area, so the exact AUC is
+checked against a brute-force pairwise count on small inputs and against
+the legacy value within --auc-tolerance.
+
+    python model/benchmarks/bench_metrics.py
+    python model/benchmarks/bench_metrics.py --sizes 10000 100000 1000000 10000000 --legacy-max 100000
+"""
+
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from metrics import confusion_matrix, precision_recall_f1, roc_auc_score_ovr, binary_auc
+
+
+# ============================================================================
+# LEGACY REFERENCE
+# ============================================================================
+
+def legacy_confusion_matrix(y_true, y_pred, labels=None):
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    if labels is None:
+        labels = np.unique(np.concatenate([y_true, y_pred]))
+    cm = np.zeros((len(labels), len(labels)), dtype=int)
+    idx = {lab: i for i, lab in enumerate(labels)}
+    for t, p in zip(y_true, y_pred):
+        cm[idx[t], idx[p]] += 1
+    return cm, labels
+
+
+def legacy_precision_recall_f1(y_true, y_pred, average="micro"):
+    cm, labels = legacy_confusion_matrix(y_true, y_pred)
+    tp = np.diag(cm).astype(float)
+    fp = cm.sum(axis=0) - tp
+    fn = cm.sum(axis=1) - tp
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = np.where(tp+fp == 0, 0, tp/(tp+fp))
+        rec = np.where(tp+fn == 0, 0, tp/(tp+fn))
+        f1 = np.where(prec+rec == 0, 0, 2*prec*rec/(prec+rec))
+    if average == "micro":
+        TP, FP, FN = tp.sum(), fp.sum(), fn.sum()
+        p = TP/(TP+FP) if TP+FP > 0 else 0
+        r = TP/(TP+FN) if TP+FN > 0 else 0
+        f = 2*p*r/(p+r) if p+r > 0 else 0
+        return p, r, f
+    return prec.mean(), rec.mean(), f1.mean()
+
+
+def legacy_roc_auc_score_ovr(y_true, proba, n_thresholds=200):
+    y_true = np.asarray(y_true)
+    proba = np.asarray(proba, float)
+    labels = np.unique(y_true)
+    aucs = []
+    for k, lab in enumerate(labels):
+        y_bin = (y_true == lab).astype(int)
+        scores = proba[:, k]
+        P = y_bin.sum()
+        N = len(y_bin) - P
+        tpr, fpr = [], []
+        for t in np.linspace(0, 1, n_thresholds):
+            pred = scores >= t
+            TP = np.sum(pred & (y_bin == 1))
+            FP = np.sum(pred & (y_bin == 0))
+            tpr.append(TP/P if P else 0)
+            fpr.append(FP/N if N else 0)
+        order = np.argsort(fpr)
+        aucs.append(np.trapz(np.array(tpr)[order], np.array(fpr)[order]))
+    return float(np.mean(aucs))
+
+
+def pairwise_auc(y_bin, scores):
+    """P(positive scores above negative) by comparing every pair, ties count 1/2"""
+    pos, neg = scores[y_bin], scores[~y_bin]
+    diff = pos[:, None] - neg[None, :]
+    return (np.count_nonzero(diff > 0) + 0.5 * np.count_nonzero(diff == 0)) / diff.size
+
+
+# ============================================================================
+# DATA
+# ============================================================================
+
+def make_predictions(n, n_classes=3, seed=42, decimals=None):
+    """Labels, noisy predictions and probabilities that carry some signal"""
+    rng = np.random.default_rng(seed)
+    prior = np.linspace(2, 1, n_classes)
+    y_true = rng.choice(n_classes, size=n, p=prior / prior.sum())
+    logits = rng.normal(size=(n, n_classes))
+    logits[np.arange(n), y_true] += 1.5
+    proba = np.exp(logits - logits.max(axis=1, keepdims=True))
+    proba /= proba.sum(axis=1, keepdims=True)
+    if decimals is not None:
+        proba = np.round(proba, decimals)  # creates tied scores
+    y_pred = proba.argmax(axis=1)
+    return y_true, y_pred, proba
+
+
+def best_of(func, repeat):
+    """Best wall time of func() over repeat runs (garbage collector paused)"""
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+            del result
+    finally:
+        gc.enable()
+    return best
+
+
+def check_parity(auc_tolerance):
+    """All parity checks, returns the list of failures"""
+    failures = []
+    
+    names = np.array(["Netral", "Ras", "Agama"])
+    y_str, p_str, _ = make_predictions(5000, seed=2)
+    # A class that is predicted but never true, and one that is never predicted
+    y_gap, p_gap, _ = make_predictions(5000, n_classes=4, seed=3)
+    cases = [
+        ("3 classes", make_predictions(20000)),
+        ("5 classes, tied scores", make_predictions(20000, n_classes=5, seed=1, decimals=2)),
+        ("string labels", (names[y_str], names[p_str], None)),
+        ("unbalanced label sets", (np.where(y_gap == 3, 0, y_gap), np.where(p_gap == 2, 3, p_gap), None)),
+    ]
+    
+    for name, (y_true, y_pred, proba) in cases:
+        cm, labels = confusion_matrix(y_true, y_pred)
+        legacy_cm, legacy_labels = legacy_confusion_matrix(y_true, y_pred)
+        if not (np.array_equal(cm, legacy_cm) and np.array_equal(labels, legacy_labels)
+                and cm.dtype == legacy_cm.dtype):
+            failures.append(f"confusion_matrix differs ({name})")
+        for average in ("micro", "macro"):
+            got = precision_recall_f1(y_true, y_pred, average=average)
+            want = legacy_precision_recall_f1(y_true, y_pred, average=average)
+            if got != want:
+                failures.append(f"precision_recall_f1 {average} differs ({name}): {got} vs {want}")
+        
+        if proba is not None:
+            for k in range(proba.shape[1]):
+                sub = np.random.default_rng(k).choice(len(y_true), 2000, replace=False)
+                exact = binary_auc(y_true[sub] == k, proba[sub, k])
+                brute = pairwise_auc(y_true[sub] == k, proba[sub, k])
+                if abs(exact - brute) > 1e-12:
+                    failures.append(f"AUC of class {k} is {exact}, pairwise count gives {brute} ({name})")
+            
+            exact = roc_auc_score_ovr(y_true, proba)
+            legacy = legacy_roc_auc_score_ovr(y_true, proba)
+            status = "✓" if abs(exact - legacy) <= auc_tolerance else "✗"
+            print(f"  {status} {name}: exact AUC {exact:.6f}, legacy 200-threshold AUC {legacy:.6f}")
+            if status == "✗":
+                failures.append(f"AUC {exact} vs legacy {legacy} ({name})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**4, 10**5, 10**6, 10**7])
+    parser.add_argument("--legacy-max", type=int, default=10**6,
+                        help="largest size the legacy functions are timed on")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--auc-tolerance", type=float, default=5e-3,
+                        help="max |exact - legacy| AUC, the legacy sweep is an approximation")
+    args = parser.parse_args()
+    
+    print("Parity")
+    failures = check_parity(args.auc_tolerance)
+    for failure in failures:
+        print(f"  ✗ {failure}")
+    if not failures:
+        print("  ✓ confusion matrix and precision/recall/F1 identical, AUC matches pairwise count")
+    
+    print(f"\n{'samples':>10} {'metric':>18} {'legacy s':>10} {'new s':>9} {'speedup':>8}")
+    for n in args.sizes:
+        y_true, y_pred, proba = make_predictions(n)
+        runs = [
+            ("confusion_matrix", lambda: legacy_confusion_matrix(y_true, y_pred),
+             lambda: confusion_matrix(y_true, y_pred)),
+            ("precision/recall/F1", lambda: legacy_precision_recall_f1(y_true, y_pred, average="macro"),
+             lambda: precision_recall_f1(y_true, y_pred, average="macro")),
+            ("OvR AUC", lambda: legacy_roc_auc_score_ovr(y_true, proba),
+             lambda: roc_auc_score_ovr(y_true, proba)),
+        ]
+        for name, legacy, new in runs:
+            t_new = best_of(new, args.repeat)
+            if n <= args.legacy_max:
+                t_legacy = best_of(legacy, 1 if n >= 10**6 else args.repeat)
+                print(f"{n:>10} {name:>18} {t_legacy:>10.4f} {t_new:>9.4f} {t_legacy / t_new:>7.1f}x")
+            else:
+                print(f"{n:>10} {name:>18} {'-':>10} {t_new:>9.4f} {'-':>8}")
+        del y_true, y_pred, proba
+    
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Scaling benchmark for PreprocessPool (1..N worker processes)
+
+Builds a lexicon from a synthetic corpus the way train_model does, then
+times the cleaning and finishing stages for each worker count and checks
+that every run returns exactly the serial output, in order.
+
+    python model/benchmarks/bench_parallel.py
+    python model/benchmarks/bench_parallel.py --docs 200000 --workers 1 2 4 8 16 32
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from train_model import build_word_freq, SpellingIndex, MIN_COUNT
+from parallel import PreprocessPool
+
+
+def make_corpus(n_docs, n_words=3000, seed=42):
+    """Social-media-like texts with mentions, URLs, digits and typos"""
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(n_words)]
+    weights = [1.0 / (i + 1) for i in range(n_words)]
+    docs = []
+    for _ in range(n_docs):
+        tokens = rng.choices(words, weights, k=rng.randint(5, 25))
+        tokens = [t[:-1] + rng.choice(letters) if rng.random() < 0.05 else t for t in tokens]
+        if rng.random() < 0.3:
+            tokens.insert(0, f"@user_{rng.randint(1, 500)}")
+        if rng.random() < 0.1:
+            tokens.append(f"https://t.co/{rng.randint(0, 10**6)}")
+        if rng.random() < 0.1:
+            tokens.append(f"{rng.randint(1, 99)}x!!")
+        docs.append(" ".join(tokens).capitalize())
+    return docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+    
+    texts = make_corpus(args.docs)
+    with PreprocessPool(1) as pool:
+        cleaned = pool.clean(texts)
+    word_freq = build_word_freq(cleaned)
+    vocab = {w for w, c in word_freq.items() if c >= MIN_COUNT}
+    index = SpellingIndex(max_dist=2).build(vocab, word_freq)
+    with PreprocessPool(1, vocab, word_freq, index) as pool:
+        table = pool.correction_table(word_freq)
+    
+    print(f"{len(texts)} docs, {len(vocab)} vocab words, {len(table)} OOV tokens, "
+          f"{os.cpu_count()} cores")
+    print(f"{'workers':>8} {'clean (s)':>10} {'finish (s)':>11} {'total (s)':>10} {'speedup':>8}")
+    
+    reference = None
+    baseline = None
+    ok = True
+    for workers in args.workers:
+        start = time.perf_counter()
+        with PreprocessPool(workers) as pool:
+            docs = pool.clean(texts)
+        t_clean = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        with PreprocessPool(workers, vocab, word_freq, index, table) as pool:
+            docs = pool.finish(docs)
+        t_finish = time.perf_counter() - start
+        
+        total = t_clean + t_finish
+        if reference is None:
+            reference, baseline = docs, total
+        same = docs == reference
+        ok = ok and same
+        print(f"{workers:>8} {t_clean:>10.2f} {t_finish:>11.2f} {total:>10.2f} "
+              f"{baseline / total:>7.2f}x {'✓' if same else '✗ output differs'}")
+    
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Benchmark predict_text vs predict_batch throughput
+
+Texts are sampled from the model's own vocabulary (plus noise tokens), or
+read from a training-format CSV with --csv. End-to-end throughput includes
+preprocessing with a cold correction cache; "scoring" covers vectorizing
+and MultinomialNB only, on already preprocessed tokens.
+
+    python model/benchmarks/bench_predict.py
+    python model/benchmarks/bench_predict.py --n 20000 --batch-sizes 1 32 256 4096
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from train_model import CorrectionCache, preprocess_text
+from predict import load_model, predict_text, predict_batch, _score_batch
+
+
+def make_texts(model_data, n, seed=42):
+    """Random short messages over the model vocabulary with some noise"""
+    rng = random.Random(seed)
+    words = sorted(model_data['vocab'])
+    texts = []
+    for _ in range(n):
+        tokens = [rng.choice(words) for _ in range(rng.randint(3, 20))]
+        if rng.random() < 0.3:
+            tokens.append(f"@user{rng.randint(1, 999)}")
+        if rng.random() < 0.3:
+            tokens.append("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(6)))
+        texts.append(" ".join(tokens))
+    return texts
+
+
+def read_csv_texts(path, n):
+    """First n texts of a usn;text;class CSV"""
+    import pandas as pd
+    dataset = pd.read_csv(path, sep=";", header=None, names=["usn", "text", "class"], dtype=str)
+    return dataset["text"].dropna().tolist()[:n]
+
+
+def cold(model_data):
+    """Copy of model_data with an empty correction LRU"""
+    data = dict(model_data)
+    if 'corrector' in data:
+        c = data['corrector']
+        data['corrector'] = CorrectionCache(c.index, c.table, max_dist=c.max_dist, maxsize=c.maxsize)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--csv", help="training-format CSV to take texts from")
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 128, 1024, 8192])
+    args = parser.parse_args()
+    
+    model_data = load_model(args.model, result_cache_size=0)
+    texts = read_csv_texts(args.csv, args.n) if args.csv else make_texts(model_data, args.n)
+    print(f"{len(texts)} texts, {model_data['vectorizer'].n_features} features")
+    
+    # Equivalence with the single-text path
+    sample = texts[:500]
+    single = [predict_text(t, model_data) for t in sample]
+    batch = predict_batch(sample, model_data, batch_size=64)
+    same_labels = all(a['class'] == b['class'] for a, b in zip(single, batch))
+    max_diff = max(abs(a['proba'][k] - b['proba'][k]) for a, b in zip(single, batch) for k in a['proba'])
+    status = "✓" if same_labels and max_diff < 1e-9 else "✗"
+    print(f"{status} predict_batch vs predict_text: labels equal={same_labels}, max |Δproba|={max_diff:.2e}")
+    
+    data = cold(model_data)
+    start = time.perf_counter()
+    for t in texts:
+        predict_text(t, data)
+    baseline = len(texts) / (time.perf_counter() - start)
+    
+    corrector = model_data.get('corrector')
+    docs = [preprocess_text(t, model_data['vocab'], model_data['word_freq'], index=corrector) for t in texts]
+    model, vectorizer = model_data['model'], model_data['vectorizer']
+    
+    print(f"\n{'mode':>16} {'end-to-end/s':>13} {'scoring/s':>11}")
+    start = time.perf_counter()
+    for doc in docs:
+        X = vectorizer.transform([doc])
+        model.predict(X), model.predict_proba(X)
+    print(f"{'predict_text':>16} {baseline:>13.0f} {len(docs) / (time.perf_counter() - start):>11.0f}")
+    
+    for batch_size in args.batch_sizes:
+        data = cold(model_data)
+        start = time.perf_counter()
+        predict_batch(texts, data, batch_size=batch_size)
+        end_to_end = len(texts) / (time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        for i in range(0, len(docs), batch_size):
+            for _ in _score_batch(docs[i:i + batch_size], model_data):
+                pass
+        scoring = len(docs) / (time.perf_counter() - start)
+        print(f"{'batch=' + str(batch_size):>16} {end_to_end:>13.0f} {scoring:>11.0f}")
+    
+    if not same_labels or max_diff >= 1e-9:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
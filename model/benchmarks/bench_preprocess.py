@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+"""
+Golden-output check and per-stage benchmark for the preprocessing fast path
+
+The legacy_* functions below are verbatim copies of the original
+text_cleaning / normalize / remove_stopwords / stem / preprocess_text.
+The current implementation must give byte-identical output on every
+text of the synthetic corpus, with and without spelling correction.
+
+    python model/benchmarks/bench_preprocess.py
+    python model/benchmarks/bench_preprocess.py --docs 500000 --repeat 5
+"""
+
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from train_model import (
+    text_cleaning, normalize, remove_stopwords, stem, process_tokens, preprocess_text,
+    spelling_correction, build_word_freq, SpellingIndex, CorrectionCache, build_correction_table,
+    MIN_COUNT
+)
+from corpus import make_texts
+
+
+# ============================================================================
+# LEGACY REFERENCE
+# ============================================================================
+
+def legacy_text_cleaning(text: str) -> str:
+    text = text.lower()
+    
+    punct_edges = ".,!?;:\"'()[]{}<>`~|\\/"
+    tokens = text.split()
+    kept = []
+    
+    for tok in tokens:
+        core = tok.strip(punct_edges)
+        
+        if not core:
+            continue
+        
+        if core.startswith("@"):
+            u = core[1:]
+            if u and all(c.isalnum() or c == "_" for c in u):
+                continue
+        
+        if core.startswith("#"):
+            h = core[1:]
+            if h and all(c.isalnum() or c == "_" for c in h):
+                continue
+        
+        if core.startswith(("http://", "https://", "www.")):
+            continue
+        
+        kept.append(tok)
+    
+    text = " ".join(kept)
+    text = "".join(c for c in text if ord(c) < 128)
+    text = "".join(c for c in text if not c.isdigit())
+    text = "".join(c for c in text if c.isalnum() or c == "_" or c.isspace())
+    text = " ".join(text.split())
+    
+    return text
+
+
+def legacy_normalize(tokens):
+    if tokens is None or (isinstance(tokens, float) and pd.isna(tokens)):
+        return tokens
+    
+    kamus_slang = {
+        'yg': 'yang', 'gk': 'tidak', 'ga': 'tidak', 'tdk': 'tidak',
+        'bgt': 'banget', 'dr': 'dari', 'dlm': 'dalam', 'utk': 'untuk',
+        'gw': 'saya', 'gue': 'saya', 'lu': 'kamu', 'lo': 'kamu',
+        'org': 'orang', 'dg': 'dengan', 'dgn': 'dengan', 'klo': 'kalau',
+        'krn': 'karena', 'jg': 'juga', 'sdh': 'sudah', 'udh': 'sudah',
+        'blm': 'belum', 'tp': 'tapi', 'sm': 'sama', 'bs': 'bisa',
+        'aj': 'saja', 'aja': 'saja', 'bkn': 'bukan', 'hrs': 'harus', 'si': 'sih',
+        'kek': 'seperti', 'tu': 'itu', 'ni': 'ini', 'tak': 'tidak', 'dah': 'sudah',
+        'makin': 'semakin', "gak": "tidak", "kalo": "kalau", "kaya": "seperti", "udah": "sudah",
+        "keknya": "sepertinya", "emang": "memang", "kau": "kamu"
+    }
+    
+    return [kamus_slang.get(w, w) for w in tokens]
+
+
+def legacy_remove_stopwords(tokens):
+    if tokens is None or (isinstance(tokens, float) and pd.isna(tokens)):
+        return tokens
+    
+    stopwords = {
+        "yang", "dan", "di", "ke", "dari", "untuk", "adalah", "dengan", "para",
+        "itu", "ini", "nya", "pun", "sih", "kamu", "kok", "kau", "makin",
+        "kalau", "kan", "kst", "dob", "lah", "buat", "pas", "jadi", "apa",
+        "sama", "beda", "bukan", "mau", "banyak", "kstp", "aku", "iya", "tau",
+        "pak", "dulu", "gua", "semua", "mana", "memang", "tuh"
+    }
+    
+    return [w for w in tokens if w not in stopwords]
+
+
+def legacy_stem(tokens):
+    if tokens is None or (isinstance(tokens, float) and pd.isna(tokens)):
+        return tokens
+    
+    stemmed = []
+    for w in tokens:
+        if w.endswith('kan'):
+            stemmed.append(w[:-3])
+        elif w.endswith('an'):
+            stemmed.append(w[:-2])
+        elif w.endswith('i'):
+            stemmed.append(w[:-1])
+        else:
+            stemmed.append(w)
+    
+    return stemmed
+
+
+def legacy_preprocess_text(text, vocab=None, word_freq=None, index=None):
+    cleaned = legacy_text_cleaning(text)
+    
+    tokens = cleaned.split()
+    tokens = [t for t in tokens if t]
+    
+    if vocab and word_freq:
+        tokens = spelling_correction(tokens, vocab, word_freq, max_dist=2, index=index)
+    
+    tokens = legacy_normalize(tokens)
+    tokens = legacy_remove_stopwords(tokens)
+    tokens = legacy_stem(tokens)
+    tokens = [t for t in tokens if t]
+    
+    return tokens
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def best_of(func, repeat):
+    """Best wall time of func() over repeat runs (garbage collector paused)"""
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+            del result
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    texts = make_texts(args.docs)
+    print(f"{len(texts)} synthetic texts, {sum(len(t) for t in texts) / len(texts):.0f} chars avg")
+    
+    # Golden output
+    ok = True
+    cleaned = [text_cleaning(t) for t in texts]
+    same = cleaned == [legacy_text_cleaning(t) for t in texts]
+    ok = ok and same
+    print(f"{'✓' if same else '✗'} text_cleaning")
+    
+    docs = [c.split() for c in cleaned]
+    checks = [
+        ("normalize", normalize, legacy_normalize),
+        ("remove_stopwords", remove_stopwords, legacy_remove_stopwords),
+        ("stem", stem, legacy_stem),
+        ("process_tokens", process_tokens,
+         lambda tokens: legacy_stem(legacy_remove_stopwords(legacy_normalize(tokens)))),
+    ]
+    for name, func, legacy in checks:
+        same = [func(d) for d in docs] == [legacy(d) for d in docs]
+        ok = ok and same
+        print(f"{'✓' if same else '✗'} {name}")
+    
+    word_freq = build_word_freq(docs)
+    vocab = {w for w, c in word_freq.items() if c >= MIN_COUNT}
+    index = SpellingIndex(max_dist=2).build(vocab, word_freq)
+    corrector = CorrectionCache(index, build_correction_table(word_freq, index))
+    
+    same = [preprocess_text(t) for t in texts] == [legacy_preprocess_text(t) for t in texts]
+    ok = ok and same
+    print(f"{'✓' if same else '✗'} preprocess_text (no correction)")
+    same = ([preprocess_text(t, vocab, word_freq, index=corrector) for t in texts] ==
+            [legacy_preprocess_text(t, vocab, word_freq, index=corrector) for t in texts])
+    ok = ok and same
+    print(f"{'✓' if same else '✗'} preprocess_text (with correction, {len(vocab)} vocab words)")
+    
+    # Per-stage timings
+    fused = lambda tokens: stem(remove_stopwords(normalize(tokens)))
+    legacy_fused = lambda tokens: legacy_stem(legacy_remove_stopwords(legacy_normalize(tokens)))
+    stages = [
+        ("text_cleaning", lambda: [legacy_text_cleaning(t) for t in texts],
+         lambda: [text_cleaning(t) for t in texts]),
+        ("normalize", lambda: [legacy_normalize(d) for d in docs],
+         lambda: [normalize(d) for d in docs]),
+        ("remove_stopwords", lambda: [legacy_remove_stopwords(d) for d in docs],
+         lambda: [remove_stopwords(d) for d in docs]),
+        ("stem", lambda: [legacy_stem(d) for d in docs],
+         lambda: [stem(d) for d in docs]),
+        ("normalize+stop+stem", lambda: [legacy_fused(d) for d in docs],
+         lambda: [process_tokens(d) for d in docs]),
+        ("preprocess_text", lambda: [legacy_preprocess_text(t, vocab, word_freq, index=corrector) for t in texts],
+         lambda: [preprocess_text(t, vocab, word_freq, index=corrector) for t in texts]),
+    ]
+    
+    print(f"\n{'stage':<22} {'legacy (s)':>11} {'current (s)':>12} {'speedup':>8}")
+    for name, legacy, current in stages:
+        t_legacy = best_of(legacy, args.repeat)
+        t_current = best_of(current, args.repeat)
+        print(f"{name:<22} {t_legacy:>11.3f} {t_current:>12.3f} {t_legacy / t_current:>7.2f}x")
+    
+    # Unfused current functions, for reference against process_tokens
+    t_chain = best_of(lambda: [fused(d) for d in docs], args.repeat)
+    print(f"{'(stem∘stop∘normalize)':<22} {'':>11} {t_chain:>12.3f}")
+    
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
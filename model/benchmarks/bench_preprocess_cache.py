@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Equivalence check and timings for the persistent preprocessing cache
+
+prepare_dataset with a PreprocessCache must return exactly what it
+returns without one (token lists, vocabulary, word frequencies and the
+correction table, in the same order) on a cold cache, on a warm cache,
+after rows were added, edited and removed, and after the stopword list
+changed (which must invalidate the cached final tokens). Times are for
+the whole prepare_dataset call; the hit columns are the share of rows
+cleaned and fully preprocessed from the cache, of spelling corrections
+that needed no new edit distance and of edit distances reused.
+    
+    python model/benchmarks/bench_preprocess_cache.py
+    python model/benchmarks/bench_preprocess_cache.py --rows 50000 --added 500 --workers 4
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import runtime
+from train_model import prepare_dataset
+from preprocess_cache import PreprocessCache
+from corpus import make_labeled
+
+COMPARED = ('train_docs', 'test_docs', 'vocab', 'word_freq', 'correction_table')
+
+
+def dataset(texts, labels):
+    return pd.DataFrame({'usn': range(len(texts)), 'text': texts, 'class': labels})
+
+
+def prepare(df, workers, cache=None):
+    """(prepared, seconds) with the training output silenced"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        prepared = prepare_dataset(df.copy(), workers=workers, cache=cache)
+    return prepared, time.perf_counter() - start
+
+
+def same(a, b):
+    """Equal outputs, including the order of word_freq and the correction table"""
+    for key in COMPARED:
+        if a[key] != b[key]:
+            return False
+        if isinstance(a[key], dict) and list(a[key]) != list(b[key]):
+            return False
+    return (a['y_train'] == b['y_train']).all() and (a['y_test'] == b['y_test']).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--added", type=int, default=300, help="new rows in the incremental run")
+    parser.add_argument("--edited", type=int, default=50, help="existing rows whose text changes")
+    parser.add_argument("--removed", type=int, default=50)
+    parser.add_argument("--corpus-vocab", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    texts, labels = make_labeled(args.rows + args.added + args.edited, seed=args.seed,
+                                 vocab_size=args.corpus_vocab)
+    base = dataset(texts[:args.rows], labels[:args.rows])
+    
+    # Incremental: rows appended, some edited in place (new text, same label), some removed
+    rng = random.Random(args.seed)
+    new_texts, new_labels = list(texts[:args.rows]), list(labels[:args.rows])
+    replacements = texts[args.rows + args.added:]
+    for i, text in zip(rng.sample(range(args.rows), args.edited), replacements):
+        new_texts[i] = text
+    removed = set(rng.sample(range(args.rows), args.removed))
+    new_texts = [t for i, t in enumerate(new_texts) if i not in removed] + texts[args.rows:args.rows + args.added]
+    new_labels = [c for i, c in enumerate(new_labels) if i not in removed] + \
+        labels[args.rows:args.rows + args.added]
+    grown = dataset(new_texts, new_labels)
+    
+    stopwords = runtime.STOPWORDS
+    frequent = max(prepare(base, args.workers)[0]['word_freq'].items(), key=lambda kv: kv[1])[0]
+    scenarios = [
+        ("cold cache", base, None),
+        ("warm cache, same rows", base, None),
+        (f"+{args.added} / ~{args.edited} / -{args.removed} rows", grown, None),
+        (f"stopword '{frequent}' added", grown, stopwords | {frequent}),
+    ]
+    
+    ok = True
+    print(f"{'':>30} {'uncached s':>11} {'cached s':>9} {'speedup':>8} {'cleaned':>8} "
+          f"{'final':>8} {'corrections':>12} {'distances':>10} {'equal':>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "preprocess_cache.sqlite"
+        for name, df, patched in scenarios:
+            if patched is not None:
+                runtime.STOPWORDS = patched
+            try:
+                reference, t_plain = prepare(df, args.workers)
+                with PreprocessCache(path) as cache:
+                    prepared, t_cached = prepare(df, args.workers, cache=cache)
+            finally:
+                runtime.STOPWORDS = stopwords
+            
+            equal = same(reference, prepared)
+            if patched is not None:
+                equal = equal and cache.invalidated == ['normalize']
+            ok = ok and equal
+            s = cache.stats()
+            print(f"{name:>30} {t_plain:>11.3f} {t_cached:>9.3f} {t_plain / t_cached:>7.1f}x "
+                  f"{s['cleaned_hits'] / s['rows']:>8.1%} {s['processed_hits'] / s['rows']:>8.1%} "
+                  f"{s['correction_hits'] / max(s['oov_tokens'], 1):>12.1%} "
+                  f"{s['distances_reused'] / max(s['distances_reused'] + s['distances_computed'], 1):>10.1%} "
+                  f"{'✓' if equal else '✗':>6}")
+        print(f"\ncache file {path.stat().st_size / 1e6:.1f} MB for {len(grown)} rows")
+    
+    if not ok:
+        print("✗ cached preprocessing differs from uncached preprocessing")
+        sys.exit(1)
+    print("✓ cached preprocessing identical to uncached preprocessing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Benchmark the prediction result cache on repetitive traffic
+
+Requests are drawn with a Zipf-like skew from a pool of base messages,
+each copy decorated with its own mentions, URLs, digits and punctuation
+(retweets and copypasta), so many raw texts share one token sequence.
+Cached results must equal the uncached results, and predict_text must
+equal predict_batch, exactly. End-to-end throughput is dominated by
+preprocessing, which the cache does not skip; "scoring" covers what it
+does skip, on already preprocessed tokens.
+
+    python model/benchmarks/bench_result_cache.py
+    python model/benchmarks/bench_result_cache.py --n 50000 --unique 2000 --cache-sizes 100 1000 10000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from train_model import preprocess_text
+from predict import load_model, predict_text, predict_batch, _score_batch, ResultCache
+from corpus import make_texts
+
+
+def make_traffic(n, n_unique, seed=42, skew=1.1):
+    """n requests over n_unique base messages with per-copy noise"""
+    rng = random.Random(seed)
+    base = make_texts(n_unique, seed=seed, min_tokens=5, max_tokens=25)
+    weights = [1.0 / (rank + 1) ** skew for rank in range(n_unique)]
+    texts = []
+    for text in rng.choices(base, weights=weights, k=n):
+        if rng.random() < 0.5:
+            text = f"RT @user_{rng.randint(1, 10**5)}: {text}"
+        if rng.random() < 0.4:
+            text = f"{text} https://t.co/{rng.randint(0, 10**9):x}"
+        if rng.random() < 0.3:
+            text = f"{text} {rng.randint(0, 9999)}{rng.choice(['!', '!!', '?', '...'])}"
+        texts.append(text)
+    return texts
+
+
+def with_cache(model_data, maxsize, ttl=None):
+    """Copy of model_data with a fresh result cache (maxsize=0: none)"""
+    data = dict(model_data)
+    data['result_cache'] = ResultCache(maxsize, ttl=ttl) if maxsize else None
+    return data
+
+
+def scoring_rate(docs, data, batch_size):
+    """Docs per second through _score_batch"""
+    start = time.perf_counter()
+    for i in range(0, len(docs), batch_size):
+        for _ in _score_batch(docs[i:i + batch_size], data):
+            pass
+    return len(docs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--unique", type=int, default=2000, help="distinct base messages")
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+    
+    model_data = load_model(args.model, result_cache_size=0)
+    texts = make_traffic(args.n, args.unique)
+    
+    # Warm the correction LRU so every run measures scoring and the result cache only
+    predict_batch(texts, model_data, batch_size=args.batch_size)
+    
+    start = time.perf_counter()
+    reference = [predict_text(t, model_data) for t in texts]
+    single_base = len(texts) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    batch_reference = predict_batch(texts, model_data, batch_size=args.batch_size)
+    batch_base = len(texts) / (time.perf_counter() - start)
+    
+    corrector = model_data.get('corrector')
+    docs = [preprocess_text(t, model_data['vocab'], model_data['word_freq'], index=corrector) for t in texts]
+    
+    ok = reference == batch_reference
+    print(f"{len(texts)} requests over {args.unique} base messages, "
+          f"{len(set(map(tuple, docs)))} distinct token sequences")
+    print(f"\n{'':>8} {'end-to-end':>19} {'scoring':>19}")
+    print(f"{'cache':>8} {'single/s':>9} {'batch/s':>9} {'single/s':>9} {'batch/s':>9} {'hit rate':>9} "
+          f"{'evictions':>10} {'entries':>8} {'KB':>8} {'equal':>6}")
+    print(f"{'off':>8} {single_base:>9.0f} {batch_base:>9.0f} {scoring_rate(docs, model_data, 1):>9.0f} "
+          f"{scoring_rate(docs, model_data, args.batch_size):>9.0f} "
+          f"{'-':>9} {'-':>10} {'-':>8} {'-':>8} {'-':>6}")
+    
+    for maxsize in args.cache_sizes:
+        data = with_cache(model_data, maxsize)
+        start = time.perf_counter()
+        single = [predict_text(t, data) for t in texts]
+        single_rate = len(texts) / (time.perf_counter() - start)
+        stats = data['result_cache'].stats()
+        
+        data = with_cache(model_data, maxsize)
+        start = time.perf_counter()
+        batch = predict_batch(texts, data, batch_size=args.batch_size)
+        batch_rate = len(texts) / (time.perf_counter() - start)
+        
+        score_single = scoring_rate(docs, with_cache(model_data, maxsize), 1)
+        score_batch = scoring_rate(docs, with_cache(model_data, maxsize), args.batch_size)
+        
+        equal = single == reference and batch == batch_reference
+        ok = ok and equal
+        print(f"{maxsize:>8} {single_rate:>9.0f} {batch_rate:>9.0f} {score_single:>9.0f} {score_batch:>9.0f} "
+              f"{stats['hit_rate']:>9.3f} {stats['evictions']:>10} {stats['size']:>8} {stats['memory_bytes'] / 1024:>8.1f} "
+              f"{'✓' if equal else '✗':>6}")
+    
+    # A new model version (or reload generation) must never see old entries
+    data = with_cache(model_data, 1000)
+    predict_text(texts[0], data)
+    data['generation'] = (data.get('generation') or 0) + 1
+    predict_text(texts[0], data)
+    invalidated = data['result_cache'].hits == 0
+    
+    data = with_cache(model_data, 1000, ttl=0.0)
+    predict_text(texts[0], data)
+    time.sleep(0.01)
+    predict_text(texts[0], data)
+    expired = data['result_cache'].expirations == 1
+    
+    print(f"\n{'✓' if invalidated else '✗'} new generation misses entries of the previous one")
+    print(f"{'✓' if expired else '✗'} entries older than ttl are recomputed")
+    print(f"{'✓' if ok else '✗'} cached results identical to uncached results, predict_text identical to predict_batch")
+    if not (ok and invalidated and expired):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Load test for server.py: micro-batched vs unbatched /predict
+
+Starts the app in-process on a free port for each configuration and
+drives it with concurrent keep-alive clients, each sending single-text
+/predict requests back to back, then repeats the same load against the
+scoring path directly (no HTTP) to separate batching from server
+overhead. Every run follows a warm-up pass over the same texts, so the
+correction cache is hot. Reports throughput, p50/p99 latency and the
+batch sizes the server formed (warm-up included).
+
+    python model/benchmarks/bench_server.py
+    python model/benchmarks/bench_server.py --clients 128 --requests 100 --max-wait-ms 2 5 10
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from werkzeug.serving import make_server
+
+from server import create_app
+from predict import predict_text
+from corpus import make_texts
+
+
+def run_clients(port, texts, n_clients, n_requests):
+    """Latencies (s) of every request and the wall time of the whole run"""
+    latencies = [[] for _ in range(n_clients)]
+    errors = []
+    barrier = threading.Barrier(n_clients + 1)
+    
+    def client(k):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        headers = {"Content-Type": "application/json"}
+        barrier.wait()
+        for i in range(n_requests):
+            body = json.dumps({"text": texts[(k * n_requests + i) % len(texts)]})
+            start = time.perf_counter()
+            conn.request("POST", "/predict", body, headers)
+            response = conn.getresponse()
+            response.read()
+            latencies[k].append(time.perf_counter() - start)
+            if response.status != 200:
+                errors.append(response.status)
+        conn.close()
+    
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(n_clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    
+    if errors:
+        raise RuntimeError(f"{len(errors)} requests failed, e.g. HTTP {errors[0]}")
+    return np.concatenate([np.asarray(l) for l in latencies]), wall
+
+
+def run_in_process(call, texts, n_clients, n_requests):
+    """Same load as run_clients, calling the scoring path directly (no HTTP)"""
+    latencies = [[] for _ in range(n_clients)]
+    barrier = threading.Barrier(n_clients + 1)
+    
+    def client(k):
+        barrier.wait()
+        for i in range(n_requests):
+            start = time.perf_counter()
+            call(texts[(k * n_requests + i) % len(texts)])
+            latencies[k].append(time.perf_counter() - start)
+    
+    threads = [threading.Thread(target=client, args=(k,)) for k in range(n_clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return np.concatenate([np.asarray(l) for l in latencies]), time.perf_counter() - start
+
+
+def serve(app):
+    """Start app on a free port, returns (server, port)"""
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=str(Path(__file__).resolve().parent.parent / "model.pkl"))
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=40, help="requests per client")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[1.0, 5.0])
+    args = parser.parse_args()
+    
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    texts = make_texts(5000, seed=7)
+    configs = [("unbatched", {'batching': False})]
+    configs += [(f"batched wait={w:g}ms", {'max_batch_size': args.max_batch_size, 'max_wait_ms': w})
+                for w in args.max_wait_ms]
+    
+    total = args.clients * args.requests
+    print(f"{args.clients} clients x {args.requests} requests = {total} /predict calls")
+    for mode in ("http", "in-process"):
+        print(f"\n{mode + ' config':<33} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+              f"{'mean batch':>11} {'histogram'}")
+        for name, options in configs:
+            app = create_app(args.model, reload_interval=0, **options)
+            batcher = app.extensions['batcher']
+            try:
+                if mode == "http":
+                    server, port = serve(app)
+                    try:
+                        run_clients(port, texts, args.clients, args.requests)  # warm up
+                        latencies, wall = run_clients(port, texts, args.clients, args.requests)
+                    finally:
+                        server.shutdown()
+                else:
+                    model_data = app.extensions['registry'].current()
+                    call = batcher.submit if batcher is not None else lambda t: predict_text(t, model_data)
+                    run_in_process(call, texts, args.clients, args.requests)  # warm up
+                    latencies, wall = run_in_process(call, texts, args.clients, args.requests)
+            finally:
+                stats = batcher.stats() if batcher is not None else None
+                if batcher is not None:
+                    batcher.close()
+            
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            mean_batch = f"{stats['mean_batch_size']:.1f}" if stats else "1.0"
+            histogram = " ".join(f"{k}:{v}" for k, v in stats['batch_size_histogram'].items()) if stats else ""
+            print(f"{name:<33} {total / wall:>8.0f} {p50:>9.2f} {p99:>9.2f} {mean_batch:>11} {histogram}")
+
+
+if __name__ == "__main__":
+    main()
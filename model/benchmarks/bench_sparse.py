@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Benchmark dense vs sparse (CSR) TF-IDF + MultinomialNB
+
+For each feature count the vectorizer is fitted once, then transform, fit
+and predict_proba are timed in dense and sparse mode. Peak memory is
+measured with tracemalloc, which includes NumPy buffers.
+
+    python model/benchmarks/bench_sparse.py
+    python model/benchmarks/bench_sparse.py --features 200 10000 100000 --rows 2000
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from train_model import TFIDFVectorizer, MultinomialNB
+
+
+def make_docs(n_docs, n_terms, doc_len=20, seed=42):
+    """Token lists drawn from a Zipf-like distribution over n_terms terms"""
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, n_terms + 1)
+    p = 1.0 / ranks ** 0.8
+    p /= p.sum()
+    ids = rng.choice(n_terms, size=(n_docs, doc_len), p=p)
+    names = np.array([f"t{i}" for i in range(n_terms)])
+    return [list(row) for row in names[ids]]
+
+
+def run(vectorizer, docs, y, sparse):
+    """Return (transform s, fit s, predict s, peak MB, matrix MB, proba, model)"""
+    tracemalloc.start()
+    
+    start = time.perf_counter()
+    X = vectorizer.transform(docs, sparse=sparse)
+    t_transform = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    model = MultinomialNB(alpha=2.0).fit(X, y)
+    t_fit = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    proba = model.predict_proba(X)
+    t_predict = time.perf_counter() - start
+    
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return t_transform, t_fit, t_predict, peak / 2**20, X.nbytes / 2**20, proba, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--features", type=int, nargs="+", default=[200, 10000, 100000])
+    parser.add_argument("--rows", type=int, default=1000, help="documents to transform and score")
+    parser.add_argument("--fit-docs", type=int, default=60000, help="documents to fit the vectorizer")
+    parser.add_argument("--dense-limit-mb", type=float, default=1500,
+                        help="skip dense runs whose float64 matrix would exceed this size")
+    args = parser.parse_args()
+    
+    n_terms = max(args.features) * 2
+    print(f"Generating {args.fit_docs} documents over {n_terms} terms...")
+    fit_docs = make_docs(args.fit_docs, n_terms)
+    docs = fit_docs[:args.rows]
+    y = np.random.default_rng(0).integers(0, 3, size=len(docs))
+    
+    header = f"{'features':>9} {'mode':>7} {'transform':>10} {'fit':>8} {'predict':>8} {'matrix MB':>10} {'peak MB':>9}"
+    print(header)
+    print("-" * len(header))
+    
+    for n_features in args.features:
+        vectorizer = TFIDFVectorizer(max_features=n_features).fit(fit_docs)
+        
+        sparse = run(vectorizer, docs, y, sparse=True)
+        dense = None
+        dense_mb = len(docs) * vectorizer.n_features * 8 / 2**20
+        if dense_mb <= args.dense_limit_mb:
+            dense = run(vectorizer, docs, y, sparse=False)
+        
+        for mode, result in (("dense", dense), ("sparse", sparse)):
+            if result is None:
+                print(f"{vectorizer.n_features:>9} {mode:>7}  skipped (~{dense_mb:.0f} MB float64)")
+                continue
+            t_transform, t_fit, t_predict, peak, matrix_mb = result[:5]
+            print(f"{vectorizer.n_features:>9} {mode:>7} {t_transform:>9.3f}s {t_fit:>7.3f}s "
+                  f"{t_predict:>7.3f}s {matrix_mb:>10.2f} {peak:>9.2f}")
+        
+        if dense is not None:
+            max_diff = np.abs(dense[5] - sparse[5]).max()
+            same_labels = np.array_equal(dense[5].argmax(axis=1), sparse[5].argmax(axis=1))
+            status = "✓" if same_labels and max_diff < 1e-9 else "✗"
+            print(f"{'':>9} {status} parity: labels equal={same_labels}, max |Δproba|={max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Benchmark spelling correction: brute-force correct_word vs SpellingIndex
+
+Checks that SpellingIndex.lookup returns exactly what correct_word returns,
+then times lookups for growing vocabulary sizes and corpus correction
+per token occurrence vs per distinct token (CorrectionCache).
+
+    python model/benchmarks/bench_spelling.py
+    python model/benchmarks/bench_spelling.py --sizes 1000 10000 50000 --queries 500
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from train_model import (
+    SpellingIndex, CorrectionCache, build_correction_table, correct_word, spelling_correction
+)
+
+
+def make_vocab(n_words, seed=42):
+    """Random lowercase words with a Zipf-like frequency table"""
+    rng = random.Random(seed)
+    vocab = set()
+    while len(vocab) < n_words:
+        length = rng.randint(5, 12)
+        vocab.add("".join(rng.choice(string.ascii_lowercase) for _ in range(length)))
+    word_freq = {w: max(2, int(1000 / (i + 1))) for i, w in enumerate(sorted(vocab))}
+    return vocab, word_freq
+
+
+def make_queries(vocab, n_queries, seed=7):
+    """Typos of vocab words (1-3 edits) mixed with unrelated strings"""
+    rng = random.Random(seed)
+    words = sorted(vocab)
+    queries = []
+    for _ in range(n_queries):
+        w = list(rng.choice(words))
+        for _ in range(rng.randint(1, 3)):
+            op = rng.random()
+            pos = rng.randrange(len(w) + 1)
+            if op < 0.33 and len(w) > 1:
+                del w[min(pos, len(w) - 1)]
+            elif op < 0.66:
+                w.insert(pos, rng.choice(string.ascii_lowercase))
+            else:
+                w[min(pos, len(w) - 1)] = rng.choice(string.ascii_lowercase)
+        queries.append("".join(w))
+    return queries
+
+
+def check_equivalence(vocab_size, n_queries):
+    """Compare index lookups against the brute-force scan"""
+    vocab, word_freq = make_vocab(vocab_size)
+    index = SpellingIndex(max_dist=2).build(vocab, word_freq)
+    queries = make_queries(vocab, n_queries)
+    
+    mismatches = 0
+    for q in queries:
+        if index.lookup(q) != correct_word(q, vocab, word_freq, max_dist=2):
+            mismatches += 1
+    return mismatches, len(queries)
+
+
+def time_lookups(vocab_size, n_queries, brute=False):
+    """Return (build seconds, mean lookup microseconds)"""
+    vocab, word_freq = make_vocab(vocab_size)
+    queries = make_queries(vocab, n_queries)
+    
+    start = time.perf_counter()
+    index = SpellingIndex(max_dist=2).build(vocab, word_freq)
+    build_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    if brute:
+        for q in queries:
+            correct_word(q, vocab, word_freq, max_dist=2)
+    else:
+        for q in queries:
+            index.lookup(q)
+    per_lookup = (time.perf_counter() - start) / len(queries) * 1e6
+    
+    return build_time, per_lookup
+
+
+def time_corpus_correction(vocab_size, n_docs, doc_len=12, seed=3):
+    """Correct a Zipf-distributed corpus per occurrence and per distinct token"""
+    rng = random.Random(seed)
+    vocab, word_freq = make_vocab(vocab_size)
+    typos = make_queries(vocab, vocab_size // 2)
+    pool = sorted(vocab) + typos
+    weights = [1.0 / (i + 1) for i in range(len(pool))]
+    rng.shuffle(weights)
+    docs = [rng.choices(pool, weights, k=doc_len) for _ in range(n_docs)]
+    index = SpellingIndex(max_dist=2).build(vocab, word_freq)
+    
+    start = time.perf_counter()
+    per_occurrence = [spelling_correction(d, vocab, word_freq, index=index) for d in docs]
+    occurrence_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    corpus_freq = {}
+    for d in docs:
+        for w in d:
+            corpus_freq[w] = corpus_freq.get(w, 0) + 1
+    table = build_correction_table(corpus_freq, index)
+    corrector = CorrectionCache(index, table)
+    per_distinct = [spelling_correction(d, vocab, word_freq, index=corrector) for d in docs]
+    distinct_time = time.perf_counter() - start
+    
+    assert per_occurrence == per_distinct
+    return occurrence_time, distinct_time, len(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--brute-sizes", type=int, nargs="+", default=[500, 2000],
+                        help="vocab sizes for the equivalence check and brute-force timing")
+    parser.add_argument("--brute-queries", type=int, default=100)
+    parser.add_argument("--docs", type=int, default=20000,
+                        help="documents for the corpus correction benchmark")
+    args = parser.parse_args()
+    
+    print("Equivalence check (SpellingIndex vs correct_word)")
+    print("=" * 50)
+    failed = False
+    for size in args.brute_sizes:
+        mismatches, total = check_equivalence(size, args.brute_queries)
+        status = "✓" if mismatches == 0 else "✗"
+        print(f"{status} vocab={size:>6}  {total - mismatches}/{total} identical")
+        failed = failed or mismatches > 0
+    
+    print("\nLookup cost")
+    print("=" * 50)
+    print(f"{'vocab':>8} {'method':>8} {'build (s)':>10} {'lookup (us)':>12}")
+    for size in args.brute_sizes:
+        _, per_lookup = time_lookups(size, args.brute_queries, brute=True)
+        print(f"{size:>8} {'brute':>8} {'-':>10} {per_lookup:>12.1f}")
+    for size in args.sizes:
+        build_time, per_lookup = time_lookups(size, args.queries)
+        print(f"{size:>8} {'index':>8} {build_time:>10.2f} {per_lookup:>12.1f}")
+    
+    print("\nCorpus correction (vocab=5000)")
+    print("=" * 50)
+    occurrence_time, distinct_time, n_oov = time_corpus_correction(5000, args.docs)
+    print(f"per occurrence: {occurrence_time:.2f}s")
+    print(f"per distinct:   {distinct_time:.2f}s  ({n_oov} distinct OOV tokens)")
+    
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Cold-start benchmark of the inference path: import time, time to first
+prediction and resident memory
+
+Every run is a fresh interpreter that imports predict, loads the model
+and scores one text. The "old" path imports train_model first, which is
+what importing predict did before the inference code moved to runtime
+(train_model pulls in pandas and the training code); the "new" path
+imports predict alone. Process wall time includes interpreter startup,
+the other times are measured inside the process. The check fails if the
+new path imports pandas or train_model, or if the two paths predict
+differently.
+
+    python model/benchmarks/bench_startup.py
+    python model/benchmarks/bench_startup.py --model model/model.bin --runs 20
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+MODEL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(MODEL_DIR))
+
+CHILD = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {model_dir!r})
+{imports}
+imported = time.perf_counter()
+model_data = predict.load_model({model!r})
+loaded = time.perf_counter()
+result = predict.predict_text({text!r}, model_data)
+done = time.perf_counter()
+# VmHWM rather than ru_maxrss, which keeps the parent's peak across exec
+with open("/proc/self/status") as f:
+    status = {{line.split(":")[0]: int(line.split()[1]) / 1024 for line in f if line.startswith("Vm")}}
+print(json.dumps({{
+    'import_s': imported - start,
+    'load_s': loaded - imported,
+    'first_prediction_s': done - start,
+    'rss_mb': status["VmRSS"],
+    'peak_rss_mb': status["VmHWM"],
+    'pandas': 'pandas' in sys.modules,
+    'train_model': 'train_model' in sys.modules,
+    'result': result,
+}}))
+"""
+
+PATHS = {
+    'old': "import train_model\nimport predict",
+    'new': "import predict",
+}
+
+TEXT = "Agama itu penting untuk kehidupan, jangan hina ras lain"
+
+
+def run(imports, model):
+    """(measurements, process wall seconds) of one fresh interpreter"""
+    code = CHILD.format(model_dir=str(MODEL_DIR), imports=imports, model=model, text=TEXT)
+    # Fixed hash seed: a model.pkl without a spelling index ranks vocab ties in set order
+    env = dict(os.environ, PYTHONHASHSEED="0")
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         env=env).stdout
+    return json.loads(out), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="model/model.pkl",
+                        help="model.pkl (also converted to model.bin and measured both ways) or model.bin")
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per path and model")
+    args = parser.parse_args()
+    
+    from artifact import is_artifact, save_artifact
+    from predict import load_model
+    
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        models = [str(Path(args.model).resolve())]
+        if not is_artifact(args.model):
+            models.append(str(Path(tmp) / "model.bin"))
+            save_artifact(load_model(args.model, result_cache_size=0), models[-1])
+        
+        print(f"median of {args.runs} runs {'import ms':>12} {'load ms':>8} {'first pred. ms':>15} "
+              f"{'process ms':>11} {'RSS MB':>7} {'peak MB':>8} {'pandas':>7}")
+        for model in models:
+            results = {}
+            for name, imports in PATHS.items():
+                runs = [run(imports, model) for _ in range(args.runs)]
+                m = {key: float(np.median([r[key] for r, _ in runs]))
+                     for key in ('import_s', 'load_s', 'first_prediction_s', 'rss_mb', 'peak_rss_mb')}
+                wall = float(np.median([w for _, w in runs]))
+                results[name] = runs[0][0]
+                label = f"{name}, {Path(model).name}"
+                print(f"{label:>22} {m['import_s'] * 1000:>12.1f} {m['load_s'] * 1000:>8.1f} "
+                      f"{m['first_prediction_s'] * 1000:>15.1f} {wall * 1000:>11.1f} {m['rss_mb']:>7.1f} "
+                      f"{m['peak_rss_mb']:>8.1f} {'yes' if runs[0][0]['pandas'] else 'no':>7}")
+            
+            new = results['new']
+            if new['pandas'] or new['train_model']:
+                print(f"✗ the new path imported {'pandas' if new['pandas'] else 'train_model'}")
+                ok = False
+            if new['result'] != results['old']['result']:
+                print(f"✗ predictions differ: {new['result']} vs {results['old']['result']}")
+                ok = False
+    
+    if not ok:
+        sys.exit(1)
+    print("✓ inference path runs without pandas or the training code, same predictions")
+
+
+if __name__ == "__main__":
+    main()
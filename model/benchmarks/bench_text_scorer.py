@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+"""
+Randomized equivalence check and latency benchmark for the single-text scorer
+
+TextScorer must return the same class, probabilities and log-joint
+scores, bit for bit, as scoring the same token list through the sparse
+batch path (vectorizer.transform(sparse=True) + predict_log_proba). The
+previous predict_text path (dense 1 x n_features row) sums in a different
+order, so it is checked for equal classes and |Δ| <= --tolerance. Token
+lists are drawn at random: feature terms with repeats, out-of-vocabulary
+tokens, empty and all-OOV lists, and preprocessed synthetic messages;
+both the shipped model and a synthetic model with --features features
+are tested.
+
+    python model/benchmarks/bench_text_scorer.py
+    python model/benchmarks/bench_text_scorer.py --model model/model.bin --trials 50000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from train_model import TFIDFVectorizer, MultinomialNB, preprocess_text
+from predict import load_model, predict_text, TextScorer
+from corpus import make_texts, make_labeled
+
+
+def legacy_predict_text(text, model_data):
+    """predict_text before TextScorer: dense row, full matrix product"""
+    corrector = model_data.get('corrector', model_data.get('spelling_index'))
+    tokens = preprocess_text(text, model_data['vocab'], model_data['word_freq'], index=corrector)
+    X = model_data['vectorizer'].transform([tokens])
+    pred, proba = model_data['model'].predict_with_proba(X)
+    return pred[0], proba[0]
+
+
+def random_token_lists(vectorizer, n, seed):
+    """Token lists mixing feature terms (with repeats), OOV tokens, empty and all-OOV lists"""
+    rng = random.Random(seed)
+    terms = list(vectorizer.feature_names)
+    lists = [[], ["zzzunknown"], ["oov1", "oov2", "oov1"]]
+    while len(lists) < n:
+        tokens = [rng.choice(terms) for _ in range(rng.randint(1, 40))]
+        tokens += [rng.choice(tokens) for _ in range(rng.randint(0, 5))]  # repeats
+        tokens += [f"oov{rng.randint(0, 50)}" for _ in range(rng.randint(0, 4))]
+        rng.shuffle(tokens)
+        lists.append(tokens)
+    return lists
+
+
+def check(name, vectorizer, model, docs, tolerance):
+    """Compare TextScorer against both reference paths, returns the list of failures"""
+    scorer = TextScorer(vectorizer, model)
+    results = [scorer.score(doc) for doc in docs]
+    preds = np.array([r[0] for r in results])
+    proba = np.array([r[1] for r in results])
+    log_joint = np.array([r[2] for r in results])
+    
+    X = vectorizer.transform(docs, sparse=True)
+    ref_joint = model.predict_log_proba(X)
+    ref_proba = MultinomialNB._proba_from_log_joint(ref_joint)
+    ref_preds = model.classes_[np.argmax(ref_joint, axis=1)]
+    
+    dense_joint = np.vstack([model.predict_log_proba(vectorizer.transform([doc])) for doc in docs])
+    dense_proba = MultinomialNB._proba_from_log_joint(dense_joint)
+    dense_preds = model.classes_[np.argmax(dense_joint, axis=1)]
+    
+    failures = []
+    exact = (np.array_equal(preds, ref_preds) and np.array_equal(proba, ref_proba)
+             and np.array_equal(log_joint, ref_joint))
+    if not exact:
+        failures.append(f"{name}: differs from the sparse batch path")
+    d_proba = np.abs(proba - dense_proba).max()
+    d_joint = (np.abs(log_joint - dense_joint) / np.maximum(np.abs(dense_joint), 1.0)).max()
+    labels = np.array_equal(preds, dense_preds)
+    if not labels or d_proba > tolerance or d_joint > tolerance:
+        failures.append(f"{name}: differs from the dense path (labels equal={labels}, "
+                        f"|Δp| {d_proba:.1e}, rel |Δlog-joint| {d_joint:.1e})")
+    status = "✗" if failures else "✓"
+    print(f"  {status} {name}: {len(docs)} token lists, bit-identical to batch={exact}, "
+          f"vs dense row: labels equal={labels}, max |Δp| {d_proba:.1e}")
+    return failures
+
+
+def latencies(func, items):
+    """Per-call wall times in microseconds"""
+    times = np.empty(len(items))
+    for i, item in enumerate(items):
+        start = time.perf_counter()
+        func(item)
+        times[i] = time.perf_counter() - start
+    return times * 1e6
+
+
+def report(label, legacy, new):
+    print(f"{label:>22} {np.median(legacy):>9.1f} {np.median(new):>8.1f} "
+          f"{np.percentile(legacy, 99):>9.1f} {np.percentile(new, 99):>8.1f} "
+          f"{np.median(legacy) / np.median(new):>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--trials", type=int, default=20000, help="random token lists per model")
+    parser.add_argument("--features", type=int, default=5000, help="features of the synthetic model")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    model_data = load_model(args.model, result_cache_size=0)
+    vectorizer, model = model_data['vectorizer'], model_data['model']
+    
+    # Synthetic model with a larger feature space
+    texts, labels = make_labeled(5000, seed=args.seed, vocab_size=8000)
+    docs = [preprocess_text(t) for t in texts]
+    big_vectorizer = TFIDFVectorizer(max_features=args.features).fit(docs)
+    big_model = MultinomialNB(alpha=2.0).fit(big_vectorizer.transform(docs, sparse=True), labels)
+    
+    print("Equivalence")
+    failures = []
+    corrector = model_data['corrector']
+    messages = [preprocess_text(t, model_data['vocab'], model_data['word_freq'], index=corrector)
+                for t in make_texts(2000, seed=args.seed + 1)]
+    failures += check(f"{args.model} ({vectorizer.n_features} features), random",
+                      vectorizer, model, random_token_lists(vectorizer, args.trials, args.seed), args.tolerance)
+    failures += check(f"{args.model}, preprocessed messages", vectorizer, model, messages, args.tolerance)
+    failures += check(f"synthetic ({big_vectorizer.n_features} features), random", big_vectorizer, big_model,
+                      random_token_lists(big_vectorizer, args.trials, args.seed + 2), args.tolerance)
+    
+    new_results = [predict_text(t, model_data) for t in make_texts(500, seed=args.seed + 3)]
+    old_results = [legacy_predict_text(t, model_data) for t in make_texts(500, seed=args.seed + 3)]
+    same = all(r['class'] == int(p) for r, (p, _) in zip(new_results, old_results))
+    if not same:
+        failures.append("predict_text labels differ from the previous predict_text")
+    print(f"  {'✓' if same else '✗'} predict_text labels equal to the previous predict_text")
+    
+    print(f"\nLatency per request, µs {'median':>14} {'':>8} {'p99':>9} {'':>8}")
+    print(f"{'':>22} {'legacy':>9} {'new':>8} {'legacy':>9} {'new':>8} {'speedup':>8}")
+    for label, vec, nb, token_lists in (
+        (f"score ({vectorizer.n_features} feat.)", vectorizer, model, messages),
+        (f"score ({big_vectorizer.n_features} feat.)", big_vectorizer, big_model,
+         random_token_lists(big_vectorizer, 2000, args.seed + 4)),
+    ):
+        scorer = TextScorer(vec, nb)
+        legacy = latencies(lambda doc: nb.predict_with_proba(vec.transform([doc])), token_lists)
+        new = latencies(scorer.score, token_lists)
+        report(label, legacy, new)
+    
+    queries = make_texts(3000, seed=args.seed + 5)
+    for t in queries:  # warm the correction cache for both paths
+        predict_text(t, model_data)
+    legacy = latencies(lambda t: legacy_predict_text(t, model_data), queries)
+    new = latencies(lambda t: predict_text(t, model_data), queries)
+    report("predict_text", legacy, new)
+    
+    if failures:
+        for failure in failures:
+            print(f"✗ {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+"""
+Parity check and benchmark for the token-id TF-IDF vectorizer
+
+LegacyTFIDFVectorizer and legacy_build_word_freq below are verbatim copies
+of the dict-per-token implementations. The token-id versions must produce
+the same word frequencies (in the same order), the same feature list, df
+and idf, and bit-identical dense and CSR matrices, from token lists as
+well as from TokenIdDocs. Timings cover corpora up to --rows documents.
+
+    python model/benchmarks/bench_vectorizer.py
+    python model/benchmarks/bench_vectorizer.py --rows 10000 100000 1000000 --features 200 5000
+"""
+
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from train_model import TFIDFVectorizer, TokenIdDocs, CSRMatrix, build_word_freq
+
+
+# ============================================================================
+# LEGACY REFERENCE
+# ============================================================================
+
+def legacy_build_word_freq(text_series):
+    """Build word frequency dictionary"""
+    freq = {}
+    for doc in text_series:
+        for w in doc:
+            freq[w] = freq.get(w, 0) + 1
+    return freq
+
+
+class LegacyTFIDFVectorizer:
+    def __init__(self, max_features=None):
+        self.max_features = max_features
+        self.vocab = {}
+        self.idf = None
+        self.feature_names = []
+        self.n_features = 0
+        self.n_docs = 0
+    
+    def fit(self, docs):
+        """Fit vectorizer on documents"""
+        self.n_docs = len(docs)
+        
+        df = {}  # Document frequency
+        tf_global = {}  # Global term frequency
+        
+        for doc in docs:
+            if not doc:
+                continue
+            
+            unique_terms = set(doc)
+            for term in unique_terms:
+                df[term] = df.get(term, 0) + 1
+            
+            for term in doc:
+                tf_global[term] = tf_global.get(term, 0) + 1
+        
+        if self.max_features is None:
+            terms = list(tf_global.keys())
+        else:
+            terms = sorted(tf_global.keys(),
+                          key=lambda t: tf_global[t],
+                          reverse=True)[:self.max_features]
+        
+        self._set_terms(terms, df)
+        return self
+    
+    def _set_terms(self, terms, df):
+        """Set the feature vocabulary and idf weights"""
+        self.vocab = {term: idx for idx, term in enumerate(terms)}
+        self.feature_names = terms
+        self.n_features = len(terms)
+        self.df = np.array([df.get(term, 0) for term in terms], dtype=np.int64)
+        self._set_idf()
+    
+    def _set_idf(self):
+        """Recompute idf from the stored document frequencies"""
+        N = self.n_docs
+        idf_vals = np.zeros(self.n_features, dtype=np.float32)
+        for idx in range(self.n_features):
+            df_t = self.df[idx]
+            idf_vals[idx] = np.log((N + 1) / (df_t + 1)) + 1.0
+        
+        self.idf = idf_vals
+    
+    def transform(self, docs, sparse=False):
+        """Transform documents to TF-IDF matrix (CSRMatrix if sparse)"""
+        if sparse:
+            return self._transform_sparse(docs)
+        
+        n_samples = len(docs)
+        X = np.zeros((n_samples, self.n_features), dtype=np.float32)
+        
+        for i, doc in enumerate(docs):
+            if not doc:
+                continue
+            doc_len = len(doc)
+            
+            for term in doc:
+                j = self.vocab.get(term)
+                if j is not None:
+                    X[i, j] += 1.0
+            
+            if doc_len > 0:
+                X[i] /= float(doc_len)
+        
+        X *= self.idf
+        return X
+    
+    def _transform_sparse(self, docs):
+        """Same values as transform, stored as CSR"""
+        indptr = np.zeros(len(docs) + 1, dtype=np.int64)
+        indices = []
+        data = []
+        
+        for i, doc in enumerate(docs):
+            if doc:
+                counts = {}
+                for term in doc:
+                    j = self.vocab.get(term)
+                    if j is not None:
+                        counts[j] = counts.get(j, 0) + 1
+                
+                cols = sorted(counts)
+                vals = np.array([counts[j] for j in cols], dtype=np.float32)
+                vals /= float(len(doc))
+                indices.extend(cols)
+                data.append(vals)
+            indptr[i + 1] = len(indices)
+        
+        indices = np.array(indices, dtype=np.int32)
+        data = np.concatenate(data) if data else np.zeros(0, dtype=np.float32)
+        data *= self.idf[indices]
+        
+        return CSRMatrix(data, indices, indptr, (len(docs), self.n_features))
+
+
+
+# ============================================================================
+# DATA
+# ============================================================================
+
+def make_docs(n_docs, n_terms, mean_len=12, empty_rate=0.01, seed=42):
+    """Zipf-like token lists of varying length, some of them empty"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.poisson(mean_len, size=n_docs)
+    lengths[rng.random(n_docs) < empty_rate] = 0
+    p = 1.0 / np.arange(1, n_terms + 1) ** 1.05
+    ids = rng.choice(n_terms, size=int(lengths.sum()), p=p / p.sum())
+    # Shuffle names so first occurrence order differs from frequency order
+    names = [f"w{i}" for i in rng.permutation(n_terms)]
+    tokens = [names[i] for i in ids.tolist()]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+    return [tokens[offsets[i]:offsets[i + 1]] for i in range(n_docs)]
+
+
+def best_of(func, repeat):
+    """Best wall time of func() over repeat runs (garbage collector paused)"""
+    best = float("inf")
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+            del result
+    finally:
+        gc.enable()
+    return best
+
+
+def same_matrix(a, b):
+    if isinstance(a, CSRMatrix):
+        return (a.shape == b.shape and np.array_equal(a.indptr, b.indptr)
+                and np.array_equal(a.indices, b.indices) and a.indices.dtype == b.indices.dtype
+                and np.array_equal(a.data, b.data) and a.data.dtype == b.data.dtype)
+    return a.dtype == b.dtype and np.array_equal(a, b)
+
+
+def compare_fitted(new, old):
+    """Names of the fitted attributes that differ"""
+    diffs = []
+    if new.feature_names != old.feature_names or dict(new.vocab.items()) != old.vocab:
+        diffs.append("features")
+    if not np.array_equal(new.df, old.df):
+        diffs.append("df")
+    if new.idf.dtype != old.idf.dtype or not np.array_equal(new.idf, old.idf):
+        diffs.append("idf")
+    if new.n_docs != old.n_docs:
+        diffs.append("n_docs")
+    return diffs
+
+
+def check_parity():
+    """All parity checks, returns the list of failures"""
+    failures = []
+    cases = [
+        ("ties, small vocabulary", make_docs(3000, 40, mean_len=4, seed=1)),
+        ("zipf", make_docs(5000, 3000, seed=2)),
+        ("empty corpus docs", [[], ["a"], [], ["b", "a", "b"], []]),
+    ]
+    unseen = make_docs(500, 4000, seed=3) + [[], ["not", "in", "vocab"]]
+    
+    for name, docs in cases:
+        last_token = next(t for doc in reversed(docs) for t in reversed(doc))
+        freq, legacy_freq = build_word_freq(docs), legacy_build_word_freq(docs)
+        if freq != legacy_freq or list(freq) != list(legacy_freq):
+            failures.append(f"build_word_freq differs ({name})")
+        
+        for max_features in (None, 0, 1, 7, 200, 10**6):
+            old = LegacyTFIDFVectorizer(max_features).fit(docs)
+            inputs = {
+                "token lists": docs,
+                "TokenIdDocs": TokenIdDocs.encode(docs),
+                # Pre-filled index: ids no longer follow first occurrence
+                "TokenIdDocs, shared index": TokenIdDocs.encode(docs, index={"zz": 0, last_token: 1}),
+            }
+            for kind, fit_input in inputs.items():
+                new = TFIDFVectorizer(max_features).fit(fit_input)
+                diffs = compare_fitted(new, old)
+                if diffs:
+                    failures.append(f"fit differs in {diffs} ({name}, max_features={max_features}, {kind})")
+                    continue
+                for data_name, data in (("train", docs), ("unseen", unseen)):
+                    encoded = TokenIdDocs.encode(data, index=dict(fit_input.index)
+                                                 if isinstance(fit_input, TokenIdDocs) else None)
+                    for sparse in (False, True):
+                        want = old.transform(data, sparse=sparse)
+                        for got in (new.transform(data, sparse=sparse), new.transform(encoded, sparse=sparse)):
+                            if not same_matrix(got, want):
+                                failures.append(f"transform differs ({name}, max_features={max_features}, "
+                                                f"{kind}, {data_name}, sparse={sparse})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10**4, 10**5, 10**6])
+    parser.add_argument("--terms", type=int, default=50000, help="distinct terms in the corpus")
+    parser.add_argument("--features", type=int, nargs="+", default=[200, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    print("Parity")
+    failures = check_parity()
+    for failure in failures:
+        print(f"  ✗ {failure}")
+    if not failures:
+        print("  ✓ word frequencies, features, df, idf and dense/CSR matrices identical")
+    
+    print(f"\n{'docs':>9} {'features':>8} {'step':>22} {'legacy s':>9} {'new s':>8} {'speedup':>8}")
+    for n_docs in args.rows:
+        docs = make_docs(n_docs, args.terms)
+        repeat = 1 if n_docs >= 10**6 else args.repeat
+        
+        def row(features, name, legacy, new):
+            t_new = best_of(new, repeat)
+            if legacy is None:
+                print(f"{n_docs:>9} {features:>8} {name:>22} {'-':>9} {t_new:>8.3f} {'-':>8}")
+                return
+            t_legacy = best_of(legacy, repeat)
+            print(f"{n_docs:>9} {features:>8} {name:>22} {t_legacy:>9.3f} {t_new:>8.3f} "
+                  f"{t_legacy / t_new:>7.1f}x")
+        
+        row("-", "build_word_freq", lambda: legacy_build_word_freq(docs), lambda: build_word_freq(docs))
+        row("-", "TokenIdDocs.encode", None, lambda: TokenIdDocs.encode(docs))
+        encoded = TokenIdDocs.encode(docs)
+        for n_features in args.features:
+            old = LegacyTFIDFVectorizer(n_features).fit(docs)
+            new = TFIDFVectorizer(n_features).fit(docs)
+            row(n_features, "fit", lambda: LegacyTFIDFVectorizer(n_features).fit(docs),
+                lambda: TFIDFVectorizer(n_features).fit(docs))
+            row(n_features, "fit (token ids)", None, lambda: TFIDFVectorizer(n_features).fit(encoded))
+            row(n_features, "transform sparse", lambda: old.transform(docs, sparse=True),
+                lambda: new.transform(docs, sparse=True))
+            row(n_features, "transform sparse (ids)", None, lambda: new.transform(encoded, sparse=True))
+            if n_docs * n_features <= 2 * 10**8:
+                row(n_features, "transform dense", lambda: old.transform(docs), lambda: new.transform(docs))
+        del docs, encoded
+    
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
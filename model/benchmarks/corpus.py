@@ -0,0 +1,175 @@
+"""
+Synthetic Indonesian social-media corpus for benchmarks
+
+Texts mix base words with slang, stopwords, suffixed forms, mentions,
+hashtags, URLs, digits, punctuation, non-ASCII characters and typos, so
+every branch of the preprocessing pipeline gets exercised. Vocabulary
+size, typo, mention and URL rates are configurable, and make_labeled adds
+topic-driven Netral/Ras/Agama labels for training benchmarks.
+"""
+
+import random
+import itertools
+
+from runtime import KAMUS_SLANG, STOPWORDS
+
+BASE_WORDS = [
+    "pemerintah", "rakyat", "negara", "agama", "suku", "ras", "bodoh", "benci",
+    "pilih", "presiden", "dukung", "tolak", "jahat", "baik", "kerja", "hidup",
+    "orang", "bangsa", "partai", "politik", "berita", "hoaks", "damai", "ribut",
+    "makan", "pergi", "datang", "pikir", "bicara", "tulis", "cinta", "marah",
+    "sekolah", "kampung", "kota", "desa", "pasar", "jalan", "rumah", "kantor",
+    "ulama", "pendeta", "masjid", "gereja", "pribumi", "asing", "cina", "jawa",
+]
+SUFFIXES = ["", "", "", "kan", "an", "i", "nya", "lah"]
+PUNCTUATION = ["", "", "", "!", "!!", "?", ".", ",", "...", ":)", "\"", "'"]
+NON_ASCII = ["😂", "🔥", "é", "ü", "ñ", "—", "“", "”", " ", "１２", "٣", "ß", "İ"]
+EDGE_TOKENS = ["@", "#", "@@user", "#a-b", "@user.name", "(@admin)", "#hash_tag!", "www.",
+               "http://", "_", "__init__", "x2", "2x", "a.b.c", "&amp;", "\t", "\x1c"]
+
+
+def _typo(word, rng):
+    """One random edit (delete, replace, insert or swap)"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    i = rng.randrange(len(word))
+    op = rng.randrange(4)
+    if op == 0 and len(word) > 1:
+        return word[:i] + word[i + 1:]
+    if op == 1:
+        return word[:i] + rng.choice(letters) + word[i + 1:]
+    if op == 2:
+        return word[:i] + rng.choice(letters) + word[i:]
+    if i < len(word) - 1:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+
+# Share of each token kind; mention, url and typo rates can be overridden per corpus
+TOKEN_MIX = (("base", 0.45), ("slang", 0.15), ("stopword", 0.15), ("mention", 0.06),
+             ("hashtag", 0.05), ("url", 0.03), ("digits", 0.04), ("non_ascii", 0.04), ("edge", 0.03))
+TYPO_RATE = 0.08
+
+# Topic words that decide the label of make_labeled texts
+TOPIC_WORDS = {
+    'Agama': ["agama", "ulama", "pendeta", "masjid", "gereja"],
+    'Ras': ["suku", "ras", "pribumi", "asing", "cina", "jawa"],
+}
+
+SYLLABLES = ["ba", "ka", "ma", "na", "ra", "sa", "ta", "la", "ja", "da", "ga", "pa", "ha", "wa",
+             "bi", "ki", "mi", "ni", "ri", "si", "ti", "li", "di", "gi", "pi", "bu", "ku", "mu",
+             "nu", "ru", "su", "tu", "lu", "du", "gu", "pu", "be", "ke", "me", "ne", "re", "se",
+             "te", "le", "de", "ge", "pe", "bo", "ko", "mo", "no", "ro", "so", "to", "lo", "do",
+             "ng", "ny", "an", "in", "un", "ah", "ih", "uh"]
+
+
+def make_words(n_words, seed=42):
+    """n_words distinct Indonesian-looking words: BASE_WORDS first, then syllable compounds"""
+    rng = random.Random(seed)
+    words = list(BASE_WORDS[:n_words])
+    seen = set(words)
+    while len(words) < n_words:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def _thresholds(mention_rate=None, url_rate=None):
+    """Cumulative token-kind thresholds; changed rates are taken from / given back to base words"""
+    mix = dict(TOKEN_MIX)
+    for kind, rate in (("mention", mention_rate), ("url", url_rate)):
+        if rate is not None:
+            mix["base"] -= rate - mix[kind]
+            mix[kind] = rate
+    if mix["base"] < 0:
+        raise ValueError("mention_rate + url_rate leave no room for ordinary words")
+    bounds, total = [], 0.0
+    for kind, _ in TOKEN_MIX:
+        total += mix[kind]
+        bounds.append((round(total, 12), kind))
+    return bounds
+
+
+def _token(rng, slang, stopwords, words=BASE_WORDS, typo_rate=TYPO_RATE, bounds=None, weights=None):
+    """One surface token"""
+    r = rng.random()
+    kind = next((k for bound, k in bounds or _thresholds() if r < bound), "edge")
+    if kind == "base":
+        base = rng.choice(words) if weights is None else rng.choices(words, cum_weights=weights)[0]
+        word = base + rng.choice(SUFFIXES)
+        if rng.random() < typo_rate:
+            word = _typo(word, rng)
+    elif kind == "slang":
+        word = rng.choice(slang)
+    elif kind == "stopword":
+        word = rng.choice(stopwords)
+    elif kind == "mention":
+        word = f"@{rng.choice(['user', 'akun', 'admin'])}_{rng.randint(1, 999)}"
+    elif kind == "hashtag":
+        word = f"#{rng.choice(BASE_WORDS)}{rng.choice(['', '2024', '_id'])}"
+    elif kind == "url":
+        word = rng.choice(["https://t.co/", "http://bit.ly/", "www.detik.com/"]) + str(rng.randint(0, 10**6))
+    elif kind == "digits":
+        word = rng.choice([str(rng.randint(0, 9999)), f"{rng.randint(1, 99)}x", f"ke{rng.randint(2, 9)}"])
+    elif kind == "non_ascii":
+        word = rng.choice(BASE_WORDS) + rng.choice(NON_ASCII)
+    else:
+        word = rng.choice(EDGE_TOKENS)
+    
+    if rng.random() < 0.1:
+        word = word.upper() if rng.random() < 0.5 else word.capitalize()
+    return word + rng.choice(PUNCTUATION)
+
+
+def make_texts(n_docs, seed=42, min_tokens=3, max_tokens=30, vocab_size=None, typo_rate=TYPO_RATE,
+               mention_rate=None, url_rate=None):
+    """Generate n_docs synthetic tweets (deterministic for a given seed and settings).
+    
+    vocab_size draws ordinary words Zipf-like from make_words(vocab_size)
+    instead of uniformly from BASE_WORDS; typo_rate, mention_rate and
+    url_rate override the default token mix.
+    """
+    rng = random.Random(seed)
+    slang = sorted(KAMUS_SLANG)
+    stopwords = sorted(STOPWORDS)
+    words, weights = BASE_WORDS, None
+    if vocab_size:
+        words = make_words(vocab_size, seed=seed)
+        weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(words))))
+    bounds = _thresholds(mention_rate, url_rate)
+    texts = []
+    for _ in range(n_docs):
+        tokens = [_token(rng, slang, stopwords, words, typo_rate, bounds, weights)
+                  for _ in range(rng.randint(min_tokens, max_tokens))]
+        sep = "  " if rng.random() < 0.05 else " "
+        texts.append(sep.join(tokens))
+    return texts
+
+
+def make_labeled(n_docs, seed=42, noise=0.05, **options):
+    """(texts, labels) whose class follows the topic words a text contains.
+    
+    Texts mentioning Agama or Ras topic words get that class, the rest are
+    Netral; a noise share of labels is reassigned at random. options go to
+    make_texts.
+    """
+    rng = random.Random(seed + 1)
+    texts = make_texts(n_docs, seed=seed, **options)
+    labels = []
+    for text in texts:
+        lowered = text.lower()
+        scores = {cls: sum(lowered.count(w) for w in topic) for cls, topic in TOPIC_WORDS.items()}
+        best = max(scores, key=scores.get)
+        label = best if scores[best] else 'Netral'
+        if rng.random() < noise:
+            label = rng.choice(['Netral', 'Ras', 'Agama'])
+        labels.append(label)
+    return texts, labels
+
+
+def write_csv(path, texts, labels):
+    """Save as a usn;text;class training CSV"""
+    import pandas as pd
+    pd.DataFrame({'usn': [f"user{i}" for i in range(len(texts))], 'text': texts, 'class': labels}).to_csv(
+        path, sep=";", header=False, index=False)
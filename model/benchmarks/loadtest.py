@@ -0,0 +1,493 @@
+#!/usr/bin/env python
+"""
+Load test: how many messages per second one box classifies within a
+latency SLO
+
+Replays a corpus (a usn;text;class CSV or JSONL file via --corpus, or
+the synthetic corpus.py generator) against predict_text in this process
+or against a local HTTP /predict endpoint (--url, or server.py started
+on a free port with --spawn-server), from an asyncio event loop:
+
+- open loop (--rates): requests arrive at a fixed rate per second
+  (Poisson or evenly spaced) whether or not earlier ones have finished.
+  Latency counts from the scheduled arrival, so the queueing of a
+  target that falls behind is measured, not hidden
+- closed loop (--concurrency): N clients each send the next request as
+  soon as the previous one is answered
+
+Every level runs for --duration seconds after a --warmup run. Results
+per level: throughput, latency percentiles, errors by kind (HTTP status,
+exception, timeout, arrivals dropped past --max-in-flight) and the CPU
+cores used by this process, by the server process and by the whole
+machine (from /proc). The best level meeting --slo-p99-ms and
+--max-error-rate is reported; with --min-throughput the exit code is 1
+if it is slower, so model and preprocessing changes can be gated on it.
+Everything runs offline on localhost (Linux).
+
+In-process calls run on --threads executor threads that share the
+interpreter with the event loop, so they measure the scoring path on
+one core; the HTTP target measures the server as deployed. The corpus
+is replayed in a loop, so once a level has sent more requests than
+there are texts the result cache answers the repeats: replay a corpus
+at least as large as one level, or use --result-cache-size 0 in process,
+to measure scoring rather than cache hits.
+
+    python model/benchmarks/loadtest.py inproc --rates 200 500 1000 --concurrency 1 4
+    python model/benchmarks/loadtest.py http --spawn-server --concurrency 1 8 32 --output load.json
+    python model/benchmarks/loadtest.py http --url http://127.0.0.1:5000/predict --rates 100 200 \\
+        --server-pid 12345 --slo-p99-ms 50 --min-throughput 150
+"""
+
+import argparse
+import asyncio
+import http.client
+import itertools
+import json
+import os
+import platform
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+MODEL_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(MODEL_DIR))
+
+import numpy as np
+
+from predict import load_model, predict_text, _read_texts
+from corpus import make_texts
+
+PERCENTILES = (50, 90, 95, 99, 99.9)
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+# ============================================================================
+# TARGETS
+# ============================================================================
+
+class InProcessTarget:
+    """predict_text on executor threads of this process"""
+    def __init__(self, model_path, threads=1, result_cache_size=10000):
+        self.model_data = load_model(model_path, result_cache_size=result_cache_size)
+        self.executor = ThreadPoolExecutor(threads)
+        self.server_pid = None
+        self.description = f"predict_text in-process ({threads} thread(s)), {model_path}"
+    
+    async def call(self, text):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, predict_text, text, self.model_data)
+    
+    def close(self):
+        self.executor.shutdown()
+
+
+class HTTPTarget:
+    """POST {"text": ...} over pooled keep-alive HTTP/1.1 connections"""
+    def __init__(self, url, server_pid=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or "/"
+        self.server_pid = server_pid
+        self.description = f"POST {url}"
+        self._idle = []
+    
+    async def call(self, text):
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            body = json.dumps({'text': text}).encode("utf-8")
+            writer.write(f"POST {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                         f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("ascii")
+                         + body)
+            version, status, _ = (await reader.readline()).decode("latin-1").split(" ", 2)
+            headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if 'content-length' in headers:
+                payload = await reader.readexactly(int(headers['content-length']))
+                keep = version == "HTTP/1.1" and headers.get('connection', "").lower() != "close"
+            else:
+                payload = await reader.read()
+                keep = False
+        except BaseException:
+            writer.close()
+            raise
+        
+        if keep:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+        if int(status) != 200:
+            raise HTTPStatusError(int(status))
+        return json.loads(payload)
+    
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(model_path, server_args="", timeout=60.0):
+    """Start server.py on a free port, returns (process, /predict url) once it answers"""
+    port = _free_port()
+    command = [sys.executable, str(MODEL_DIR / "server.py"), "--model", model_path, "--port", str(port),
+               "--reload-interval", "0", *shlex.split(server_args)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server.py exited with code {process.returncode}: {' '.join(command)}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/model-status")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process, f"http://127.0.0.1:{port}/predict"
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"server.py did not answer on port {port} within {timeout:.0f}s")
+
+
+# ============================================================================
+# CPU
+# ============================================================================
+
+def _process_cpu(pid):
+    """User + system CPU seconds of a process"""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except OSError:
+        return None
+
+
+def _machine_cpu():
+    """(busy, total) jiffies over all cores"""
+    with open("/proc/stat") as f:
+        values = [int(v) for v in f.readline().split()[1:]]
+    idle = values[3] + values[4]  # idle + iowait
+    return sum(values) - idle, sum(values)
+
+
+class CPUMeter:
+    """Cores used by this process, the server process and the machine between start() and stop()"""
+    def __init__(self, server_pid=None):
+        self.server_pid = server_pid
+    
+    def start(self):
+        self._wall = time.monotonic()
+        self._self = time.process_time()
+        self._server = _process_cpu(self.server_pid)
+        self._machine = _machine_cpu()
+    
+    def stop(self):
+        wall = time.monotonic() - self._wall
+        server = _process_cpu(self.server_pid)
+        busy, total = _machine_cpu()
+        busy_delta, total_delta = busy - self._machine[0], total - self._machine[1]
+        return {
+            'generator_cores': (time.process_time() - self._self) / wall,
+            'server_cores': (server - self._server) / wall if server is not None and self._server is not None
+            else None,
+            'machine_busy': busy_delta / total_delta if total_delta else 0.0,
+            'cpu_count': os.cpu_count(),
+        }
+
+
+# ============================================================================
+# LOAD GENERATION
+# ============================================================================
+
+class LevelResult:
+    """Latencies and errors of one load level"""
+    def __init__(self):
+        self.latencies = []
+        self.errors = Counter()
+        self.sent = 0
+    
+    async def request(self, target, text, start, timeout):
+        """One call, latency measured from start (the scheduled arrival in open loop)"""
+        self.sent += 1
+        try:
+            await asyncio.wait_for(target.call(text), timeout)
+        except asyncio.TimeoutError:
+            self.errors['timeout'] += 1
+        except HTTPStatusError as e:
+            self.errors[f"http_{e.status}"] += 1
+        except Exception as e:  # connection resets, bad responses, scoring errors
+            self.errors[type(e).__name__] += 1
+        else:
+            self.latencies.append(asyncio.get_running_loop().time() - start)
+
+
+async def open_loop(target, texts, rate, duration, timeout, arrivals="poisson", max_in_flight=10000, seed=0):
+    """Requests arriving at rate per second for duration seconds, returns (result, wall seconds)"""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    result = LevelResult()
+    in_flight = set()
+    start = loop.time()
+    offset = 0.0
+    while True:
+        offset += rng.expovariate(rate) if arrivals == "poisson" else 1.0 / rate
+        if offset >= duration:
+            break
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= max_in_flight:
+            result.sent += 1
+            result.errors['dropped'] += 1
+            continue
+        task = asyncio.create_task(result.request(target, next(texts), start + offset, timeout))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return result, loop.time() - start
+
+
+async def closed_loop(target, texts, concurrency, duration, timeout):
+    """concurrency clients sending back to back for duration seconds, returns (result, wall seconds)"""
+    loop = asyncio.get_running_loop()
+    result = LevelResult()
+    start = loop.time()
+    end = start + duration
+    
+    async def client():
+        while loop.time() < end:
+            await result.request(target, next(texts), loop.time(), timeout)
+    
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return result, loop.time() - start
+
+
+def summarize(result, wall, cpu, slo_p99_ms, max_error_rate):
+    """JSON-ready statistics of one level"""
+    latencies = np.asarray(result.latencies) * 1000
+    n_errors = sum(result.errors.values())
+    error_rate = n_errors / result.sent if result.sent else 0.0
+    latency = None
+    if latencies.size:
+        latency = {f"p{p:g}": float(v) for p, v in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))}
+        latency.update({'mean': float(latencies.mean()), 'max': float(latencies.max())})
+    return {
+        'sent': result.sent,
+        'completed': int(latencies.size),
+        'errors': dict(result.errors),
+        'error_rate': error_rate,
+        'wall_s': wall,
+        'throughput_rps': latencies.size / wall if wall > 0 else 0.0,
+        'latency_ms': latency,
+        'cpu': cpu,
+        'slo_met': latency is not None and latency['p99'] <= slo_p99_ms and error_rate <= max_error_rate,
+    }
+
+
+async def run_levels(target, texts, args):
+    """Warm-up, then every open-loop rate and closed-loop concurrency level"""
+    stream = itertools.cycle(texts)
+    if args.warmup > 0:
+        await closed_loop(target, stream, max(args.concurrency or [1]), args.warmup, args.timeout)
+    
+    meter = CPUMeter(target.server_pid)
+    levels = []
+    for mode, values in (("open", args.rates), ("closed", args.concurrency)):
+        for value in values:
+            meter.start()
+            if mode == "open":
+                result, wall = await open_loop(target, stream, value, args.duration, args.timeout,
+                                               arrivals=args.arrivals, max_in_flight=args.max_in_flight,
+                                               seed=args.seed)
+            else:
+                result, wall = await closed_loop(target, stream, value, args.duration, args.timeout)
+            level = {'mode': mode, ('rate' if mode == "open" else 'concurrency'): value}
+            level.update(summarize(result, wall, meter.stop(), args.slo_p99_ms, args.max_error_rate))
+            levels.append(level)
+            print_level(level)
+    return levels
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+def _level_name(level):
+    return f"{level['rate']:g}/s open" if level['mode'] == "open" else f"{level['concurrency']} clients"
+
+
+def print_header():
+    print(f"\n{'level':>14} {'sent':>7} {'ok/s':>8} {'err %':>6} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'max ms':>8} {'gen cpu':>8} {'srv cpu':>8} {'box cpu':>8} {'SLO':>4}")
+
+
+def print_level(level):
+    lat = level['latency_ms'] or {}
+    cpu = level['cpu']
+    
+    def ms(key):
+        return f"{lat[key]:.1f}" if key in lat else "-"
+    
+    server = f"{cpu['server_cores']:.2f}" if cpu['server_cores'] is not None else "-"
+    print(f"{_level_name(level):>14} {level['sent']:>7} {level['throughput_rps']:>8.1f} "
+          f"{level['error_rate'] * 100:>6.2f} {ms('p50'):>7} {ms('p95'):>7} {ms('p99'):>7} {ms('max'):>8} "
+          f"{cpu['generator_cores']:>8.2f} {server:>8} {cpu['machine_busy']:>7.0%} "
+          f"{'✓' if level['slo_met'] else '✗':>4}")
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=MODEL_DIR, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_corpus(args):
+    """Texts to replay: --corpus (CSV/JSONL) or the synthetic generator, in a seeded order"""
+    if args.corpus:
+        texts = [text for _, text in _read_texts(args.corpus, text_field=args.text_field,
+                                                 text_column=args.text_column, sep=args.sep,
+                                                 skip_header=args.skip_header)]
+    else:
+        texts = make_texts(args.texts, seed=args.seed)
+    random.Random(args.seed).shuffle(texts)
+    if not texts:
+        raise SystemExit(f"No texts in {args.corpus}")
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of predict_text or a local /predict endpoint")
+    parser.add_argument("target", choices=("inproc", "http"))
+    parser.add_argument("--model", default=str(MODEL_DIR / "model.pkl"),
+                        help="model for inproc and --spawn-server")
+    parser.add_argument("--url", help="/predict URL of a running server (http target)")
+    parser.add_argument("--spawn-server", action="store_true", help="start server.py on a free port")
+    parser.add_argument("--server-args", default="", help="extra server.py arguments, e.g. '--no-batching'")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for its CPU use")
+    parser.add_argument("--threads", type=int, default=1, help="executor threads of the inproc target")
+    parser.add_argument("--result-cache-size", type=int, default=10000,
+                        help="prediction result cache of the inproc target (0 = off)")
+    
+    parser.add_argument("--corpus", help="usn;text;class CSV or JSONL to replay (default: synthetic)")
+    parser.add_argument("--texts", type=int, default=5000, help="synthetic texts")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--text-column", type=int, default=1)
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--skip-header", action="store_true")
+    
+    parser.add_argument("--rates", type=float, nargs="*", default=[], help="open-loop arrival rates (req/s)")
+    parser.add_argument("--concurrency", type=int, nargs="*", default=[],
+                        help="closed-loop client counts")
+    parser.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="closed-loop warm-up seconds")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds before a request counts as failed")
+    parser.add_argument("--max-in-flight", type=int, default=10000,
+                        help="open-loop arrivals beyond this many outstanding requests are dropped")
+    
+    parser.add_argument("--slo-p99-ms", type=float, default=50.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.001)
+    parser.add_argument("--min-throughput", type=float,
+                        help="exit 1 unless a level meeting the SLO reaches this many req/s")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+    if not args.rates and not args.concurrency:
+        args.concurrency = [1, 4, 16]
+    
+    texts = load_corpus(args)
+    server = None
+    if args.target == "inproc":
+        target = InProcessTarget(args.model, threads=args.threads, result_cache_size=args.result_cache_size)
+    else:
+        url = args.url
+        server_pid = args.server_pid
+        if args.spawn_server:
+            server, url = spawn_server(args.model, args.server_args)
+            server_pid = server.pid
+        elif not url:
+            parser.error("the http target needs --url or --spawn-server")
+        target = HTTPTarget(url, server_pid=server_pid)
+    
+    print(f"{target.description}: {len(texts)} texts, {args.duration:g}s per level, "
+          f"SLO p99 <= {args.slo_p99_ms:g} ms and errors <= {args.max_error_rate:.2%}")
+    print_header()
+    try:
+        levels = asyncio.run(run_levels(target, texts, args))
+    finally:
+        target.close()
+        if server is not None:
+            server.terminate()
+            server.wait()
+    
+    passing = [level for level in levels if level['slo_met']]
+    best = max(passing, key=lambda level: level['throughput_rps']) if passing else None
+    if best:
+        print(f"\nBest within SLO: {best['throughput_rps']:.1f} req/s at {_level_name(best)} "
+              f"(p99 {best['latency_ms']['p99']:.1f} ms)")
+    else:
+        print("\nNo level met the SLO")
+    
+    if args.output:
+        report = {
+            'meta': {
+                'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'git_commit': _git_commit(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'target': target.description,
+                'corpus': args.corpus or f"synthetic (seed {args.seed})",
+                'texts': len(texts),
+                'settings': {key: getattr(args, key) for key in (
+                    'duration', 'warmup', 'arrivals', 'timeout', 'max_in_flight', 'threads',
+                    'result_cache_size', 'server_args', 'slo_p99_ms', 'max_error_rate', 'seed')},
+            },
+            'levels': levels,
+            'best': best,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ {args.output} saved")
+    
+    if args.min_throughput is not None:
+        reached = best['throughput_rps'] if best else 0.0
+        if reached < args.min_throughput:
+            print(f"✗ {reached:.1f} req/s within SLO, below --min-throughput {args.min_throughput:g}")
+            sys.exit(1)
+        print(f"✓ {reached:.1f} req/s within SLO (>= {args.min_throughput:g})")
+
+
+if __name__ == "__main__":
+    main()
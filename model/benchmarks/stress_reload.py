@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Stress test for hot reload: predictions hammered while the artifact is swapped
+
+Builds two model versions (the given model and an update of it with
+relabeled texts, so their predictions differ), then repeatedly replaces
+the served artifact with one or the other while client threads call
+/predict and /predict/batch. Every response must be a success and match,
+exactly, what the model version it reports would predict for every text
+in it. Runs for the pickle and the binary artifact format.
+
+    python model/benchmarks/stress_reload.py
+    python model/benchmarks/stress_reload.py --swaps 100 --clients 16 --format bin
+"""
+
+import argparse
+import json
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from predict import load_model, predict_batch
+from update_model import update_model, _artifact
+from artifact import save_artifact
+from server import create_app
+from corpus import make_texts
+
+
+def write_version(model_data, path, fmt):
+    if fmt == "bin":
+        save_artifact(model_data, path)
+    else:
+        with open(path, "wb") as f:
+            pickle.dump(_artifact(model_data), f)
+
+
+def replace_with(src, dst):
+    """Copy src over dst the way the training scripts do (.tmp + rename)"""
+    temp = dst.with_name(dst.name + ".tmp")
+    shutil.copyfile(src, temp)
+    os.replace(temp, dst)
+
+
+def run(fmt, base, texts, args):
+    """One stress run; returns (ok, summary line)"""
+    rng = random.Random(1)
+    labels = list(base['map_target'])
+    preds = predict_batch(texts[:2000], base)
+    relabeled = [labels[(labels.index(p['label']) + 1) % len(labels)] for p in preds]
+    updated = update_model(base, texts[:2000], relabeled)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        versions = {}
+        for model_data in (base, updated):
+            path = tmp / f"model.v{model_data.get('version', 1)}.{fmt}"
+            write_version(model_data, path, fmt)
+            versions[model_data.get('version', 1)] = path
+        
+        # Expected output of each version, as it comes back through JSON
+        expected = {}
+        for version, path in versions.items():
+            results = predict_batch(texts, load_model(str(path)))
+            expected[version] = json.loads(json.dumps(results))
+        changed = sum(a != b for a, b in zip(*expected.values()))
+        
+        target = tmp / f"model.{fmt}"
+        replace_with(versions[min(versions)], target)
+        app = create_app(target, max_batch_size=32, max_wait_ms=1.0, reload_interval=0.005)
+        registry = app.extensions['registry']
+        
+        done = threading.Event()
+        failures = []
+        seen = {}
+        lock = threading.Lock()
+        
+        def client(k):
+            client_rng = random.Random(k)
+            http = app.test_client()
+            n = 0
+            while not done.is_set():
+                if client_rng.random() < 0.7:
+                    idx = [client_rng.randrange(len(texts))]
+                    response = http.post("/predict", json={'text': texts[idx[0]]})
+                else:
+                    idx = [client_rng.randrange(len(texts)) for _ in range(client_rng.randint(2, 50))]
+                    response = http.post("/predict/batch", json={'texts': [texts[i] for i in idx]})
+                n += 1
+                body = response.get_json()
+                if response.status_code != 200 or not body or not body.get('success'):
+                    failures.append(f"HTTP {response.status_code}: {body}")
+                    continue
+                version = body['model']['version']
+                results = body['data'] if isinstance(body['data'], list) else [body['data']]
+                if version not in expected or results != [expected[version][i] for i in idx]:
+                    failures.append(f"response does not match model version {version} ({len(idx)} texts)")
+            with lock:
+                seen[k] = n
+        
+        threads = [threading.Thread(target=client, args=(k,)) for k in range(args.clients)]
+        for t in threads:
+            t.start()
+        
+        start = time.perf_counter()
+        order = sorted(versions)
+        for i in range(args.swaps):
+            time.sleep(rng.uniform(0.01, 0.05))
+            replace_with(versions[order[(i + 1) % len(order)]], target)
+            # Wait for the watcher so every swap is actually served
+            deadline = time.perf_counter() + 5.0
+            while registry.generation < i + 2 and time.perf_counter() < deadline:
+                time.sleep(0.001)
+        time.sleep(0.05)
+        done.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        
+        registry.stop()
+        app.extensions['batcher'].close()
+        stats = registry.stats()
+    
+    ok = not failures and stats['reloads'] == args.swaps and stats['failures'] == 0
+    summary = (f"{fmt}: {sum(seen.values())} requests in {elapsed:.1f}s across {stats['reloads']}/{args.swaps} "
+               f"swaps ({changed} of {len(texts)} texts differ between versions), "
+               f"reload mean {stats['mean_reload_ms']:.1f} ms / max {stats['max_reload_ms']:.1f} ms, "
+               f"{len(failures)} failures")
+    if failures:
+        summary += "\n    first failure: " + failures[0]
+    return ok, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=str(Path(__file__).resolve().parent.parent / "model.pkl"))
+    parser.add_argument("--swaps", type=int, default=40)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--format", choices=["pkl", "bin"], nargs="+", default=["pkl", "bin"])
+    args = parser.parse_args()
+    
+    base = load_model(args.model)
+    texts = make_texts(3000, seed=11)
+    
+    all_ok = True
+    for fmt in args.format:
+        ok, summary = run(fmt, base, texts, args)
+        all_ok = all_ok and ok
+        print(f"{'✓' if ok else '✗'} {summary}")
+    
+    if not all_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
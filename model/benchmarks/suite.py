@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for the preprocessing, vectorization and scoring hot paths
+
+`run` times every stage on the deterministic synthetic corpus (corpus.py):
+microbenchmarks for text_cleaning, correct_word, the spelling index and
+correction cache, process_tokens, TFIDFVectorizer.transform and
+MultinomialNB.predict_proba at several vocabulary sizes, plus end-to-end
+training and predict_text/predict_batch at several corpus sizes. Results
+are written as JSON; `compare` flags every benchmark whose time per item
+grew by more than --threshold against a saved baseline (exit code 1).
+
+    python model/benchmarks/suite.py run --output baseline.json
+    python model/benchmarks/suite.py run --quick --output current.json
+    python model/benchmarks/suite.py compare baseline.json current.json --threshold 0.15
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from train_model import (
+    text_cleaning, correct_word, process_tokens, preprocess_text, build_word_freq, fit_dataset,
+    SpellingIndex, CorrectionCache, TFIDFVectorizer, MultinomialNB, MIN_COUNT
+)
+from predict import predict_text, predict_batch
+from corpus import make_texts, make_labeled
+
+PRESETS = {
+    'quick': {'micro_docs': 1000, 'sizes': [1000, 4000], 'vocab_sizes': [200, 2000], 'repeat': 3},
+    'full': {'micro_docs': 5000, 'sizes': [1000, 5000, 20000], 'vocab_sizes': [200, 2000, 20000],
+             'repeat': 5},
+}
+DENSE_LIMIT = 2 * 10**7  # skip dense matrices with more cells than this
+
+
+def timings(func, repeat):
+    """Wall times of repeat calls to func (garbage collector paused)"""
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+            del result
+    finally:
+        gc.enable()
+    return times
+
+
+class Recorder:
+    """Collects one result per benchmark and prints it as it goes"""
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+    
+    def time(self, name, func, items, repeat=None, **params):
+        times = timings(func, repeat or self.repeat)
+        best = min(times)
+        self.results[name] = {
+            'params': params,
+            'items': items,
+            'repeat': len(times),
+            'best_s': best,
+            'median_s': float(np.median(times)),
+            'per_item_us': best / max(items, 1) * 1e6
+        }
+        print(f"  {name:<48} {best * 1000:>10.2f} ms {best / max(items, 1) * 1e6:>11.2f} µs/item")
+
+
+def _lexicon(docs):
+    """vocab, word_freq and spelling index built like fit_dataset does"""
+    word_freq = build_word_freq(docs)
+    vocab = {w for w, c in word_freq.items() if c >= MIN_COUNT}
+    return vocab, word_freq, SpellingIndex(max_dist=2).build(vocab, word_freq)
+
+
+def micro_benchmarks(rec, n_docs, vocab_sizes, corpus_vocab, seed):
+    """Per-stage timings on one synthetic corpus"""
+    texts = make_texts(n_docs, seed=seed, vocab_size=corpus_vocab)
+    print(f"\nStages ({n_docs} texts, corpus vocabulary {corpus_vocab})")
+    
+    rec.time("preprocess/text_cleaning", lambda: [text_cleaning(t) for t in texts], len(texts))
+    docs = [text_cleaning(t).split() for t in texts]
+    n_tokens = sum(map(len, docs))
+    vocab, word_freq, index = _lexicon(docs)
+    
+    oov = sorted({w for doc in docs for w in doc if w not in vocab})
+    sample = oov[:20]
+    small_vocab = set(sorted(vocab, key=lambda w: -word_freq[w])[:1000])
+    rec.time("preprocess/correct_word[brute force, vocab=1000]",
+             lambda: [correct_word(w, small_vocab, word_freq) for w in sample], len(sample), repeat=1)
+    rec.time("preprocess/spelling_index.lookup", lambda: [index.lookup(w) for w in oov], len(oov))
+    
+    def cached():
+        corrector = CorrectionCache(index, max_dist=2)
+        return [[corrector.lookup(w) for w in doc] for doc in docs]
+    rec.time("preprocess/correction_cache (cold per run)", cached, n_tokens)
+    
+    corrector = CorrectionCache(index, max_dist=2)
+    corrected = [[corrector.lookup(w) for w in doc] for doc in docs]
+    rec.time("preprocess/process_tokens", lambda: [process_tokens(d, drop_empty=True) for d in corrected],
+             n_tokens)
+    rec.time("preprocess/preprocess_text (warm cache)",
+             lambda: [preprocess_text(t, vocab, word_freq, index=corrector) for t in texts], len(texts))
+    
+    processed = [process_tokens(d, drop_empty=True) for d in corrected]
+    y = np.arange(len(processed)) % 3
+    for n_features in vocab_sizes:
+        vectorizer = TFIDFVectorizer(max_features=n_features).fit(processed)
+        tag = f"features={vectorizer.n_features}"
+        X_sparse = vectorizer.transform(processed, sparse=True)
+        model = MultinomialNB(alpha=2.0).fit(X_sparse, y)
+        rec.time(f"vectorize/transform_sparse[{tag}]",
+                 lambda: vectorizer.transform(processed, sparse=True), len(processed), features=n_features)
+        rec.time(f"nb/predict_proba_sparse[{tag}]", lambda: model.predict_proba(X_sparse), len(processed),
+                 features=n_features)
+        if len(processed) * vectorizer.n_features <= DENSE_LIMIT:
+            X_dense = vectorizer.transform(processed)
+            rec.time(f"vectorize/transform_dense[{tag}]", lambda: vectorizer.transform(processed),
+                     len(processed), features=n_features)
+            rec.time(f"nb/predict_proba_dense[{tag}]", lambda: model.predict_proba(X_dense),
+                     len(processed), features=n_features)
+            del X_dense
+
+
+def end_to_end_benchmarks(rec, sizes, corpus_vocab, seed, n_predict=500):
+    """Training and prediction on labeled corpora of several sizes"""
+    for n_docs in sizes:
+        texts, labels = make_labeled(n_docs, seed=seed, vocab_size=corpus_vocab)
+        dataset = pd.DataFrame({'usn': range(n_docs), 'text': texts, 'class': labels})
+        print(f"\nEnd to end ({n_docs} labeled texts)")
+        
+        trained = {}
+        def train():
+            with contextlib.redirect_stdout(io.StringIO()):
+                trained['artifact'], _ = fit_dataset(dataset.copy())
+        rec.time(f"train/fit_dataset[docs={n_docs}]", train, n_docs, repeat=1, docs=n_docs)
+        
+        artifact = trained['artifact']
+        model_data = dict(artifact, result_cache=None)
+        model_data['corrector'] = CorrectionCache(artifact['spelling_index'], artifact['correction_table'],
+                                                  max_dist=2)
+        queries = make_texts(n_predict, seed=seed + 1, vocab_size=corpus_vocab)
+        predict_batch(queries, model_data)  # warm the correction cache
+        rec.time(f"predict/predict_text[docs={n_docs}]",
+                 lambda: [predict_text(t, model_data) for t in queries], n_predict, docs=n_docs)
+        rec.time(f"predict/predict_batch[docs={n_docs}]", lambda: predict_batch(queries, model_data),
+                 n_predict, docs=n_docs)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=Path(__file__).resolve().parent, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    preset = dict(PRESETS['quick' if args.quick else 'full'])
+    for key in ('micro_docs', 'sizes', 'vocab_sizes', 'repeat'):
+        if getattr(args, key) is not None:
+            preset[key] = getattr(args, key)
+    
+    rec = Recorder(preset['repeat'])
+    start = time.perf_counter()
+    if not args.skip_micro:
+        micro_benchmarks(rec, preset['micro_docs'], preset['vocab_sizes'], args.corpus_vocab, args.seed)
+    if not args.skip_end_to_end:
+        end_to_end_benchmarks(rec, preset['sizes'], args.corpus_vocab, args.seed)
+    
+    report = {
+        'meta': {
+            'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'settings': dict(preset, corpus_vocab=args.corpus_vocab, seed=args.seed),
+            'total_s': time.perf_counter() - start
+        },
+        'results': rec.results
+    }
+    print(f"\n{len(rec.results)} benchmarks in {report['meta']['total_s']:.1f}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ {args.output} saved")
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    
+    base, cur = baseline['results'], current['results']
+    print(f"baseline {baseline['meta'].get('git_commit')} ({baseline['meta']['created_at']}) vs "
+          f"current {current['meta'].get('git_commit')} ({current['meta']['created_at']})")
+    if baseline['meta'].get('settings') != current['meta'].get('settings'):
+        print("! runs used different settings, only benchmarks present in both are compared")
+    
+    regressions = []
+    print(f"\n{'benchmark':<48} {'baseline µs':>12} {'current µs':>11} {'change':>8}")
+    for name in sorted(set(base) & set(cur)):
+        before, after = base[name]['per_item_us'], cur[name]['per_item_us']
+        change = after / before - 1.0 if before else 0.0
+        flag = ""
+        if change > args.threshold and after - before > args.min_delta_us:
+            flag = "  ✗ slower"
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = "  ✓ faster"
+        print(f"{name:<48} {before:>12.2f} {after:>11.2f} {change:>+7.1%}{flag}")
+    
+    for name in sorted(set(base) - set(cur)):
+        print(f"{name:<48} missing from current run")
+    for name in sorted(set(cur) - set(base)):
+        print(f"{name:<48} new (no baseline)")
+    
+    if regressions:
+        print(f"\n✗ {len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\n✓ no benchmark slower than baseline by more than {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    p = sub.add_parser("run", help="run the suite and write JSON results")
+    p.add_argument("--output", help="JSON file for the results")
+    p.add_argument("--quick", action="store_true", help="smaller corpora and fewer repeats")
+    p.add_argument("--micro-docs", type=int, help="texts used for the stage benchmarks")
+    p.add_argument("--sizes", type=int, nargs="+", help="corpus sizes for training/prediction")
+    p.add_argument("--vocab-sizes", type=int, nargs="+", help="max_features for vectorize/NB benchmarks")
+    p.add_argument("--corpus-vocab", type=int, default=5000, help="distinct base words in the corpus")
+    p.add_argument("--repeat", type=int, help="runs per benchmark (best is reported)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--skip-micro", action="store_true")
+    p.add_argument("--skip-end-to-end", action="store_true")
+    p.set_defaults(func=run)
+    
+    p = sub.add_parser("compare", help="flag regressions against a saved baseline")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=0.15,
+                   help="relative slowdown per item that counts as a regression (default 0.15)")
+    p.add_argument("--min-delta-us", type=float, default=0.0,
+                   help="ignore slowdowns smaller than this many µs per item")
+    p.set_defaults(func=compare)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+"""
+Sharded bulk scoring for backfills over very large CSV/JSONL files
+
+predict.py --input preprocesses in a pool but scores in one process, and
+a pool started with model.pkl would unpickle a private copy of the
+lexicon in every worker. Here the input is planned into shards of
+--shard-size records (byte ranges cut at record boundaries, so a CSV
+text with quoted newlines is never split), and every worker process
+scores whole shards with the model opened as a memory-mapped model.bin:
+the arrays and lookup tables are the same page-cache pages in every
+worker, and nothing but the model path is sent to them. A model.pkl is
+converted to model.bin once, into the work directory.
+
+Each shard is written to <work dir>/shard-NNNNN.jsonl, then checkpointed
+by shard-NNNNN.json (texts, bytes, worker, seconds). Rerunning the same
+command after a crash only scores shards without a checkpoint; a work
+directory planned for a different input, model or read options is
+cleared. The shards are finally concatenated in input order, so the
+output is identical to predict.py --input given the same model.bin, or a
+model.pkl saved with a Lexicon. A model.pkl from before the Lexicon
+keeps the vocab as a set, whose order breaks spelling-correction ties
+and changes with PYTHONHASHSEED, so two processes loading it (here,
+the conversion to model.bin) can correct a few tokens differently.
+
+    python model/bulk_score.py comments.jsonl scores.jsonl --model model/model.bin --workers 8
+    python model/bulk_score.py comments.csv scores.jsonl --shard-size 200000 --keep-shards --report bulk.json
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from parallel import resolve_workers
+from artifact import is_artifact, save_artifact
+from predict import load_model, is_jsonl, parse_texts, write_scores
+
+MANIFEST_VERSION = 1
+
+# Model and read options of this worker, set by _init_worker
+_state = {}
+
+
+def plan_shards(path, shard_size, sep=";", skip_header=False):
+    """[(start, end, first, records)] byte ranges of up to shard_size records.
+    
+    first is the number of the shard's first record (the id of records
+    without one). Records are JSONL lines, or CSV records as csv.reader
+    reads them (a quoted field may span lines).
+    """
+    jsonl = is_jsonl(path)
+    shards = []
+    with open(path, "rb") as f:
+        offset = 0
+        
+        def lines():
+            nonlocal offset
+            for raw in f:
+                offset += len(raw)
+                yield raw.decode("utf-8")
+        
+        records = lines() if jsonl else csv.reader(lines(), delimiter=sep)
+        if skip_header and not jsonl:
+            next(records, None)
+        start, first, count = offset, 0, 0
+        for _ in records:
+            count += 1
+            if count == shard_size:
+                shards.append((start, offset, first, count))
+                start, first, count = offset, first + count, 0
+        if count:
+            shards.append((start, offset, first, count))
+    return shards
+
+
+def _signature(path):
+    st = os.stat(path)
+    return {'path': str(Path(path).resolve()), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _init_worker(model_path, input_path, read_options, batch_size):
+    """Pool initializer: open the memory-mapped model once per worker"""
+    start = time.perf_counter()
+    _state.clear()
+    _state.update({
+        'model_data': load_model(model_path),
+        'input_path': input_path,
+        'read_options': read_options,
+        'batch_size': batch_size,
+        'pid': os.getpid(),
+    })
+    _state['load_seconds'] = time.perf_counter() - start
+
+
+def _score_shard(number, shard, work_dir):
+    """Score one shard into its JSONL file, then write its checkpoint; returns the checkpoint"""
+    start_offset, end_offset, first, _ = shard
+    start = time.perf_counter()
+    with open(_state['input_path'], "rb") as f:
+        f.seek(start_offset)
+        data = f.read(end_offset - start_offset)
+    jsonl = is_jsonl(_state['input_path'])
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", newline=None if jsonl else "")
+    records = parse_texts(lines, jsonl, first=first, **_state['read_options'])
+    
+    output = Path(work_dir) / f"shard-{number:05d}.jsonl"
+    # Per process: a worker orphaned by a crashed run may still be writing the same shard
+    temp = output.with_name(f"{output.name}.{_state['pid']}.tmp")
+    with open(temp, "w", encoding="utf-8") as out:
+        n = write_scores(records, out, _state['model_data'], batch_size=_state['batch_size'])
+    temp.replace(output)
+    
+    checkpoint = {
+        'shard': number,
+        'texts': n,
+        'bytes': output.stat().st_size,
+        'worker': _state['pid'],
+        'seconds': time.perf_counter() - start,
+        'load_seconds': _state['load_seconds'],
+    }
+    path = output.with_suffix(".json")
+    temp = path.with_name(f"{path.name}.{_state['pid']}.tmp")
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    temp.replace(path)
+    return checkpoint
+
+
+def _completed(work_dir, n_shards):
+    """Checkpoints of shards whose output is complete"""
+    done = {}
+    for number in range(n_shards):
+        path = Path(work_dir) / f"shard-{number:05d}.json"
+        output = path.with_suffix(".jsonl")
+        if not path.exists() or not output.exists():
+            continue
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint['bytes'] == output.stat().st_size:
+            done[number] = checkpoint
+    return done
+
+
+def _prepare_work_dir(work_dir, input_path, model_path, shard_size, read_options):
+    """(manifest, model.bin path), reusing the plan and model of an interrupted run of the same job"""
+    work_dir = Path(work_dir)
+    key = {
+        'version': MANIFEST_VERSION,
+        'input': _signature(input_path),
+        'model': _signature(model_path),
+        'shard_size': shard_size,
+        'read_options': read_options,
+    }
+    manifest_path = work_dir / "manifest.json"
+    if manifest_path.exists():
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest['key'] == key:
+            print(f"Resuming from {work_dir}")
+            return manifest, manifest['model_path']
+        print(f"{work_dir} was planned for another input, model or options, starting over")
+        shutil.rmtree(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    
+    if is_artifact(model_path):
+        mapped = key['model']['path']
+    else:
+        # Workers map model.bin instead of each unpickling its own copy of model.pkl
+        mapped = str((work_dir / "model.bin").resolve())
+        save_artifact(load_model(model_path, result_cache_size=0), mapped)
+        print(f"✓ {model_path} converted to {mapped}")
+    
+    start = time.perf_counter()
+    shards = plan_shards(input_path, shard_size, sep=read_options['sep'],
+                         skip_header=read_options['skip_header'])
+    print(f"Planned {len(shards)} shards of up to {shard_size} records in {time.perf_counter() - start:.2f}s")
+    manifest = {'key': key, 'model_path': mapped, 'shards': shards}
+    with open(manifest_path.with_name("manifest.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    manifest_path.with_name("manifest.json.tmp").replace(manifest_path)
+    return manifest, mapped
+
+
+def merge_shards(work_dir, n_shards, output_path):
+    """Concatenate the shard outputs in input order into output_path, atomically"""
+    output_path = Path(output_path)
+    temp = output_path.with_name(output_path.name + ".tmp")
+    with open(temp, "wb") as out:
+        for number in range(n_shards):
+            with open(Path(work_dir) / f"shard-{number:05d}.jsonl", "rb") as f:
+                shutil.copyfileobj(f, out, 1 << 20)
+    temp.replace(output_path)
+
+
+def worker_throughput(checkpoints):
+    """Per-worker shards, texts, busy seconds and texts/sec, from the checkpoints of one run"""
+    workers = {}
+    for c in checkpoints:
+        w = workers.setdefault(c['worker'], {'worker': c['worker'], 'shards': 0, 'texts': 0, 'seconds': 0.0,
+                                             'load_seconds': c['load_seconds']})
+        w['shards'] += 1
+        w['texts'] += c['texts']
+        w['seconds'] += c['seconds']
+    for w in workers.values():
+        w['texts_per_sec'] = w['texts'] / w['seconds'] if w['seconds'] > 0 else 0.0
+    return sorted(workers.values(), key=lambda w: w['worker'])
+
+
+def score_sharded(input_path, output_path, model_path="model/model.pkl", workers=0, shard_size=100000,
+                  work_dir=None, batch_size=1024, keep_shards=False, text_field="text", text_column=1,
+                  sep=";", skip_header=False):
+    """Score input_path into output_path (same JSONL as predict.score_file), returns a report dict"""
+    start = time.perf_counter()
+    work_dir = Path(work_dir or f"{output_path}.shards")
+    read_options = {'text_field': text_field, 'text_column': text_column, 'sep': sep,
+                    'skip_header': skip_header}
+    manifest, mapped = _prepare_work_dir(work_dir, input_path, model_path, shard_size, read_options)
+    shards = manifest['shards']
+    
+    done = _completed(work_dir, len(shards))
+    todo = [number for number in range(len(shards)) if number not in done]
+    if done:
+        print(f"  {len(done)}/{len(shards)} shards already scored "
+              f"({sum(c['texts'] for c in done.values())} texts)")
+    
+    # The shard reader parses the planned byte ranges itself, the header is already skipped
+    initargs = (mapped, str(input_path), dict(read_options, skip_header=False), batch_size)
+    workers = min(resolve_workers(workers), max(len(todo), 1))
+    checkpoints = []
+    scored = sum(c['texts'] for c in done.values())
+    total = sum(s[3] for s in shards)
+    
+    def progress(checkpoint):
+        nonlocal scored
+        checkpoints.append(checkpoint)
+        scored += checkpoint['texts']
+        elapsed = time.perf_counter() - start
+        print(f"  shard {checkpoint['shard'] + 1}/{len(shards)}: {checkpoint['texts']} texts in "
+              f"{checkpoint['seconds']:.1f}s (worker {checkpoint['worker']}), "
+              f"{scored}/{total} records, {elapsed:.0f}s elapsed")
+    
+    if workers == 1:
+        _init_worker(*initargs)
+        for number in todo:
+            progress(_score_shard(number, shards[number], str(work_dir)))
+    elif todo:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_score_shard, number, shards[number], str(work_dir)) for number in todo]
+            for future in as_completed(futures):
+                progress(future.result())
+    t_score = time.perf_counter() - start
+    
+    merge_start = time.perf_counter()
+    merge_shards(work_dir, len(shards), output_path)
+    t_merge = time.perf_counter() - merge_start
+    if not keep_shards:
+        shutil.rmtree(work_dir)
+    
+    n_texts = sum(c['texts'] for c in checkpoints) + sum(c['texts'] for c in done.values())
+    return {
+        'texts': n_texts,
+        'shards': len(shards),
+        'resumed_shards': len(done),
+        'scored_texts': sum(c['texts'] for c in checkpoints),
+        'workers': worker_throughput(checkpoints),
+        'score_seconds': t_score,
+        'merge_seconds': t_merge,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def print_report(report):
+    print(f"\n{'worker':>10} {'shards':>7} {'texts':>10} {'busy s':>9} {'texts/s':>9} {'load ms':>8}")
+    for w in report['workers']:
+        print(f"{w['worker']:>10} {w['shards']:>7} {w['texts']:>10} {w['seconds']:>9.2f} "
+              f"{w['texts_per_sec']:>9.0f} {w['load_seconds'] * 1000:>8.1f}")
+    rate = report['scored_texts'] / report['score_seconds'] if report['score_seconds'] > 0 else 0.0
+    print(f"\nScored {report['scored_texts']} texts in {report['score_seconds']:.2f}s ({rate:.0f} texts/sec), "
+          f"{report['resumed_shards']}/{report['shards']} shards from checkpoints, "
+          f"merge {report['merge_seconds']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a large CSV/JSONL file in shards over worker processes")
+    parser.add_argument("input", help="CSV or JSONL file to score")
+    parser.add_argument("output", help="JSONL output path")
+    parser.add_argument("--model", default="model/model.pkl", help="model.bin (or model.pkl, converted once)")
+    parser.add_argument("--workers", type=int, default=0, help="scoring processes (0 = all cores)")
+    parser.add_argument("--shard-size", type=int, default=100000, help="records per shard")
+    parser.add_argument("--work-dir", help="shard outputs and checkpoints (default: <output>.shards)")
+    parser.add_argument("--keep-shards", action="store_true", help="keep the work directory after merging")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--text-field", default="text", help="JSONL field holding the text")
+    parser.add_argument("--text-column", type=int, default=1,
+                        help="CSV column holding the text (training format usn;text;class)")
+    parser.add_argument("--sep", default=";", help="CSV separator")
+    parser.add_argument("--skip-header", action="store_true", help="CSV has a header row")
+    parser.add_argument("--report", help="write the run and per-worker throughput as JSON")
+    args = parser.parse_args()
+    
+    report = score_sharded(args.input, args.output, model_path=args.model, workers=args.workers,
+                           shard_size=args.shard_size, work_dir=args.work_dir, batch_size=args.batch_size,
+                           keep_shards=args.keep_shards, text_field=args.text_field,
+                           text_column=args.text_column, sep=args.sep, skip_header=args.skip_header)
+    print_report(report)
+    print(f"✓ {report['texts']} texts -> {args.output}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
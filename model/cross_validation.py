@@ -0,0 +1,196 @@
+"""
+Cross-validation for MultinomialNB from sufficient statistics
+
+A MultinomialNB is nothing but per-class sample counts and per-class
+feature sums, so the model fitted on "every fold but f" is the total
+counts minus fold f's counts. FoldCounts collects the counts of all folds
+in a single pass over the matrix (one bincount keyed on fold and class),
+and the out-of-fold scores of every row come from one more pass that looks
+up the feature log-probabilities of the row's own fold model. Neither
+pass copies or reorders the feature matrix, and the cost hardly depends
+on the number of folds.
+"""
+
+import numpy as np
+
+from train_model import MultinomialNB, kfold_assignment, evaluate, _is_sparse, SEED
+from metrics import precision_recall_f1
+
+
+def stratified_kfold_assignment(y, n_folds=5, random_state=SEED):
+    """Fold of every sample, with each class spread as evenly as possible over the folds"""
+    y = np.asarray(y).ravel()
+    rng = np.random.RandomState(random_state)
+    folds = np.empty(len(y), dtype=np.int64)
+    offset = 0
+    for cls in np.unique(y):
+        rows = rng.permutation(np.flatnonzero(y == cls))
+        # Continue the round-robin across classes so fold sizes stay balanced too
+        folds[rows] = (offset + np.arange(len(rows))) % n_folds
+        offset += len(rows)
+    return folds
+
+
+def model_from_counts(class_count, feature_count, classes, alpha=1.0):
+    """MultinomialNB with the given counts, as if fitted on the samples behind them"""
+    model = MultinomialNB(alpha=alpha)
+    model.classes_ = np.asarray(classes)
+    model.n_features_ = feature_count.shape[1]
+    model.class_count_ = np.asarray(class_count, dtype=np.float64)
+    model.feature_count_ = np.asarray(feature_count, dtype=np.float64)
+    # A class missing from the training folds gets a log prior of -inf and is never predicted,
+    # like a model fitted without that class
+    with np.errstate(divide="ignore"):
+        model._update_log_probs()
+    return model
+
+
+class FoldCounts:
+    """Per-fold, per-class NB counts, accumulated batch by batch.
+    
+    Batches may come from a stream (see train_model_streaming); folds gives
+    the fold of every row of the batch.
+    """
+    def __init__(self, classes, n_features, n_folds=5):
+        self.classes_ = np.unique(np.asarray(classes))
+        self.n_features = int(n_features)
+        self.n_folds = int(n_folds)
+        n_classes = self.classes_.size
+        self.class_count = np.zeros((self.n_folds, n_classes), dtype=np.float64)
+        self.feature_count = np.zeros((self.n_folds, n_classes, self.n_features), dtype=np.float64)
+    
+    def add(self, X, y, folds):
+        """Count one batch (dense array or CSR matrix) in a single pass"""
+        y = np.asarray(y).ravel()
+        folds = np.asarray(folds, dtype=np.int64).ravel()
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        n_classes = self.classes_.size
+        
+        y_enc = np.minimum(np.searchsorted(self.classes_, y), n_classes - 1)
+        if y.size and not np.array_equal(self.classes_[y_enc], y):
+            raise ValueError(f"y contains labels not in classes {self.classes_.tolist()}")
+        if folds.size and (folds.min() < 0 or folds.max() >= self.n_folds):
+            raise ValueError(f"folds must be in [0, {self.n_folds})")
+        
+        # One group per (fold, class) pair
+        group = folds * n_classes + y_enc
+        n_groups = self.n_folds * n_classes
+        self.class_count += np.bincount(group, minlength=n_groups).reshape(self.n_folds, n_classes)
+        
+        if _is_sparse(X):
+            data = np.asarray(X.data, dtype=np.float64)
+            if (data < 0).any():
+                raise ValueError("Multinomial Naive Bayes requires non-negative feature values")
+            rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+            flat = group[rows] * self.n_features + np.asarray(X.indices)
+            counts = np.bincount(flat, weights=data, minlength=n_groups * self.n_features)
+        else:
+            X = np.asarray(X, dtype=np.float64)
+            if (X < 0).any():
+                raise ValueError("Multinomial Naive Bayes requires non-negative feature values")
+            onehot = np.zeros((X.shape[0], n_groups), dtype=np.float64)
+            onehot[np.arange(X.shape[0]), group] = 1.0
+            counts = onehot.T @ X
+        self.feature_count += counts.reshape(self.n_folds, n_classes, self.n_features)
+        return self
+    
+    def total_model(self, alpha=1.0):
+        """Model fitted on every counted sample"""
+        return model_from_counts(self.class_count.sum(axis=0), self.feature_count.sum(axis=0),
+                                 self.classes_, alpha)
+    
+    def fold_model(self, fold, alpha=1.0):
+        """Model fitted on every fold except fold"""
+        class_count = self.class_count.sum(axis=0) - self.class_count[fold]
+        feature_count = np.maximum(self.feature_count.sum(axis=0) - self.feature_count[fold], 0.0)
+        return model_from_counts(class_count, feature_count, self.classes_, alpha)
+    
+    def fold_models(self, alpha=1.0):
+        return [self.fold_model(f, alpha) for f in range(self.n_folds)]
+    
+    def first_features(self, n_features):
+        """Counts restricted to the first n_features columns (shares no memory with self)"""
+        part = FoldCounts(self.classes_, 0, self.n_folds)
+        part.n_features = min(int(n_features), self.n_features)
+        part.class_count = self.class_count.copy()
+        part.feature_count = self.feature_count[:, :, :part.n_features].copy()
+        return part
+
+
+def fold_log_joint(X, folds, models):
+    """Log-joint of every row under the model of its own fold (models[folds[i]])"""
+    folds = np.asarray(folds, dtype=np.int64).ravel()
+    flp = np.stack([m.feature_log_prob_ for m in models])  # (n_folds, n_classes, n_features)
+    prior = np.stack([m.class_log_prior_ for m in models])
+    n_samples, n_classes = X.shape[0], flp.shape[1]
+    log_likelihood = np.empty((n_samples, n_classes), dtype=np.float64)
+    
+    if _is_sparse(X):
+        rows = np.repeat(np.arange(n_samples), np.diff(X.indptr))
+        data = np.asarray(X.data, dtype=np.float64)
+        # Flat offset of (fold of the row, feature) in each class's slice of flp
+        base = folds[rows] * (n_classes * flp.shape[2]) + np.asarray(X.indices)
+        flat = flp.reshape(-1)
+        for k in range(n_classes):
+            contrib = flat[base + k * flp.shape[2]] * data
+            log_likelihood[:, k] = np.bincount(rows, weights=contrib, minlength=n_samples)
+    else:
+        X = np.asarray(X, dtype=np.float64)
+        for f in range(len(models)):
+            idx = np.flatnonzero(folds == f)
+            if idx.size:
+                log_likelihood[idx] = X[idx] @ flp[f].T
+    return log_likelihood + prior[folds]
+
+
+def cross_validate(X, y, alpha=2.0, n_folds=5, stratified=False, random_state=SEED, folds=None,
+                   counts=None):
+    """K-fold (or stratified k-fold) cross-validation of MultinomialNB.
+    
+    Folds default to nb_kfold's shuffle, or stratified_kfold_assignment with
+    stratified=True; pass folds to use your own. counts may be a FoldCounts
+    already accumulated over X, y and those folds, so several alphas can be
+    evaluated without counting again. Returns a dict with the metrics of
+    every fold, their mean and std, and the out-of-fold predictions and
+    probabilities of every sample.
+    """
+    y = np.asarray(y).ravel()
+    if folds is not None:
+        folds = np.asarray(folds, dtype=np.int64).ravel()
+        n_folds = int(folds.max()) + 1 if folds.size else n_folds
+    elif stratified:
+        folds = stratified_kfold_assignment(y, n_folds, random_state)
+    else:
+        folds = kfold_assignment(len(y), n_folds, random_state)
+    
+    if counts is None:
+        counts = FoldCounts(np.unique(y), X.shape[1], n_folds).add(X, y, folds)
+    models = counts.fold_models(alpha)
+    log_joint = fold_log_joint(X, folds, models)
+    classes = counts.classes_
+    pred = classes[np.argmax(log_joint, axis=1)]
+    proba = MultinomialNB._proba_from_log_joint(log_joint)
+    
+    per_fold = []
+    for f in range(n_folds):
+        val = folds == f
+        n_val = int(np.count_nonzero(val))
+        if n_val == 0:
+            continue
+        metrics = evaluate(y[val], pred[val], proba[val], classes=classes)
+        metrics['macro_f1'] = float(precision_recall_f1(y[val], pred[val], average="macro")[2])
+        metrics.update({'fold': f, 'n_train': len(y) - n_val, 'n_val': n_val})
+        per_fold.append(metrics)
+    
+    names = ['accuracy', 'precision', 'recall', 'f1', 'macro_f1', 'auc']
+    table = np.array([[m[name] for name in names] for m in per_fold])
+    return {
+        'n_folds': n_folds,
+        'stratified': bool(stratified),
+        'folds': per_fold,
+        'mean': {name: float(v) for name, v in zip(names, np.nanmean(table, axis=0))},
+        'std': {name: float(v) for name, v in zip(names, np.nanstd(table, axis=0))},
+        'pred': pred,
+        'proba': proba
+    }
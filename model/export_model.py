@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""
+Re-export model.json with a compact encoding and check prediction parity
+
+Reads the existing model.json (metrics included) and model.pkl, encodes
+the payload with the requested options, compares the predictions the web
+client would make from it against the lossless export, then writes
+model.json with its .gz/.br siblings to model/ and public/. Every
+encoding is listed with its raw and compressed size for reference.
+
+    python model/export_model.py --float16 --pack
+    python model/export_model.py --precision 4 --no-vocab --texts data.csv --dry-run
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from train_model import preprocess_text, encode_export, decode_export, precompress, write_export
+from predict import load_model
+from artifact import sample_texts
+
+ENCODINGS = [
+    ("indent=2 (previous)", {'indent': 2}),
+    ("compact", {}),
+    ("precision=4", {'precision': 4}),
+    ("float16", {'float16': True}),
+    ("packed float64", {'pack': True}),
+    ("packed float16", {'float16': True, 'pack': True}),
+]
+
+
+def export_proba(export, docs):
+    """Probabilities computed from a decoded model.json, as the web client does"""
+    vectorizer = export['vectorizer']
+    model = export['model']
+    idf = np.asarray(vectorizer['idf'], dtype=np.float64)
+    flp = np.asarray(model['feature_log_prob'], dtype=np.float64)
+    prior = np.asarray(model['class_log_prior'], dtype=np.float64)
+    
+    X = np.zeros((len(docs), len(idf)))
+    for i, doc in enumerate(docs):
+        for term in doc:
+            j = vectorizer['vocab'].get(term)
+            if j is not None:
+                X[i, j] += 1.0
+        if doc:
+            X[i] /= len(doc)
+    
+    log_joint = (X * idf) @ flp.T + prior
+    log_joint -= log_joint.max(axis=1, keepdims=True)
+    proba = np.exp(log_joint)
+    return proba / proba.sum(axis=1, keepdims=True)
+
+
+def parity(reference, payload, docs):
+    """Label agreement and max |Δp| of an encoded payload against the reference proba"""
+    proba = export_proba(decode_export(json.loads(payload)), docs)
+    return (float(np.mean(proba.argmax(axis=1) == reference.argmax(axis=1))),
+            float(np.abs(proba - reference).max()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-export model.json with a compact encoding")
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--json", default="model/model.json", help="existing export to re-encode")
+    parser.add_argument("--public-dir", default="public")
+    parser.add_argument("--indent", type=int, default=None)
+    parser.add_argument("--precision", type=int, default=None, help="round arrays to N decimals")
+    parser.add_argument("--float16", action="store_true", help="quantize arrays to float16")
+    parser.add_argument("--pack", action="store_true", help="store arrays as base64 buffers")
+    parser.add_argument("--no-vocab", action="store_true",
+                        help="drop the correction vocab list (unused by the web client)")
+    parser.add_argument("--no-compress", action="store_true", help="skip .gz/.br siblings")
+    parser.add_argument("--texts", help="usn;text;class CSV for the parity check "
+                                        "(default: texts sampled from the lexicon)")
+    parser.add_argument("--tolerance", type=float, default=1e-2,
+                        help="max absolute probability difference allowed (default 0.01)")
+    parser.add_argument("--dry-run", action="store_true", help="only report, write nothing")
+    args = parser.parse_args()
+    
+    with open(args.json, encoding="utf-8") as f:
+        export_data = decode_export(json.load(f))
+    model_data = load_model(args.model)
+    
+    if args.texts:
+        texts = pd.read_csv(args.texts, sep=";", header=None, dtype=str)[1].dropna().tolist()
+    else:
+        texts = sample_texts(model_data)
+    corrector = model_data.get('corrector', model_data.get('spelling_index'))
+    docs = [preprocess_text(t, model_data['vocab'], model_data['word_freq'], index=corrector)
+            for t in texts]
+    reference = export_proba(export_data, docs)
+    
+    options = {'indent': args.indent, 'precision': args.precision, 'float16': args.float16,
+               'pack': args.pack, 'include_vocab': not args.no_vocab}
+    chosen = ("selected", options)
+    
+    print(f"Parity on {len(texts)} texts against the lossless export")
+    print(f"{'encoding':<22} {'raw KB':>8} {'gz KB':>7} {'br KB':>7} {'encode ms':>10} "
+          f"{'labels':>7} {'max |Δp|':>9}")
+    for name, opts in ENCODINGS + [chosen]:
+        if name != "selected":
+            opts = dict(opts, include_vocab=not args.no_vocab)
+        start = time.perf_counter()
+        payload = encode_export(export_data, **opts)
+        t_encode = time.perf_counter() - start
+        compressed = precompress(payload)
+        agreement, max_diff = parity(reference, payload, docs)
+        br = f"{len(compressed['.br']) / 1024:>7.1f}" if '.br' in compressed else f"{'-':>7}"
+        print(f"{name:<22} {len(payload) / 1024:>8.1f} {len(compressed['.gz']) / 1024:>7.1f} {br} "
+              f"{t_encode * 1000:>10.2f} {agreement:>7.4f} {max_diff:>9.2e}")
+    
+    if max_diff > args.tolerance:
+        print(f"✗ max |Δp| {max_diff:.2e} exceeds tolerance {args.tolerance:.0e}")
+        sys.exit(1)
+    print(f"✓ max |Δp| {max_diff:.2e} within tolerance {args.tolerance:.0e}")
+    
+    if not args.dry_run:
+        start = time.perf_counter()
+        write_export(payload, Path(args.json).parent, args.public_dir, compress=not args.no_compress)
+        print(f"  Export written in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Opt-in stage timers and counters for preprocessing, scoring and training
+
+Nothing is recorded until a Recorder is enabled; the instrumented code
+only checks `instrumentation.recorder is not None`, so the disabled cost
+is one attribute lookup per call. A Recorder keeps per-stage durations
+(count, total, max), event counters (tokens, OOV and corrected tokens,
+edit-distance calls, ...), gauges (vocabulary sizes) and, for training,
+one entry per phase with its duration, the counters it added and, with
+track_memory=True, its peak traced memory (tracemalloc, which makes
+spelling correction several times slower).
+
+    rec = instrumentation.enable(track_memory=True)
+    train_model(csv_path)
+    rec.write_json("train_report.json")
+    print(rec.to_prometheus())
+
+Counters are recorded in the process that does the work: with a process
+pool (workers > 1) the workers' edit-distance calls are not included.
+"""
+
+import json
+import os
+import platform
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# The active Recorder, or None when instrumentation is disabled
+recorder = None
+
+_NULL = nullcontext()
+
+
+class Recorder:
+    """Stage durations, counters and training phases of one run"""
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.stages = {}  # name -> [count, total_s, max_s]
+        self.counters = {}
+        self.gauges = {}
+        self.phases = []
+        self._open = []  # phase entries currently running, outermost first
+        self._started_tracemalloc = False
+        self._lock = threading.Lock()
+    
+    def observe(self, stage, seconds):
+        """Record one duration for stage"""
+        with self._lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                self.stages[stage] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+    
+    def add(self, counter, n=1):
+        """Increase counter by n"""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+    
+    def set(self, gauge, value):
+        """Set gauge (a size or level rather than a running count)"""
+        with self._lock:
+            self.gauges[gauge] = value
+    
+    @contextmanager
+    def stage(self, name):
+        """Time the body as one observation of stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+    
+    @contextmanager
+    def phase(self, name):
+        """Time the body as a training phase, with its counters and peak memory"""
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        entry = {'name': name, 'seconds': 0.0, 'counters': {}}
+        with self._lock:
+            before = dict(self.counters)
+        if self.track_memory:
+            self._carry_peak()
+            entry['start_bytes'] = tracemalloc.get_traced_memory()[0]
+            entry['peak_bytes'] = entry['start_bytes']
+        self._open.append(entry)
+        self.phases.append(entry)
+        
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] = time.perf_counter() - start
+            if self.track_memory:
+                self._carry_peak()
+                entry['end_bytes'] = tracemalloc.get_traced_memory()[0]
+            self._open.remove(entry)
+            with self._lock:
+                entry['counters'] = {k: v - before.get(k, 0) for k, v in self.counters.items()
+                                     if v != before.get(k, 0)}
+            self.observe(f"phase.{name}", entry['seconds'])
+    
+    def _carry_peak(self):
+        """Credit the peak since the last reset to every open phase, then reset it"""
+        peak = tracemalloc.get_traced_memory()[1]
+        for entry in self._open:
+            entry['peak_bytes'] = max(entry['peak_bytes'], peak)
+        tracemalloc.reset_peak()
+    
+    def close(self):
+        """Stop tracemalloc if this recorder started it"""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+    
+    def report(self):
+        """Structured run report (JSON-serializable)"""
+        with self._lock:
+            stages = {name: {'count': c, 'total_s': total, 'mean_s': total / c, 'max_s': top}
+                      for name, (c, total, top) in sorted(self.stages.items())}
+            counters = dict(sorted(self.counters.items()))
+            gauges = dict(sorted(self.gauges.items()))
+        return {
+            'started_at': self.started_at,
+            'python': platform.python_version(),
+            'pid': os.getpid(),
+            'track_memory': self.track_memory,
+            'stages': stages,
+            'counters': counters,
+            'gauges': gauges,
+            'phases': [dict(p) for p in self.phases]
+        }
+    
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+    
+    def to_prometheus(self, prefix="hatespeech"):
+        """Prometheus text exposition format (version 0.0.4)"""
+        report = self.report()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per stage",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, s in report['stages'].items():
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{_label(name)}"}} {s["total_s"]:.9g}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{_label(name)}"}} {s["count"]}')
+        lines += [
+            f"# HELP {prefix}_stage_max_seconds Longest single observation per stage",
+            f"# TYPE {prefix}_stage_max_seconds gauge",
+        ]
+        for name, s in report['stages'].items():
+            lines.append(f'{prefix}_stage_max_seconds{{stage="{_label(name)}"}} {s["max_s"]:.9g}')
+        
+        for name, value in report['counters'].items():
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in report['gauges'].items():
+            metric = f"{prefix}_{_metric_name(name)}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        
+        if self.track_memory and report['phases']:
+            lines += [
+                f"# HELP {prefix}_phase_peak_bytes Peak traced memory per training phase",
+                f"# TYPE {prefix}_phase_peak_bytes gauge",
+            ]
+            for p in report['phases']:
+                lines.append(f'{prefix}_phase_peak_bytes{{phase="{_label(p["name"])}"}} {p["peak_bytes"]}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def enable(track_memory=False, rec=None):
+    """Make rec (or a new Recorder) the active recorder and return it"""
+    global recorder
+    recorder = rec if rec is not None else Recorder(track_memory=track_memory)
+    return recorder
+
+
+def disable():
+    """Stop recording, returns the recorder that was active"""
+    global recorder
+    rec, recorder = recorder, None
+    if rec is not None:
+        rec.close()
+    return rec
+
+
+def phase(name):
+    """Recorder.phase of the active recorder, or a no-op context"""
+    rec = recorder
+    return rec.phase(name) if rec is not None else _NULL
+
+
+def stage(name):
+    """Recorder.stage of the active recorder, or a no-op context"""
+    rec = recorder
+    return rec.stage(name) if rec is not None else _NULL
+
+
+def add(counter, n=1):
+    rec = recorder
+    if rec is not None:
+        rec.add(counter, n)
+
+
+def set_gauge(gauge, value):
+    rec = recorder
+    if rec is not None:
+        rec.set(gauge, value)
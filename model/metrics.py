@@ -0,0 +1,206 @@
+"""
+Evaluation metrics for class labels and predicted probabilities
+
+Everything is computed from whole arrays: the confusion matrix is a single
+np.bincount over (true, predicted) label pairs, precision/recall/F1 derive
+from it, and the one-vs-rest AUC is the exact Mann-Whitney statistic,
+counted by sorting the positive and negative scores of each class (tied
+scores count one half). Cost is O(n) for the label metrics and
+O(n log n) per class for AUC instead of a Python loop over samples and a
+full pass per threshold.
+"""
+
+import numpy as np
+
+
+def _is_small_int(values):
+    """Integer array whose values span a range short enough for a lookup table"""
+    return (values.dtype.kind in "iu" and values.size > 0
+            and int(values.max()) - int(values.min()) < 1 << 20)
+
+
+def _unique_labels(*arrays):
+    """Sorted distinct values of all arrays (a bincount instead of a sort for small ints)"""
+    if all(_is_small_int(a) for a in arrays) and arrays:
+        low = min(int(a.min()) for a in arrays)
+        present = np.zeros(max(int(a.max()) for a in arrays) - low + 1, dtype=bool)
+        for a in arrays:
+            present[a - low] = True
+        return (np.flatnonzero(present) + low).astype(np.result_type(*arrays))
+    return np.unique(np.concatenate(arrays))
+
+
+def _label_codes(values, labels):
+    """Position of every value in labels, -1 where it is not a label"""
+    values = np.asarray(values).ravel()
+    if _is_small_int(values) and _is_small_int(labels):
+        # Lookup table over the value range
+        low = min(int(values.min()), int(labels.min()))
+        high = max(int(values.max()), int(labels.max()))
+        table = np.full(high - low + 1, -1, dtype=np.intp)
+        table[labels[::-1] - low] = np.arange(len(labels))[::-1]  # first position wins
+        return table[values - low]
+    order = np.argsort(labels, kind="mergesort")
+    sorted_labels = labels[order]
+    pos = np.searchsorted(sorted_labels, values)
+    pos = np.minimum(pos, len(labels) - 1)
+    found = sorted_labels[pos] == values
+    return np.where(found, order[pos], -1)
+
+
+def confusion_matrix(y_true, y_pred, labels=None):
+    """Counts of (true, predicted) pairs, returns (cm, labels).
+    
+    Rows are true labels and columns predicted labels, both in the order of
+    labels (default: sorted union of y_true and y_pred). Pairs involving a
+    value outside labels are ignored.
+    """
+    y_true, y_pred = np.asarray(y_true).ravel(), np.asarray(y_pred).ravel()
+    if len(y_true) != len(y_pred):
+        raise ValueError(f"y_true has {len(y_true)} samples but y_pred has {len(y_pred)}")
+    if labels is None:
+        labels = _unique_labels(y_true, y_pred)
+    labels = np.asarray(labels)
+    n_labels = len(labels)
+    if n_labels == 0:
+        return np.zeros((0, 0), dtype=int), labels
+    
+    t = _label_codes(y_true, labels)
+    p = _label_codes(y_pred, labels)
+    keep = (t >= 0) & (p >= 0)
+    if not keep.all():
+        t, p = t[keep], p[keep]
+    cm = np.bincount(t * n_labels + p, minlength=n_labels * n_labels)
+    return cm.reshape(n_labels, n_labels).astype(int, copy=False), labels
+
+
+def _scores_from_cm(cm):
+    """Per-class precision, recall and F1 of a confusion matrix"""
+    tp = np.diag(cm).astype(float)
+    fp = cm.sum(axis=0) - tp
+    fn = cm.sum(axis=1) - tp
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = np.where(tp+fp == 0, 0, tp/(tp+fp))
+        rec = np.where(tp+fn == 0, 0, tp/(tp+fn))
+        f1 = np.where(prec+rec == 0, 0, 2*prec*rec/(prec+rec))
+    return tp, fp, fn, prec, rec, f1
+
+
+def precision_recall_fscore_support(y_true, y_pred, labels=None):
+    """Per-class precision, recall, F1 and support (true count), plus labels.
+    
+    Classes that were never predicted (or never occur) get 0 instead of a
+    division by zero.
+    """
+    cm, labels = confusion_matrix(y_true, y_pred, labels)
+    _, _, _, prec, rec, f1 = _scores_from_cm(cm)
+    return prec, rec, f1, cm.sum(axis=1), labels
+
+
+def precision_recall_f1(y_true, y_pred, average="micro", labels=None):
+    """(precision, recall, F1) averaged over classes.
+    
+    average is "micro" (pooled counts), "macro" (unweighted class mean),
+    "weighted" (class mean weighted by support) or None for per-class arrays.
+    """
+    cm, labels = confusion_matrix(y_true, y_pred, labels)
+    tp, fp, fn, prec, rec, f1 = _scores_from_cm(cm)
+    if average is None:
+        return prec, rec, f1
+    if average == "micro":
+        TP, FP, FN = tp.sum(), fp.sum(), fn.sum()
+        p = TP/(TP+FP) if TP+FP > 0 else 0
+        r = TP/(TP+FN) if TP+FN > 0 else 0
+        f = 2*p*r/(p+r) if p+r > 0 else 0
+        return p, r, f
+    if average == "macro":
+        return prec.mean(), rec.mean(), f1.mean()
+    if average == "weighted":
+        support = cm.sum(axis=1)
+        weights = support / support.sum() if support.sum() else np.zeros(len(support))
+        return float(prec @ weights), float(rec @ weights), float(f1 @ weights)
+    raise ValueError(f"Unknown average {average!r}, expected 'micro', 'macro', 'weighted' or None")
+
+
+def binary_auc(y_bin, scores):
+    """Exact ROC AUC of scores for a boolean target, nan if one class is missing.
+    
+    Equals the probability that a random positive scores above a random
+    negative, counting ties as one half.
+    """
+    y_bin = np.asarray(y_bin, dtype=bool).ravel()
+    scores = np.asarray(scores, dtype=np.float64).ravel()
+    n_pos = int(np.count_nonzero(y_bin))
+    n_neg = len(y_bin) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return float("nan")
+    
+    # For every positive, count the negatives below it and the ones tied with it
+    pos = np.sort(scores[y_bin])
+    neg = np.sort(scores[~y_bin])
+    below = np.searchsorted(neg, pos, side="left").sum()
+    below_or_tied = np.searchsorted(neg, pos, side="right").sum()
+    return float((int(below) + int(below_or_tied)) / 2.0 / (n_pos * n_neg))
+
+
+def roc_auc_score_ovr(y_true, proba, labels=None, average="macro"):
+    """One-vs-rest ROC AUC of a probability matrix.
+    
+    Column k of proba holds the scores of labels[k] (default: the sorted
+    labels of y_true, which must then match the number of columns).
+    average is "macro", "weighted" (by prevalence) or None for the per-class
+    array; classes without positives or negatives are nan and left out of
+    the averages.
+    """
+    y_true = np.asarray(y_true).ravel()
+    proba = np.asarray(proba, dtype=np.float64)
+    if proba.ndim != 2 or proba.shape[0] != len(y_true):
+        raise ValueError(f"proba must have shape ({len(y_true)}, n_classes), got {proba.shape}")
+    if labels is None:
+        labels = _unique_labels(y_true)
+        if len(labels) != proba.shape[1]:
+            raise ValueError(f"y_true has {len(labels)} classes but proba has {proba.shape[1]} "
+                             "columns, pass labels to name the columns")
+    labels = np.asarray(labels)
+    
+    codes = _label_codes(y_true, labels)
+    aucs = np.array([binary_auc(codes == k, proba[:, k]) for k in range(len(labels))])
+    if average is None:
+        return aucs
+    
+    valid = ~np.isnan(aucs)
+    if not valid.any():
+        return float("nan")
+    if average == "macro":
+        return float(aucs[valid].mean())
+    if average == "weighted":
+        prevalence = np.bincount(codes[codes >= 0], minlength=len(labels))[valid]
+        return float(aucs[valid] @ (prevalence / prevalence.sum()))
+    raise ValueError(f"Unknown average {average!r}, expected 'macro', 'weighted' or None")
+
+
+def classification_report(y_true, y_pred, proba=None, labels=None):
+    """Accuracy, micro/macro/weighted averages and per-class metrics as a dict.
+    
+    With proba, its columns must follow labels (default: the sorted labels
+    of y_true and y_pred) and the report also has OvR AUC.
+    """
+    y_true, y_pred = np.asarray(y_true).ravel(), np.asarray(y_pred).ravel()
+    cm, labels = confusion_matrix(y_true, y_pred, labels)
+    _, _, _, prec, rec, f1 = _scores_from_cm(cm)
+    report = {
+        'accuracy': float(np.mean(y_true == y_pred)) if len(y_true) else 0.0,
+        'per_class': {
+            str(lab): {'precision': float(p), 'recall': float(r), 'f1': float(f), 'support': int(s)}
+            for lab, p, r, f, s in zip(labels.tolist(), prec, rec, f1, cm.sum(axis=1))
+        }
+    }
+    for average in ("micro", "macro", "weighted"):
+        p, r, f = precision_recall_f1(y_true, y_pred, average=average, labels=labels)
+        report[average] = {'precision': float(p), 'recall': float(r), 'f1': float(f)}
+    if proba is not None:
+        aucs = roc_auc_score_ovr(y_true, proba, labels=labels, average=None)
+        for lab, auc in zip(labels.tolist(), aucs):
+            report['per_class'][str(lab)]['auc'] = float(auc)
+        report['auc'] = roc_auc_score_ovr(y_true, proba, labels=labels)
+    return report
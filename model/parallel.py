@@ -0,0 +1,147 @@
+"""
+Parallel text preprocessing over a process pool
+
+The dataset is split into contiguous shards that are processed by worker
+processes and reassembled in input order. The correction lexicon (vocab,
+word_freq, spelling index and correction table) is handed to each worker
+once through the pool initializer, not with every task.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from runtime import (
+    text_cleaning, spelling_correction, process_tokens, preprocess_text, CorrectionCache
+)
+
+# Per-process lexicon, set by _init_worker (or directly when running serially)
+_state = {}
+
+
+def _init_worker(vocab, word_freq, index, table, max_dist):
+    """Pool initializer: keep the read-only lexicon in the worker"""
+    _state.clear()
+    _state['vocab'] = vocab
+    _state['word_freq'] = word_freq
+    _state['max_dist'] = max_dist
+    _state['index'] = index
+    _state['corrector'] = CorrectionCache(index, table, max_dist=max_dist) if index is not None else None
+
+
+def _clean_shard(texts):
+    """Text cleaning + tokenization"""
+    return [text_cleaning(t).split() for t in texts]
+
+
+def _finish_shard(docs):
+    """Spelling correction, normalize, stopwords and stemming on tokenized docs"""
+    vocab, word_freq, corrector = _state['vocab'], _state['word_freq'], _state['corrector']
+    out = []
+    for tokens in docs:
+        if vocab and word_freq:
+            tokens = spelling_correction(tokens, vocab, word_freq, max_dist=_state['max_dist'],
+                                         index=corrector)
+        out.append(process_tokens(tokens))
+    return out
+
+
+def _correct_shard(words):
+    """Spelling index lookup for distinct words"""
+    index, max_dist = _state['index'], _state['max_dist']
+    return [index.lookup(w, max_dist=max_dist) for w in words]
+
+
+def _distances_shard(items):
+    """Candidate edit distances for (word, known distances) pairs"""
+    index, max_dist = _state['index'], _state['max_dist']
+    return [index.distances(w, max_dist=max_dist, known=known) for w, known in items]
+
+
+def _preprocess_shard(texts):
+    """Full preprocess_text on raw texts"""
+    vocab, word_freq, corrector = _state['vocab'], _state['word_freq'], _state['corrector']
+    return [preprocess_text(t, vocab, word_freq, index=corrector) for t in texts]
+
+
+def _shards(items, n_shards):
+    """Split a list into n_shards contiguous slices"""
+    size = max(1, -(-len(items) // n_shards))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def resolve_workers(workers):
+    """None/0 means all cores"""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+class PreprocessPool:
+    """Process pool for preprocessing, usable as a context manager.
+    
+    Without a lexicon only clean() is available (training needs the cleaned
+    corpus to build the vocab first). With workers=1 everything runs in
+    this process through the same shard functions.
+    """
+    def __init__(self, workers=1, vocab=None, word_freq=None, index=None, table=None,
+                 max_dist=2, shards_per_worker=4):
+        self.workers = resolve_workers(workers)
+        self.shards_per_worker = shards_per_worker
+        self._lexicon = (vocab, word_freq, index, table, max_dist)
+        self._executor = None
+        self._local_state = None
+        
+        if self.workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 initializer=_init_worker,
+                                                 initargs=self._lexicon)
+        else:
+            _init_worker(*self._lexicon)
+            self._local_state = dict(_state)
+    
+    def _map(self, func, items):
+        """Apply a shard function over items, preserving order"""
+        items = list(items)
+        if self._executor is None:
+            if _state.get('corrector') is not self._local_state['corrector']:
+                _state.clear()
+                _state.update(self._local_state)
+            return func(items)
+        
+        result = []
+        for part in self._executor.map(func, _shards(items, self.workers * self.shards_per_worker)):
+            result.extend(part)
+        return result
+    
+    def clean(self, texts):
+        """text_cleaning + split for every text"""
+        return self._map(_clean_shard, texts)
+    
+    def finish(self, docs):
+        """Correction, normalize, stopwords and stemming for tokenized docs"""
+        return self._map(_finish_shard, docs)
+    
+    def correction_table(self, word_freq):
+        """Same as build_correction_table, with lookups spread over the workers"""
+        index = self._lexicon[2]
+        oov = [w for w in word_freq if w not in index]
+        return dict(zip(oov, self._map(_correct_shard, oov)))
+    
+    def distances(self, items):
+        """SpellingIndex.distances for (word, known distances) pairs, spread over the workers"""
+        return self._map(_distances_shard, items)
+    
+    def preprocess(self, texts):
+        """preprocess_text for every text"""
+        return self._map(_preprocess_shard, texts)
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
@@ -2,36 +2,197 @@
 Prediction script using trained model
 """
 
+import sys
+import csv
+import time
 import pickle
 import json
+import hashlib
+import argparse
+import threading
 import numpy as np
+from collections import OrderedDict, deque
 from pathlib import Path
-from train_model import preprocess_text, TFIDFVectorizer, MultinomialNB
+import runtime
+from runtime import (
+    preprocess_text, TFIDFVectorizer, MultinomialNB, SpellingIndex, CorrectionCache,
+    compact_lexicon
+)
+import instrumentation
+from parallel import PreprocessPool, resolve_workers
+from artifact import is_artifact, load_artifact
 
-def load_model(model_path="model/model.pkl"):
-    """Load trained model"""
-    with open(model_path, "rb") as f:
-        data = pickle.load(f)
-    return data
+# Modules model.pkl files name for the classes that now live in runtime
+_MODEL_MODULES = {"train_model", "model.train_model", "model.runtime"}
 
-def predict_text(text, model_data):
-    """Predict hate speech from text"""
-    model = model_data['model']
-    vectorizer = model_data['vectorizer']
-    vocab = model_data['vocab']
-    word_freq = model_data['word_freq']
-    reverse = model_data['reverse']
+class _ModelUnpickler(pickle.Unpickler):
+    """Resolve the model classes from runtime, so loading never imports the training code"""
+    def find_class(self, module, name):
+        if module in _MODEL_MODULES and hasattr(runtime, name):
+            module = "runtime"
+        return super().find_class(module, name)
+
+class ResultCache:
+    """Bounded LRU of prediction results keyed on the preprocessed tokens.
     
-    # Preprocess
-    tokens = preprocess_text(text, vocab, word_freq)
+    Raw texts that differ only in mentions, URLs, digits or punctuation
+    collapse to the same tokens, so their vectorization and scoring is
+    skipped. Keys are a blake2b digest of the model version and the token
+    sequence; entries older than ttl seconds are treated as misses. Each
+    loaded model gets its own cache, so a new model starts empty.
+    """
+    def __init__(self, maxsize=10000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.memory_bytes = 0
+        self._entries = OrderedDict()  # key -> (stored_at, pred, proba, size)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(tokens, model_data):
+        """Digest of the model version and the token sequence"""
+        stamp = f"{model_data.get('version', 1)}|{model_data.get('created_at')}|{model_data.get('generation')}"
+        h = hashlib.blake2b(stamp.encode("utf-8"), digest_size=16)
+        h.update("\x1f".join(tokens).encode("utf-8"))
+        return h.digest()
+    
+    def get(self, key):
+        """(pred, proba) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.memory_bytes -= entry[3]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+    
+    def put(self, key, pred, proba):
+        proba = tuple(float(p) for p in proba)
+        size = sys.getsizeof(key) + sys.getsizeof(proba) + 24 * len(proba) + 120
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.memory_bytes -= old[3]
+            self._entries[key] = (time.monotonic(), int(pred), proba, size)
+            self.memory_bytes += size
+            while len(self._entries) > self.maxsize:
+                _, evicted = self._entries.popitem(last=False)
+                self.memory_bytes -= evicted[3]
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.memory_bytes = 0
+    
+    def stats(self):
+        """Hit rate, evictions and approximate memory use"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'memory_bytes': self.memory_bytes
+            }
+
+class TextScorer:
+    """Score one preprocessed token list without building a feature row.
+    
+    Only the features present in the tokens are looked up: their TF-IDF
+    weights are computed exactly as TFIDFVectorizer.transform does and
+    multiplied into the matching rows of feature_log_prob_ (stored
+    transposed so each feature's class scores are contiguous), summed in
+    column order like MultinomialNB's sparse path. The log-joint is
+    computed once, so results are bit-identical to predict_batch.
+    """
+    def __init__(self, vectorizer, model):
+        self.vectorizer = vectorizer
+        self.model = model
+        self.vocab = vectorizer.vocab
+        self.idf = vectorizer.idf
+        self.log_prob_by_feature = np.ascontiguousarray(model.feature_log_prob_.T, dtype=np.float64)
+        self.class_log_prior = np.asarray(model.class_log_prior_, dtype=np.float64)
+        self.classes = model.classes_
     
-    # Vectorize
-    X = vectorizer.transform([tokens])
+    def matches(self, model_data):
+        """True if built from the model and vectorizer in model_data"""
+        return self.model is model_data['model'] and self.vectorizer is model_data['vectorizer']
     
-    # Predict
-    pred = model.predict(X)[0]
-    proba = model.predict_proba(X)[0]
+    def score(self, tokens):
+        """(class, probabilities, log-joint scores) for one token list"""
+        counts = {}
+        feature = self.vocab.get
+        for t in tokens:
+            j = feature(t)
+            if j is not None:
+                counts[j] = counts.get(j, 0) + 1
+        
+        if counts:
+            cols = sorted(counts)
+            tfidf = np.array([counts[j] for j in cols], dtype=np.float32)
+            tfidf /= np.float32(len(tokens))
+            tfidf *= self.idf[cols]
+            contrib = self.log_prob_by_feature[cols] * tfidf.astype(np.float64)[:, None]
+            log_joint = np.cumsum(contrib, axis=0)[-1] + self.class_log_prior
+        else:
+            log_joint = 0.0 + self.class_log_prior
+        
+        proba = np.exp(log_joint - log_joint.max())
+        proba /= proba.sum()
+        return self.classes[np.argmax(log_joint)], proba, log_joint
+
+def text_scorer(model_data):
+    """The TextScorer of model_data, (re)built if the model or vectorizer changed"""
+    scorer = model_data.get('scorer')
+    if scorer is None or not scorer.matches(model_data):
+        scorer = model_data['scorer'] = TextScorer(model_data['vectorizer'], model_data['model'])
+    return scorer
+
+def load_model(model_path="model/model.pkl", cache_size=10000, result_cache_size=10000,
+               result_ttl=None):
+    """Load trained model (model.pkl, or a memory-mapped binary artifact).
+    
+    result_cache_size=0 disables the prediction result cache.
+    """
+    if is_artifact(model_path):
+        data = load_artifact(model_path)
+    else:
+        with open(model_path, "rb") as f:
+            data = _ModelUnpickler(f).load()
+        # Pickles from before the Lexicon carry a vocab set and the full word_freq dict
+        data = compact_lexicon(data)
+    
+    # Older artifacts were saved without a spelling index, build it once here
+    if data.get('spelling_index') is None and data.get('vocab') and data.get('word_freq'):
+        data['spelling_index'] = SpellingIndex(max_dist=2).build(data['vocab'], data['word_freq'])
     
+    # Precomputed corrections for training tokens, LRU for everything else
+    if data.get('spelling_index') is not None:
+        data['corrector'] = CorrectionCache(data['spelling_index'], data.get('correction_table'),
+                                            max_dist=2, maxsize=cache_size)
+    
+    data['result_cache'] = ResultCache(result_cache_size, ttl=result_ttl) if result_cache_size else None
+    data['scorer'] = TextScorer(data['vectorizer'], data['model'])
+    return data
+
+def _format_result(pred, proba, reverse):
+    """Result dict shared by predict_text and predict_batch"""
     # Map to labels
     label = reverse[pred]
     probabilities = {
@@ -46,10 +207,213 @@ def predict_text(text, model_data):
         'proba': probabilities
     }
 
+def predict_text(text, model_data):
+    """Predict hate speech from text"""
+    vocab = model_data['vocab']
+    word_freq = model_data['word_freq']
+    corrector = model_data.get('corrector', model_data.get('spelling_index'))
+    reverse = model_data['reverse']
+    
+    # Preprocess
+    tokens = preprocess_text(text, vocab, word_freq, index=corrector)
+    
+    cache = model_data.get('result_cache')
+    if cache is not None:
+        key = ResultCache.key(tokens, model_data)
+        cached = cache.get(key)
+        if cached is not None:
+            return _format_result(cached[0], cached[1], reverse)
+    
+    # Score only the features present in the tokens
+    pred, proba = _score_tokens(tokens, model_data)
+    
+    if cache is not None:
+        cache.put(key, pred, proba)
+    return _format_result(pred, proba, reverse)
+
+def _score_tokens(tokens, model_data):
+    """(pred, proba) of one token list through the TextScorer, timed when instrumentation is on"""
+    scorer = text_scorer(model_data)
+    rec = instrumentation.recorder
+    if rec is None:
+        return scorer.score(tokens)[:2]
+    
+    start = time.perf_counter()
+    pred, proba, _ = scorer.score(tokens)
+    rec.observe("predict.score_text", time.perf_counter() - start)
+    rec.add("predict.scored_docs")
+    return pred, proba
+
+def iter_predictions(texts, model_data, batch_size=1024, workers=1):
+    """Yield one result per text, scoring batch_size texts per matrix operation.
+    
+    With workers > 1 each batch is preprocessed on a process pool that
+    receives the correction lexicon once.
+    """
+    if resolve_workers(workers) > 1:
+        pool = PreprocessPool(workers, model_data['vocab'], model_data['word_freq'],
+                              model_data.get('spelling_index'), model_data.get('correction_table'))
+        preprocess = pool.preprocess
+    else:
+        pool = None
+        vocab = model_data['vocab']
+        word_freq = model_data['word_freq']
+        corrector = model_data.get('corrector', model_data.get('spelling_index'))
+        preprocess = lambda batch: [preprocess_text(t, vocab, word_freq, index=corrector) for t in batch]
+    
+    try:
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                yield from _score_batch(preprocess(batch), model_data)
+                batch = []
+        if batch:
+            yield from _score_batch(preprocess(batch), model_data)
+    finally:
+        if pool is not None:
+            pool.close()
+
+def _vectorize_and_score(vectorizer, model, docs, sparse):
+    """(pred, proba) for preprocessed docs, timed per stage when instrumentation is on"""
+    rec = instrumentation.recorder
+    if rec is None:
+        return model.predict_with_proba(vectorizer.transform(docs, sparse=sparse))
+    
+    start = time.perf_counter()
+    X = vectorizer.transform(docs, sparse=sparse)
+    vectorized = time.perf_counter()
+    result = model.predict_with_proba(X)
+    rec.observe("predict.vectorize", vectorized - start)
+    rec.observe("predict.score", time.perf_counter() - vectorized)
+    rec.add("predict.scored_docs", len(docs))
+    return result
+
+def _score_batch(docs, model_data):
+    """Vectorize preprocessed docs as one CSR matrix and score them together.
+    
+    Docs found in the result cache (or repeated within the batch) are
+    scored once.
+    """
+    reverse = model_data['reverse']
+    cache = model_data.get('result_cache')
+    if cache is None:
+        preds, proba = _vectorize_and_score(model_data['vectorizer'], model_data['model'], docs, sparse=True)
+        for pred, p in zip(preds, proba):
+            yield _format_result(pred, p, reverse)
+        return
+    
+    keys = [ResultCache.key(doc, model_data) for doc in docs]
+    results = {}
+    todo = {}  # key -> first doc with that key
+    for key, doc in zip(keys, docs):
+        if key in results or key in todo:
+            continue
+        cached = cache.get(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            todo[key] = doc
+    
+    if todo:
+        preds, proba = _vectorize_and_score(model_data['vectorizer'], model_data['model'],
+                                            list(todo.values()), sparse=True)
+        for key, pred, p in zip(todo, preds, proba):
+            cache.put(key, pred, p)
+            results[key] = (pred, p)
+    
+    for key in keys:
+        pred, p = results[key]
+        yield _format_result(pred, p, reverse)
+
+def predict_batch(texts, model_data, batch_size=1024, workers=1):
+    """Predict a list of texts, same results as predict_text on each"""
+    return list(iter_predictions(texts, model_data, batch_size=batch_size, workers=workers))
+
+def is_jsonl(path):
+    return str(path).endswith((".jsonl", ".ndjson"))
+
+def parse_texts(lines, jsonl, first=0, text_field="text", text_column=1, sep=";", skip_header=False):
+    """(id, text) pairs from the lines of a JSONL or CSV file.
+    
+    Records without an id are numbered from first (JSONL: line number,
+    CSV: record number after the header).
+    """
+    if jsonl:
+        for i, line in enumerate(lines, first):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                yield i, record
+            else:
+                yield record.get('id', i), record.get(text_field) or ""
+    else:
+        reader = csv.reader(lines, delimiter=sep)
+        if skip_header:
+            next(reader, None)
+        for i, row in enumerate(reader, first):
+            text = row[text_column] if len(row) > text_column else ""
+            yield (row[0] if text_column != 0 and row else i), text
+
+def _read_texts(path, text_field="text", text_column=1, sep=";", skip_header=False):
+    """Stream (id, text) pairs from a JSONL or CSV file"""
+    jsonl = is_jsonl(path)
+    with open(path, encoding="utf-8", newline=None if jsonl else "") as f:
+        yield from parse_texts(f, jsonl, text_field=text_field, text_column=text_column, sep=sep,
+                               skip_header=skip_header)
+
+def write_scores(records, out, model_data, batch_size=1024, workers=1):
+    """Score (id, text) pairs into JSONL lines on out, returns the number of texts"""
+    n = 0
+    pending_ids = deque()  # ids of texts read but not yet scored (at most one batch)
+    
+    def texts():
+        for record_id, text in records:
+            pending_ids.append(record_id)
+            yield text
+    
+    for result in iter_predictions(texts(), model_data, batch_size=batch_size, workers=workers):
+        out.write(json.dumps({'id': pending_ids.popleft(), **result}, ensure_ascii=False) + "\n")
+        n += 1
+    return n
+
+def score_file(input_path, output_path, model_data, batch_size=1024, workers=1, **read_options):
+    """Score a CSV/JSONL file into JSONL without loading it into memory"""
+    start = time.perf_counter()
+    with open(output_path, "w", encoding="utf-8") as out:
+        n = write_scores(_read_texts(input_path, **read_options), out, model_data,
+                         batch_size=batch_size, workers=workers)
+    return n, time.perf_counter() - start
+
 if __name__ == "__main__":
-    # Test prediction
-    model_data = load_model()
+    parser = argparse.ArgumentParser(description="Predict hate speech with the trained model")
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--input", help="CSV or JSONL file to score (omit for a quick demo)")
+    parser.add_argument("--output", help="JSONL output path (default: <input>.scored.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="preprocessing processes for --input (0 = all cores)")
+    parser.add_argument("--text-field", default="text", help="JSONL field holding the text")
+    parser.add_argument("--text-column", type=int, default=1,
+                        help="CSV column holding the text (training format usn;text;class)")
+    parser.add_argument("--sep", default=";", help="CSV separator")
+    parser.add_argument("--skip-header", action="store_true", help="CSV has a header row")
+    args = parser.parse_args()
     
+    model_data = load_model(args.model)
+    
+    if args.input:
+        output = args.output or f"{args.input}.scored.jsonl"
+        n, elapsed = score_file(args.input, output, model_data, batch_size=args.batch_size,
+                                workers=args.workers,
+                                text_field=args.text_field, text_column=args.text_column,
+                                sep=args.sep, skip_header=args.skip_header)
+        rate = n / elapsed if elapsed > 0 else 0.0
+        print(f"Scored {n} texts in {elapsed:.2f}s ({rate:.0f} texts/sec) -> {output}")
+        sys.exit(0)
+    
+    # Test prediction
     test_texts = [
         "Saya suka makan nasi goreng",
         "Agama itu penting untuk kehidupan",
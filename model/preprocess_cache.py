@@ -0,0 +1,302 @@
+"""
+Persistent preprocessing cache for incremental retraining
+
+A SQLite file keeps, for every row of the last training run, the cleaned
+and the fully preprocessed tokens keyed by a hash of the raw text, plus
+the spelling correction of every out-of-vocabulary token. A retrain only
+cleans new or changed texts and only runs the spelling index for tokens
+whose correction may have changed:
+
+- the edit distance of every SymSpell candidate of a token is stored, so
+  a retrain only computes distances to candidates that entered the
+  vocabulary since the last run (and does not even generate candidates
+  if the vocabulary is unchanged); corrections are then re-ranked with
+  the current frequencies and vocab order, so the table equals
+  build_correction_table
+- a row's final tokens are reused when none of its cleaned tokens is
+  corrected differently than in the last run
+- fingerprints of text_cleaning, of normalize/remove_stopwords/stem
+  (process_tokens, KAMUS_SLANG, STOPWORDS) and of the spelling correction
+  code invalidate the affected columns automatically
+
+Everything is written in one transaction that is committed when the run
+finishes, so an interrupted run leaves the previous cache intact.
+    
+    with PreprocessCache("model/preprocess_cache.sqlite") as cache:
+        artifact, export_data = fit_dataset(dataset, cache=cache)
+    print(cache.summary())
+"""
+
+import hashlib
+import sqlite3
+
+import instrumentation
+import runtime
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rows (key BLOB PRIMARY KEY, cleaned TEXT NOT NULL, processed TEXT);
+CREATE TABLE IF NOT EXISTS corrections (
+    word TEXT PRIMARY KEY, correction TEXT NOT NULL, distances TEXT
+);
+CREATE TEMP TABLE IF NOT EXISTS current_rows (key BLOB PRIMARY KEY);
+"""
+
+# Keys per SELECT ... IN (...)
+_BATCH = 500
+
+
+def text_key(text):
+    """Cache key of a raw text"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _encode(tokens):
+    # Every token prefixed by a space, so [] and [""] stay distinct
+    return "".join(" " + t for t in tokens)
+
+
+def _decode(value):
+    return value.split(" ")[1:]
+
+
+def _encode_distances(distances):
+    return "".join(f" {v}:{d}" for v, d in distances.items())
+
+
+def _decode_distances(value):
+    return {v: int(d) for v, _, d in (item.rpartition(":") for item in value.split(" ")[1:])}
+
+
+def _hash_code(h, code):
+    """Bytecode, names and constants of a function (not its line numbers)"""
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode("utf-8"))
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            _hash_code(h, const)
+        else:
+            h.update(repr(const).encode("utf-8"))
+
+
+def _fingerprint(*parts):
+    h = hashlib.blake2b(str(SCHEMA_VERSION).encode("utf-8"), digest_size=16)
+    for part in parts:
+        if hasattr(part, "__code__"):
+            _hash_code(h, part.__code__)
+        else:
+            h.update(repr(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def fingerprints(max_dist=2):
+    """Fingerprints of the cleaning, normalization and spelling correction steps"""
+    rt = runtime
+    return {
+        'clean': _fingerprint(rt.text_cleaning, rt.PUNCT_EDGES, rt.URL_PREFIXES, rt._WORD_RE.pattern,
+                              sorted(rt._DROP_ASCII.items())),
+        'normalize': _fingerprint(rt.process_tokens, sorted(rt.KAMUS_SLANG.items()), sorted(rt.STOPWORDS)),
+        'correction': _fingerprint(rt.SpellingIndex.distances, rt.SpellingIndex.candidates,
+                                   rt._deletes, rt.edit_distance, max_dist),
+    }
+
+
+class PreprocessCache:
+    """Preprocessed rows and spelling corrections of the last training run.
+    
+    Used by prepare_dataset and train_model_streaming in three steps:
+    clean() for every batch of texts, correction_table() once the
+    lexicon is built, then finish() for every batch of cleaned docs.
+    """
+    def __init__(self, path, max_dist=2):
+        self.path = str(path)
+        self.max_dist = max_dist
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(_SCHEMA)
+        self.invalidated = self._check_fingerprints()
+        self.rows = 0
+        self.cleaned_hits = 0
+        self.processed_hits = 0
+        self.oov_tokens = 0
+        self.correction_hits = 0
+        self.distances_reused = 0
+        self.distances_computed = 0
+        self._changed = None
+        self._used = False
+    
+    def _check_fingerprints(self):
+        """Drop what the current code no longer produces, returns the changed steps"""
+        stored = dict(self.conn.execute("SELECT name, value FROM meta"))
+        self._last_vocab = stored.get('vocab')
+        current = fingerprints(self.max_dist)
+        changed = [name for name, value in current.items() if stored and stored.get(name) != value]
+        
+        if 'clean' in changed:
+            self.conn.execute("DELETE FROM rows")
+        elif 'normalize' in changed:
+            self.conn.execute("UPDATE rows SET processed = NULL")
+        if 'correction' in changed:
+            # Keep the corrections themselves: they are what the stored rows were built with
+            self.conn.execute("UPDATE corrections SET distances = NULL")
+        self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", current.items())
+        return changed
+    
+    def _select(self, sql, keys):
+        """{key: value} for the keys found, sql has one {} for the IN list"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(keys), _BATCH):
+            batch = keys[i:i + _BATCH]
+            found.update(self.conn.execute(sql.format(",".join("?" * len(batch))), batch))
+        return found
+    
+    def clean(self, texts, pool):
+        """(keys, cleaned token lists) of texts, running pool.clean only on texts not in the cache"""
+        self._used = True
+        keys = [text_key(t) for t in texts]
+        found = self._select("SELECT key, cleaned FROM rows WHERE key IN ({})", keys)
+        self.conn.executemany("INSERT OR IGNORE INTO current_rows VALUES (?)", ((k,) for k in keys))
+        
+        docs = [None] * len(texts)
+        missing = []
+        for i, key in enumerate(keys):
+            value = found.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                docs[i] = _decode(value)
+        
+        for i, tokens in zip(missing, pool.clean([texts[i] for i in missing])):
+            docs[i] = tokens
+        self.conn.executemany("INSERT OR REPLACE INTO rows (key, cleaned) VALUES (?, ?)",
+                              ((keys[i], _encode(docs[i])) for i in missing))
+        
+        self.rows += len(texts)
+        self.cleaned_hits += len(texts) - len(missing)
+        instrumentation.add("preprocess_cache.rows", len(texts))
+        instrumentation.add("preprocess_cache.cleaned_hits", len(texts) - len(missing))
+        return keys, docs
+    
+    def correction_table(self, word_freq, index, pool):
+        """Same as build_correction_table, computing only edit distances to new candidates"""
+        stored = {w: (correction, distances) for w, correction, distances
+                  in self.conn.execute("SELECT word, correction, distances FROM corrections")}
+        vocab = _fingerprint(index.max_dist, sorted(index.rank))
+        same_vocab = vocab == self._last_vocab
+        
+        oov = [w for w in word_freq if w not in index]
+        distances = {}
+        todo = []
+        for w in oov:
+            entry = stored.get(w)
+            known = _decode_distances(entry[1]) if entry is not None and entry[1] is not None else None
+            if known is not None and same_vocab:
+                distances[w] = known
+            else:
+                todo.append((w, known))
+        
+        hits = len(distances)
+        reused = sum(map(len, distances.values()))
+        computed = 0
+        for (w, known), found in zip(todo, pool.distances(todo)):
+            distances[w] = found
+            new = len(found.keys() - known.keys()) if known is not None else len(found)
+            hits += known is not None and new == 0
+            reused += len(found) - new
+            computed += new
+        # Corrections as the vocabulary's own string objects, like build_correction_table
+        # returns them (decoded strings would pickle without shared references)
+        words = {v: v for v in index.rank}
+        table = {w: words.get(c, c) for w, c in ((w, index.closest(distances[w], w, self.max_dist))
+                                                  for w in oov)}
+        
+        # Tokens corrected differently than when the stored rows were processed
+        # (tokens in neither table were in the vocabulary and kept as is)
+        self._changed = {w for w in word_freq
+                         if table.get(w, w) != (stored[w][0] if w in stored else w)}
+        
+        self.conn.execute("DELETE FROM corrections")
+        self.conn.executemany("INSERT INTO corrections VALUES (?, ?, ?)",
+                              ((w, table[w], _encode_distances(distances[w])) for w in oov))
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('vocab', ?)", (vocab,))
+        
+        self.oov_tokens += len(oov)
+        self.correction_hits += hits
+        self.distances_reused += reused
+        self.distances_computed += computed
+        instrumentation.add("preprocess_cache.oov_tokens", len(oov))
+        instrumentation.add("preprocess_cache.correction_hits", hits)
+        instrumentation.add("preprocess_cache.distances_reused", reused)
+        instrumentation.add("preprocess_cache.distances_computed", computed)
+        return table
+    
+    def finish(self, keys, docs, pool):
+        """Final token lists, running pool.finish only on rows that are new or contain a changed correction"""
+        if self._changed is None:
+            raise RuntimeError("correction_table() must run before finish()")
+        found = self._select("SELECT key, processed FROM rows WHERE processed IS NOT NULL AND key IN ({})",
+                             keys)
+        
+        out = [None] * len(docs)
+        todo = []
+        changed = self._changed
+        for i, (key, tokens) in enumerate(zip(keys, docs)):
+            value = found.get(key)
+            if value is not None and changed.isdisjoint(tokens):
+                out[i] = _decode(value)
+            else:
+                todo.append(i)
+        
+        for i, tokens in zip(todo, pool.finish([docs[i] for i in todo])):
+            out[i] = tokens
+        self.conn.executemany("UPDATE rows SET processed = ? WHERE key = ?",
+                              ((_encode(out[i]), keys[i]) for i in todo))
+        
+        self.processed_hits += len(docs) - len(todo)
+        instrumentation.add("preprocess_cache.processed_hits", len(docs) - len(todo))
+        return out
+    
+    def stats(self):
+        """Hit counters of this run"""
+        return {
+            'rows': self.rows,
+            'cleaned_hits': self.cleaned_hits,
+            'processed_hits': self.processed_hits,
+            'oov_tokens': self.oov_tokens,
+            'correction_hits': self.correction_hits,
+            'distances_reused': self.distances_reused,
+            'distances_computed': self.distances_computed,
+            'invalidated': list(self.invalidated)
+        }
+    
+    def summary(self):
+        """One line of hit statistics for the training output"""
+        distances = self.distances_reused + self.distances_computed
+        line = (f"{self.cleaned_hits}/{self.rows} rows cleaned from cache, {self.processed_hits} fully "
+                f"preprocessed; {self.correction_hits}/{self.oov_tokens} spelling corrections and "
+                f"{self.distances_reused}/{distances} edit distances reused")
+        if self.invalidated:
+            line += f" ({', '.join(self.invalidated)} step changed, its cached results were dropped)"
+        return line
+    
+    def close(self, commit=True):
+        """Commit this run (keeping only its rows) or roll it back, then close the file"""
+        if self.conn is None:
+            return
+        if commit:
+            if self._used:
+                self.conn.execute("DELETE FROM rows WHERE key NOT IN (SELECT key FROM current_rows)")
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+        self.conn.close()
+        self.conn = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, *exc):
+        self.close(commit=exc_type is None)
@@ -0,0 +1,127 @@
+"""
+Hot-reloadable model for long-running processes
+
+ModelRegistry holds the model_data returned by load_model and watches the
+artifact file. When the file is replaced (train_model, update_model and
+artifact.py all write through a .tmp file and rename, so the inode and
+mtime change), the new artifact is loaded and warmed on a background
+thread while the old model keeps serving, then swapped in with a single
+reference assignment. Callers take one snapshot with current() per
+request or batch, so in-flight work finishes on the model it started with.
+"""
+
+import os
+import time
+import threading
+
+from predict import load_model, predict_batch
+
+
+def file_signature(path):
+    """(inode, mtime_ns, size) of path, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class ModelRegistry:
+    """Current model plus a watcher that swaps in new versions of the artifact.
+    
+    warm_texts are scored through every new model before it is swapped in,
+    so its spelling index, correction cache and code paths are hot when the
+    first real request arrives.
+    """
+    def __init__(self, model_path, cache_size=10000, poll_interval=2.0, warm_texts=None):
+        self.model_path = str(model_path)
+        self.cache_size = cache_size
+        self.poll_interval = poll_interval
+        self.warm_texts = list(warm_texts) if warm_texts else []
+        self._lock = threading.Lock()  # one load at a time
+        self._stop = threading.Event()
+        self._thread = None
+        
+        self.generation = 0
+        self.reloads = 0
+        self.failures = 0
+        self.reload_seconds = []
+        self.last_error = None
+        self.loaded_at = None
+        
+        self._signature = None
+        self._current = None
+        self.reload(force=True)
+    
+    def current(self):
+        """The model to use for one request or batch"""
+        return self._current
+    
+    def reload(self, force=False):
+        """Load the artifact if it changed since the last load; True if a new model was swapped in"""
+        with self._lock:
+            signature = file_signature(self.model_path)
+            if not force and (signature is None or signature == self._signature):
+                return False
+            
+            start = time.perf_counter()
+            try:
+                model_data = load_model(self.model_path, cache_size=self.cache_size)
+                # Stamped before warm-up: result cache keys include the generation
+                model_data['generation'] = self.generation + 1
+                if self.warm_texts:
+                    predict_batch(self.warm_texts, model_data, batch_size=len(self.warm_texts))
+            except Exception as e:
+                if self._current is None:
+                    raise
+                # Keep serving the old model; a later change of the file is retried
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._signature = signature
+                return False
+            
+            self._current = model_data
+            self.generation += 1
+            self._signature = signature
+            self.loaded_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self.last_error = None
+            if self.generation > 1:
+                self.reloads += 1
+            self.reload_seconds.append(time.perf_counter() - start)
+            del self.reload_seconds[:-100]
+            return True
+    
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.reload()
+    
+    def start(self):
+        """Start polling the artifact in a daemon thread"""
+        if self._thread is None and self.poll_interval:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+    
+    def stats(self):
+        """Current version and reload timings"""
+        model_data = self._current
+        durations = sorted(self.reload_seconds)
+        return {
+            'model_path': self.model_path,
+            'version': model_data.get('version', 1),
+            'generation': self.generation,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_reload_ms': self.reload_seconds[-1] * 1000.0 if durations else None,
+            'max_reload_ms': durations[-1] * 1000.0 if durations else None,
+            'mean_reload_ms': sum(durations) / len(durations) * 1000.0 if durations else None
+        }
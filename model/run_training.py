@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """Simple wrapper to run training"""
 import sys
+import argparse
 from pathlib import Path
 
 # Add parent directory to path
@@ -8,13 +9,40 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from model.train_model import train_model
+import instrumentation
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the hate speech model")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="stream the CSV in chunks of this many rows (bounded memory)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="preprocessing processes (0 = all cores)")
+    parser.add_argument("--cache", default=str(project_root / "model" / "preprocess_cache.sqlite"),
+                        help="SQLite file keeping preprocessed rows and spelling corrections between runs")
+    parser.add_argument("--no-cache", action="store_true", help="preprocess every row from scratch")
+    parser.add_argument("--report", help="write per-phase timings and counters as JSON")
+    parser.add_argument("--prometheus", help="write the same metrics in Prometheus text format")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record peak memory per phase with tracemalloc (slower)")
+    args = parser.parse_args()
+    
     csv_path = project_root / "TABEL DATA LATIH HATESPEECH RISET.csv"
     if csv_path.exists():
-        train_model(str(csv_path))
+        rec = None
+        if args.report or args.prometheus or args.trace_memory:
+            rec = instrumentation.enable(track_memory=args.trace_memory)
+        train_model(str(csv_path), chunksize=args.chunksize, workers=args.workers,
+                    cache=None if args.no_cache else args.cache)
+        if rec is not None:
+            instrumentation.disable()
+            for p in rec.report()['phases']:
+                peak = f", peak {p['peak_bytes'] / 1e6:.1f} MB" if 'peak_bytes' in p else ""
+                print(f"  {p['name']:<28} {p['seconds']:>8.3f}s{peak}")
+            if args.report:
+                rec.write_json(args.report)
+            if args.prometheus:
+                with open(args.prometheus, "w", encoding="utf-8") as f:
+                    f.write(rec.to_prometheus())
     else:
         print(f"Error: CSV file not found at {csv_path}")
         sys.exit(1)
-
-
@@ -0,0 +1,1317 @@
+"""
+Inference runtime: text preprocessing, TF-IDF and Multinomial NB
+
+Everything load_model, predict_text and predict_batch need, on NumPy and
+the standard library only, so serving and CLI processes start without
+importing pandas or the training code. train_model re-exports all of it
+(training fits the same classes), and predict resolves classes pickled
+from train_model to this module.
+"""
+
+import copy
+import re
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import chain, repeat
+from types import MappingProxyType
+
+import numpy as np
+
+import instrumentation
+
+# ============================================================================
+# TEXT PREPROCESSING
+# ============================================================================
+
+PUNCT_EDGES = ".,!?;:\"'()[]{}<>`~|\\/"
+URL_PREFIXES = ("http://", "https://", "www.")
+
+# Mention/hashtag body: \w matches exactly the characters where
+# c.isalnum() or c == "_"
+_WORD_RE = re.compile(r"\w+")
+
+# ASCII characters text_cleaning drops (digits, punctuation, control chars);
+# non-ASCII characters are dropped by encoding to ASCII first
+_DROP_ASCII = str.maketrans("", "", "".join(
+    c for c in map(chr, range(128))
+    if c.isdigit() or not (c.isalnum() or c == "_" or c.isspace())
+))
+
+KAMUS_SLANG = MappingProxyType({
+    'yg': 'yang', 'gk': 'tidak', 'ga': 'tidak', 'tdk': 'tidak',
+    'bgt': 'banget', 'dr': 'dari', 'dlm': 'dalam', 'utk': 'untuk',
+    'gw': 'saya', 'gue': 'saya', 'lu': 'kamu', 'lo': 'kamu',
+    'org': 'orang', 'dg': 'dengan', 'dgn': 'dengan', 'klo': 'kalau',
+    'krn': 'karena', 'jg': 'juga', 'sdh': 'sudah', 'udh': 'sudah',
+    'blm': 'belum', 'tp': 'tapi', 'sm': 'sama', 'bs': 'bisa',
+    'aj': 'saja', 'aja': 'saja', 'bkn': 'bukan', 'hrs': 'harus', 'si': 'sih',
+    'kek': 'seperti', 'tu': 'itu', 'ni': 'ini', 'tak': 'tidak', 'dah': 'sudah',
+    'makin': 'semakin', "gak": "tidak", "kalo": "kalau", "kaya": "seperti", "udah": "sudah",
+    "keknya": "sepertinya", "emang": "memang", "kau": "kamu"
+})
+
+STOPWORDS = frozenset({
+    "yang", "dan", "di", "ke", "dari", "untuk", "adalah", "dengan", "para",
+    "itu", "ini", "nya", "pun", "sih", "kamu", "kok", "kau", "makin",
+    "kalau", "kan", "kst", "dob", "lah", "buat", "pas", "jadi", "apa",
+    "sama", "beda", "bukan", "mau", "banyak", "kstp", "aku", "iya", "tau",
+    "pak", "dulu", "gua", "semua", "mana", "memang", "tuh"
+})
+
+
+def text_cleaning(text: str) -> str:
+    """Clean text from social media format"""
+    kept = []
+    
+    for tok in text.lower().split():
+        core = tok.strip(PUNCT_EDGES)
+        
+        if not core:
+            continue
+        
+        # Remove mentions and hashtags
+        if core[0] in "@#" and _WORD_RE.fullmatch(core, 1):
+            continue
+        
+        # Remove URLs
+        if core.startswith(URL_PREFIXES):
+            continue
+        
+        kept.append(tok)
+    
+    # Remove non-ASCII, numbers and punctuation in one pass, then extra spaces
+    text = " ".join(kept).encode("ascii", "ignore").decode("ascii").translate(_DROP_ASCII)
+    return " ".join(text.split())
+
+
+def edit_distance(a, b):
+    """Calculate edit distance between two strings"""
+    dp = np.zeros((len(a) + 1, len(b) + 1), dtype=int)
+    dp[:, 0] = np.arange(len(a) + 1)
+    dp[0, :] = np.arange(len(b) + 1)
+    
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            dp[i, j] = min(
+                dp[i - 1, j] + 1,
+                dp[i, j - 1] + 1,
+                dp[i - 1, j - 1] + cost
+            )
+    return dp[-1, -1]
+
+
+def correct_word(word, vocab, word_freq, max_dist=2):
+    """Correct word spelling using vocabulary"""
+    if word in vocab:
+        return word
+    if isinstance(vocab, Lexicon):
+        return _correct_in_lexicon(word, vocab, word_freq, max_dist)
+    
+    best = word
+    best_dist = max_dist + 1
+    best_freq = -1
+    calls = 0
+    
+    for v in vocab:
+        if abs(len(v) - len(word)) > max_dist:
+            continue
+        d = edit_distance(word, v)
+        calls += 1
+        if d <= max_dist:
+            f = word_freq.get(v, 0)
+            if (d < best_dist) or (d == best_dist and f > best_freq):
+                best = v
+                best_dist = d
+                best_freq = f
+    
+    rec = instrumentation.recorder
+    if rec is not None:
+        rec.add("spelling.lookups")
+        rec.add("spelling.edit_distance_calls", calls)
+    return best
+
+
+def _correct_in_lexicon(word, lexicon, word_freq, max_dist):
+    """correct_word over the length buckets of a Lexicon, same ranking as the vocab scan"""
+    best = word
+    best_key = None
+    calls = 0
+    for v, rank in lexicon.length_range(len(word) - max_dist, len(word) + max_dist):
+        d = edit_distance(word, v)
+        calls += 1
+        if d <= max_dist:
+            key = (d, -word_freq.get(v, 0), rank)
+            if best_key is None or key < best_key:
+                best = v
+                best_key = key
+    
+    rec = instrumentation.recorder
+    if rec is not None:
+        rec.add("spelling.lookups")
+        rec.add("spelling.edit_distance_calls", calls)
+    return best
+
+
+def spelling_correction(tokens, vocab, word_freq, max_dist=2, index=None):
+    """Apply spelling correction to tokens"""
+    if index is not None:
+        return [index.lookup(w, max_dist=max_dist) for w in tokens]
+    return [correct_word(w, vocab, word_freq, max_dist=max_dist) for w in tokens]
+
+
+def _is_missing(tokens):
+    """None or NaN (an empty cell of a pandas column), without importing pandas"""
+    return tokens is None or (isinstance(tokens, float) and tokens != tokens)
+
+
+def normalize(tokens):
+    """Normalize slang words"""
+    if _is_missing(tokens):
+        return tokens
+    
+    return [KAMUS_SLANG.get(w, w) for w in tokens]
+
+
+def remove_stopwords(tokens):
+    """Remove stopwords"""
+    if _is_missing(tokens):
+        return tokens
+    
+    return [w for w in tokens if w not in STOPWORDS]
+
+
+def stem(tokens):
+    """Simple stemming - in production use Sastrawi"""
+    if _is_missing(tokens):
+        return tokens
+    
+    # Basic Indonesian stemming rules
+    stemmed = []
+    for w in tokens:
+        if w.endswith('kan'):
+            stemmed.append(w[:-3])
+        elif w.endswith('an'):
+            stemmed.append(w[:-2])
+        elif w.endswith('i'):
+            stemmed.append(w[:-1])
+        else:
+            stemmed.append(w)
+    
+    return stemmed
+
+
+def process_tokens(tokens, drop_empty=False):
+    """normalize + remove_stopwords + stem in a single loop"""
+    slang = KAMUS_SLANG
+    stopwords = STOPWORDS
+    out = []
+    
+    for w in tokens:
+        w = slang.get(w, w)
+        if w in stopwords:
+            continue
+        
+        if w.endswith('kan'):
+            w = w[:-3]
+        elif w.endswith('an'):
+            w = w[:-2]
+        elif w.endswith('i'):
+            w = w[:-1]
+        
+        if w or not drop_empty:
+            out.append(w)
+    
+    return out
+
+
+# ============================================================================
+# CORRECTION LEXICON
+# ============================================================================
+
+class PackedStrings:
+    """Distinct strings packed into one UTF-8 bytes blob.
+    
+    The strings are grouped by encoded length and sorted inside each
+    group, so every group is a sorted array of fixed-width records and
+    string i is found by arithmetic (no offsets to store). find_many looks
+    up a batch with np.searchsorted over the groups it touches; single
+    lookups go through an open-addressing table of positions that is built
+    on first use and never pickled (str hashes differ between processes).
+    """
+    def __init__(self, blob=b"", starts=None, ascii=True):
+        self.blob = blob
+        # Strings of n UTF-8 bytes are positions starts[n]:starts[n + 1]
+        self.starts = np.zeros(1, dtype=np.int32) if starts is None else starts
+        # All strings ASCII: byte length is character length
+        self.ascii = ascii
+        self._views()
+    
+    def _views(self):
+        """Bucket bounds as Python ints (indexing NumPy scalars dominates a lookup)"""
+        self._starts = self.starts.tolist()
+        widths = np.arange(len(self.starts) - 1, dtype=np.int64)
+        self._base = [0] + np.cumsum(np.diff(self.starts) * widths).tolist()
+        self._slots = None
+    
+    @staticmethod
+    def _pack(strings):
+        """(blob, starts, ascii, order) for a list of distinct strings; order[i] is the index of stored string i"""
+        encoded = [s.encode("utf-8") for s in strings]
+        lengths = list(map(len, encoded))
+        # By bytes, then stably by length (builtin sort keys, no per-item lambda)
+        order = sorted(range(len(strings)), key=encoded.__getitem__)
+        order.sort(key=lengths.__getitem__)
+        sizes = np.array(lengths, dtype=np.int64)[order]
+        return (b"".join([encoded[i] for i in order]),
+                np.searchsorted(sizes, np.arange(int(sizes.max(initial=0)) + 2)).astype(np.int32),
+                # Only ASCII encodes every character as one byte
+                sum(lengths) == sum(map(len, strings)), order)
+    
+    @classmethod
+    def build(cls, strings):
+        """Pack distinct strings"""
+        blob, starts, ascii, _ = cls._pack(list(strings))
+        return cls(blob, starts, ascii)
+    
+    def _table(self):
+        """(slots, mask): slot -> position + 1 (0 empty), at most half full, probed linearly"""
+        slots = self._slots
+        if slots is None:
+            size = 1 << (2 * len(self)).bit_length()
+            table = memoryview(np.zeros(size, dtype=np.int32))
+            mask = size - 1
+            for i, s in enumerate(self.strings()):
+                slot = hash(s) & mask
+                while table[slot]:
+                    slot = (slot + 1) & mask
+                table[slot] = i + 1
+            # One assignment, so concurrent first lookups never see half a table
+            slots = self._slots = (table, mask)
+        return slots
+    
+    def _find(self, s):
+        """Position of s, or -1"""
+        table, mask = self._slots or self._table()
+        slot = hash(s) & mask
+        i = table[slot] - 1
+        if i < 0:
+            return -1
+        key = s.encode("utf-8")
+        n = len(key)
+        starts = self._starts
+        if n + 1 >= len(starts):
+            return -1
+        lo, hi = starts[n], starts[n + 1]
+        # String i of this bucket is blob[base + i * n:base + (i + 1) * n]
+        base = self._base[n] - lo * n
+        blob = self.blob
+        while i >= 0:
+            if lo <= i < hi and blob[base + i * n:base + i * n + n] == key:
+                return i
+            slot = (slot + 1) & mask
+            i = table[slot] - 1
+        return -1
+    
+    def find_many(self, strings):
+        """Positions of strings (-1 if absent), one np.searchsorted per length group"""
+        keys = [s.encode("utf-8") for s in strings]
+        found = [-1] * len(keys)
+        by_length = {}
+        for j, key in enumerate(keys):
+            by_length.setdefault(len(key), []).append(j)
+        
+        starts = self._starts
+        blob = self.blob
+        for n, js in by_length.items():
+            if n + 1 >= len(starts) or starts[n] == starts[n + 1]:
+                continue
+            lo, hi = starts[n], starts[n + 1]
+            if n == 0:
+                for j in js:
+                    found[j] = lo
+                continue
+            # Fixed-width bytes records order like the bytes themselves (text_cleaning
+            # strips control characters, so no string ends in the NUL padding)
+            base = self._base[n]
+            group = np.frombuffer(blob, dtype=f"S{n}", count=hi - lo, offset=base)
+            for j, p in zip(js, np.searchsorted(group, np.array([keys[j] for j in js], dtype=f"S{n}")).tolist()):
+                if p < hi - lo and blob[base + p * n:base + p * n + n] == keys[j]:
+                    found[j] = lo + p
+        return found
+    
+    def _bucket(self, n):
+        """Strings of n UTF-8 bytes, in stored order"""
+        if n == 0:
+            return [""] * (self._starts[1] - self._starts[0])
+        chunk = self.blob[self._base[n]:self._base[n + 1]]
+        if self.ascii:
+            text = chunk.decode("ascii")
+            return [text[p:p + n] for p in range(0, len(text), n)]
+        return [chunk[p:p + n].decode("utf-8") for p in range(0, len(chunk), n)]
+    
+    def strings(self):
+        """All strings, in stored order"""
+        return [s for n in range(len(self._starts) - 1) for s in self._bucket(n)]
+    
+    def string(self, i):
+        """The string at position i"""
+        n = bisect_right(self._starts, i) - 1
+        p = self._base[n] + (i - self._starts[n]) * n
+        return self.blob[p:p + n].decode("utf-8")
+    
+    def __contains__(self, s):
+        return self._find(s) >= 0
+    
+    def __len__(self):
+        return self._starts[-1]
+    
+    @property
+    def nbytes(self):
+        """Bytes held by the blob, the arrays and the lookup table (once built)"""
+        table = self._slots[0].nbytes if self._slots is not None else 0
+        return len(self.blob) + self.starts.nbytes + table
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_starts'], state['_base'], state['_slots']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+
+class Lexicon(PackedStrings):
+    """Correction vocabulary with word frequencies, packed for low memory.
+    
+    A set of str objects plus a dict of every token costs well over a
+    hundred bytes per word. Here the words are PackedStrings, and
+    frequency and vocab-order rank are NumPy arrays parallel to the stored
+    positions. Membership and frequency are one probe of the lookup table,
+    correct_word only scans the groups within max_dist of the query
+    length, and iteration yields the words in their original vocab order,
+    so a SpellingIndex built from a Lexicon breaks ties exactly like one
+    built from the set. Only vocab words are kept: tokens below MIN_COUNT
+    are never correction targets, so their frequencies are never read at
+    inference time.
+    """
+    def __init__(self, blob=b"", freq=None, rank=None, starts=None, ascii=True):
+        self.freq = np.zeros(0, dtype=np.int64) if freq is None else freq
+        self.rank = np.zeros(0, dtype=np.int32) if rank is None else rank
+        super().__init__(blob, starts, ascii)
+    
+    @classmethod
+    def build(cls, vocab, word_freq):
+        """Pack vocab (its iteration order is the tie-break rank) with word_freq[v] (0 if missing)"""
+        words = list(vocab)
+        blob, starts, ascii, order = cls._pack(words)
+        return cls(
+            blob=blob,
+            freq=np.array([word_freq.get(words[i], 0) for i in order], dtype=np.int64),
+            rank=np.array(order, dtype=np.int32),
+            starts=starts,
+            ascii=ascii
+        )
+    
+    def __iter__(self):
+        """Words in their original vocab order"""
+        words = self.strings()
+        return iter([words[i] for i in np.argsort(self.rank).tolist()])
+    
+    def items(self):
+        """(word, frequency) in vocab order"""
+        words = self.strings()
+        freq = self.freq.tolist()
+        return iter([(words[i], freq[i]) for i in np.argsort(self.rank).tolist()])
+    
+    def __getitem__(self, word):
+        i = self._find(word)
+        if i < 0:
+            raise KeyError(word)
+        return int(self.freq[i])
+    
+    def get(self, word, default=None):
+        """Frequency of word, or default"""
+        i = self._find(word)
+        return int(self.freq[i]) if i >= 0 else default
+    
+    def get_many(self, words, default=-1):
+        """Frequencies of words as an int64 array (default where absent); repeated words are looked up once"""
+        words = list(words)
+        distinct = list(dict.fromkeys(words))
+        positions = np.array(self.find_many(distinct), dtype=np.int64)
+        values = np.where(positions >= 0, self.freq[positions] if len(self) else default, default)
+        found = dict(zip(distinct, values.tolist()))
+        return np.fromiter(map(found.__getitem__, words), dtype=np.int64, count=len(words))
+    
+    def length_range(self, min_len, max_len):
+        """(word, rank) for every word with min_len <= len(word) <= max_len"""
+        last = len(self._starts) - 2
+        # A character is 1 to 4 UTF-8 bytes
+        high = max_len if self.ascii else 4 * max_len
+        for n in range(max(min_len, 0), min(high, last) + 1):
+            words = self._bucket(n)
+            ranks = self.rank[self._starts[n]:self._starts[n + 1]].tolist()
+            if self.ascii:
+                yield from zip(words, ranks)
+            else:
+                yield from ((w, r) for w, r in zip(words, ranks) if min_len <= len(w) <= max_len)
+    
+    @property
+    def nbytes(self):
+        """Bytes held by the blob, the arrays and the lookup table (once built)"""
+        return super().nbytes + self.freq.nbytes + self.rank.nbytes
+
+
+class LexiconRanks:
+    """Read-only word -> vocab-order rank view of a Lexicon (SpellingIndex.rank)"""
+    def __init__(self, lexicon):
+        self.lexicon = lexicon
+    
+    def __contains__(self, word):
+        return self.lexicon._find(word) >= 0
+    
+    def __len__(self):
+        return len(self.lexicon)
+    
+    def __iter__(self):
+        return iter(self.lexicon)
+    
+    def __getitem__(self, word):
+        i = self.lexicon._find(word)
+        if i < 0:
+            raise KeyError(word)
+        return int(self.lexicon.rank[i])
+    
+    def get(self, word, default=None):
+        i = self.lexicon._find(word)
+        return int(self.lexicon.rank[i]) if i >= 0 else default
+
+
+def compact_lexicon(model_data):
+    """model_data with the correction vocabulary and TF-IDF terms stored as Lexicons.
+    
+    The vocab set and word_freq dict become one Lexicon of the vocab words,
+    a spelling_index pickled with dicts is rebuilt over it (keeping its
+    tie-break ranks) and a dict vectorizer.vocab becomes a Lexicon of term
+    -> column. Returns a shallow copy (the vectorizer is copied, not
+    modified); model_data that is already compact, memory-mapped or empty
+    is returned as is.
+    """
+    updates = {}
+    index = model_data.get('spelling_index')
+    if index is not None and isinstance(index.rank, dict):
+        # The index ranks are the training-time vocab order, the unpickled set's may differ
+        lexicon = Lexicon.build(sorted(index.rank, key=index.rank.get), index.freq)
+        updates['spelling_index'] = SpellingIndex(max_dist=index.max_dist).build(lexicon, lexicon)
+        updates['vocab'] = updates['word_freq'] = lexicon
+    elif isinstance(model_data.get('vocab'), (set, frozenset)):
+        if index is not None and isinstance(index.freq, Lexicon):
+            lexicon = index.freq
+        else:
+            lexicon = Lexicon.build(model_data['vocab'], model_data['word_freq'])
+        updates['vocab'] = updates['word_freq'] = lexicon
+    
+    vectorizer = model_data.get('vectorizer')
+    if vectorizer is not None and isinstance(vectorizer.vocab, dict):
+        vectorizer = copy.copy(vectorizer)
+        vectorizer.vocab = Lexicon.build(vectorizer.vocab, vectorizer.vocab)
+        updates['vectorizer'] = vectorizer
+    
+    return dict(model_data, **updates) if updates else model_data
+
+
+# ============================================================================
+# SPELLING CORRECTION INDEX
+# ============================================================================
+
+def _deletes(word, max_dist):
+    """All strings reachable from word by removing up to max_dist characters"""
+    result = {word}
+    frontier = [word]
+    for _ in range(max_dist):
+        next_frontier = []
+        for w in frontier:
+            for i in range(len(w)):
+                d = w[:i] + w[i + 1:]
+                if d not in result:
+                    result.add(d)
+                    next_frontier.append(d)
+        frontier = next_frontier
+    return result
+
+
+class DeletionTable:
+    """Deletion variant -> vocab words registered under it, as Lexicon positions.
+    
+    The variants are PackedStrings and bucket k is ids[indptr[k]:indptr[k + 1]],
+    int32 positions into the Lexicon, so no word string is stored twice.
+    """
+    def __init__(self, keys=None, indptr=None, ids=None, lexicon=None):
+        self.keys = PackedStrings() if keys is None else keys
+        self.indptr = np.zeros(1, dtype=np.int32) if indptr is None else indptr
+        self.ids = np.zeros(0, dtype=np.int32) if ids is None else ids
+        self.lexicon = Lexicon() if lexicon is None else lexicon
+    
+    @classmethod
+    def build(cls, buckets, lexicon):
+        """Table of buckets ({variant: [Lexicon positions]}) over lexicon"""
+        blob, starts, ascii, order = PackedStrings._pack(list(buckets))
+        values = list(buckets.values())
+        ordered = [values[k] for k in order]
+        indptr = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(list(map(len, ordered)), out=indptr[1:])
+        ids = np.fromiter(chain.from_iterable(ordered), dtype=np.int32, count=int(indptr[-1]))
+        if indptr[-1] <= np.iinfo(np.int32).max:
+            indptr = indptr.astype(np.int32)
+        return cls(PackedStrings(blob, starts, ascii), indptr, ids, lexicon)
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def __iter__(self):
+        return iter(self.keys.strings())
+    
+    def _words(self, k):
+        lo, hi = self.indptr[k:k + 2].tolist()
+        return [self.lexicon.string(i) for i in self.ids[lo:hi].tolist()]
+    
+    def __getitem__(self, variant):
+        k = self.keys.find_many([variant])[0]
+        if k < 0:
+            raise KeyError(variant)
+        return self._words(k)
+    
+    def get(self, variant, default=None):
+        k = self.keys.find_many([variant])[0]
+        return self._words(k) if k >= 0 else default
+    
+    def union(self, variants):
+        """Set of the words registered under any of variants"""
+        ids = set()
+        indptr = self.indptr
+        for k in self.keys.find_many(variants):
+            if k >= 0:
+                lo, hi = indptr[k:k + 2].tolist()
+                ids.update(self.ids[lo:hi].tolist())
+        string = self.lexicon.string
+        return {string(i) for i in ids}
+    
+    @property
+    def nbytes(self):
+        """Bytes held by the variants and the bucket arrays (not the Lexicon)"""
+        return self.keys.nbytes + self.indptr.nbytes + self.ids.nbytes
+
+
+class SpellingIndex:
+    """SymSpell-style deletion dictionary over the correction vocabulary.
+    
+    Every vocab word is registered under all of its deletion variants, so a
+    lookup only generates the deletions of the query and verifies the few
+    words sharing one of them, instead of scanning the whole vocabulary.
+    Candidates are ranked exactly like correct_word: smallest edit distance,
+    then highest frequency, then first position in vocab iteration order.
+    Frequency and rank are read from a Lexicon and the deletion buckets hold
+    its positions (DeletionTable), so the index stores no word strings.
+    """
+    def __init__(self, max_dist=2):
+        self.max_dist = max_dist
+        self.deletes = DeletionTable()
+        self.freq = Lexicon()
+        self.rank = LexiconRanks(self.freq)
+    
+    def build(self, vocab, word_freq):
+        """Build the index from vocab and word_freq (a Lexicon passed as both is shared, not copied)"""
+        if isinstance(vocab, Lexicon) and word_freq is vocab:
+            lexicon = vocab
+        else:
+            lexicon = Lexicon.build(vocab, word_freq)
+        
+        buckets = {}
+        for i, v in enumerate(lexicon.strings()):
+            for d in _deletes(v, self.max_dist):
+                bucket = buckets.get(d)
+                if bucket is None:
+                    buckets[d] = [i]
+                else:
+                    bucket.append(i)
+        
+        self.freq = lexicon
+        self.rank = LexiconRanks(lexicon)
+        self.deletes = DeletionTable.build(buckets, lexicon)
+        return self
+    
+    def __contains__(self, word):
+        return word in self.rank
+    
+    def __len__(self):
+        return len(self.rank)
+    
+    def candidates(self, word, max_dist=None):
+        """Vocab words sharing a deletion variant with word"""
+        if max_dist is None:
+            max_dist = self.max_dist
+        if max_dist > self.max_dist:
+            raise ValueError(f"Index built for max_dist={self.max_dist}, got {max_dist}")
+        
+        return self.deletes.union(_deletes(word, max_dist))
+    
+    def lookup(self, word, max_dist=None):
+        """Correct a single word, same result as correct_word"""
+        if word in self.rank:
+            return word
+        return self.closest(self.distances(word, max_dist), word, max_dist)
+    
+    def distances(self, word, max_dist=None, known=None):
+        """{candidate: edit distance} for the candidates of word, reusing the distances in known.
+        
+        The candidates depend only on which words are in the vocabulary, not
+        on their frequencies or order, so preprocess_cache.py keeps these
+        between training runs and re-ranks them with closest().
+        """
+        if max_dist is None:
+            max_dist = self.max_dist
+        if known is None:
+            known = {}
+        
+        result = {}
+        calls = 0
+        for v in self.candidates(word, max_dist):
+            if abs(len(v) - len(word)) > max_dist:
+                continue
+            d = known.get(v)
+            if d is None:
+                d = edit_distance(word, v)
+                calls += 1
+            result[v] = d
+        
+        rec = instrumentation.recorder
+        if rec is not None:
+            rec.add("spelling.lookups")
+            rec.add("spelling.edit_distance_calls", calls)
+        return result
+    
+    def closest(self, distances, word, max_dist=None):
+        """Nearest candidate within max_dist, then most frequent, then first in vocab order (or word)"""
+        if max_dist is None:
+            max_dist = self.max_dist
+        
+        best = word
+        best_key = None
+        for v, d in distances.items():
+            if d <= max_dist:
+                key = (d, -self.freq[v], self.rank[v])
+                if best_key is None or key < best_key:
+                    best = v
+                    best_key = key
+        return best
+
+
+class CorrectionCache:
+    """Memoized spelling correction on top of a SpellingIndex.
+    
+    Tokens seen during training resolve through the precomputed table, new
+    tokens go through the index once and are kept in a bounded LRU.
+    """
+    def __init__(self, index, table=None, max_dist=2, maxsize=10000):
+        self.index = index
+        self.table = table if table is not None else {}
+        self.max_dist = max_dist
+        self.maxsize = maxsize
+        self.table_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __contains__(self, word):
+        return word in self.index
+    
+    def lookup(self, word, max_dist=None):
+        """Correct a single word, same result as SpellingIndex.lookup"""
+        if max_dist is not None and max_dist != self.max_dist:
+            return self.index.lookup(word, max_dist=max_dist)
+        if word in self.index:
+            return word
+        
+        corrected = self.table.get(word)
+        if corrected is not None:
+            with self._lock:
+                self.table_hits += 1
+            return corrected
+        
+        with self._lock:
+            corrected = self._lru.get(word)
+            if corrected is not None:
+                self._lru.move_to_end(word)
+                self.hits += 1
+                return corrected
+            self.misses += 1
+        
+        corrected = self.index.lookup(word, max_dist=self.max_dist)
+        
+        with self._lock:
+            self._lru[word] = corrected
+            if len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+        
+        return corrected
+    
+    def stats(self):
+        """Hit/miss counters"""
+        with self._lock:
+            table_hits, hits, misses, lru_size = self.table_hits, self.hits, self.misses, len(self._lru)
+        lookups = table_hits + hits + misses
+        return {
+            'table_size': len(self.table),
+            'lru_size': lru_size,
+            'lru_maxsize': self.maxsize,
+            'table_hits': table_hits,
+            'lru_hits': hits,
+            'misses': misses,
+            'hit_rate': (table_hits + hits) / lookups if lookups else 0.0
+        }
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_lru'] = OrderedDict()
+        del state['_lock']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# ============================================================================
+# SPARSE MATRIX
+# ============================================================================
+
+class CSRMatrix:
+    """Minimal compressed sparse row matrix (no SciPy dependency).
+    
+    Row i holds data[indptr[i]:indptr[i + 1]] at columns
+    indices[indptr[i]:indptr[i + 1]]. SciPy csr_matrix exposes the same
+    attributes, so either can be passed to MultinomialNB.
+    """
+    def __init__(self, data, indices, indptr, shape):
+        self.data = np.asarray(data)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.shape = (int(shape[0]), int(shape[1]))
+    
+    @property
+    def nnz(self):
+        return int(self.indptr[-1])
+    
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes
+    
+    def __len__(self):
+        return self.shape[0]
+    
+    def row_ids(self):
+        """Row index of every stored value"""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+    
+    def take_rows(self, rows):
+        """New CSRMatrix with the given rows, in the given order"""
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        # Position of every selected value in the source arrays
+        src = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        return CSRMatrix(self.data[src], self.indices[src], indptr, (len(rows), self.shape[1]))
+    
+    def toarray(self):
+        """Dense copy"""
+        X = np.zeros(self.shape, dtype=self.data.dtype)
+        X[self.row_ids(), self.indices] = self.data
+        return X
+
+
+def _is_sparse(X):
+    """True for CSRMatrix or any CSR-like object (e.g. scipy.sparse.csr_matrix)"""
+    return hasattr(X, "indptr") and hasattr(X, "indices") and hasattr(X, "data")
+
+
+# ============================================================================
+# TOKEN IDS
+# ============================================================================
+
+class TokenIdDocs:
+    """Token lists as one flat int32 array of interned token ids plus row offsets.
+    
+    index maps every token to its id. A fresh index assigns ids in order of
+    first occurrence, so ordering terms by id reproduces the insertion order
+    of a dict filled while scanning the docs; first_occurrence records
+    whether that holds (it does not when an existing index is extended).
+    """
+    def __init__(self, ids, offsets, index, first_occurrence=True):
+        self.ids = ids
+        self.offsets = offsets
+        self.index = index
+        self.first_occurrence = first_occurrence
+    
+    @classmethod
+    def encode(cls, docs, index=None):
+        """Intern the tokens of docs, adding unseen tokens to index"""
+        fresh = not index
+        if index is None:
+            index = {}
+        # Distinct tokens in order of first occurrence, then one lookup per token
+        for token in dict.fromkeys(chain.from_iterable(docs)):
+            if token not in index:
+                index[token] = len(index)
+        offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, docs), dtype=np.int64, count=len(docs)), out=offsets[1:])
+        ids = np.fromiter(map(index.__getitem__, chain.from_iterable(docs)), dtype=np.int32,
+                          count=int(offsets[-1]))
+        return cls(ids, offsets, index, first_occurrence=fresh)
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+    
+    def terms(self):
+        """Token of every id"""
+        return list(self.index)
+    
+    def row_ids(self):
+        """Document of every token"""
+        return np.repeat(np.arange(len(self)), self.lengths)
+    
+    def first_positions(self, n_terms=None):
+        """Sort key for the first occurrence of every id (len(ids) for ids that never occur)"""
+        n_terms = len(self.index) if n_terms is None else n_terms
+        first = np.full(n_terms, len(self.ids), dtype=np.int64)
+        if self.first_occurrence:
+            # Ids were handed out in order of first occurrence
+            present = np.bincount(self.ids, minlength=n_terms) > 0
+            first[present] = np.arange(int(present.sum()))
+        else:
+            ids, positions = np.unique(self.ids, return_index=True)
+            first[ids] = positions
+        return first
+
+
+def _top_terms(tf, first, k):
+    """Ids of the k most frequent terms (tf > 0), most frequent first, ties by first occurrence"""
+    present = np.flatnonzero(tf)
+    if k <= 0:
+        return present[:0]
+    if k < present.size:
+        counts = tf[present]
+        # Frequency of the k-th most frequent term: everything above it is in, ties fill the rest
+        kth = counts[np.argpartition(-counts, k - 1)[k - 1]]
+        above = present[counts > kth]
+        tied = present[counts == kth]
+        tied = tied[np.argsort(first[tied], kind="stable")[:k - above.size]]
+        present = np.concatenate([above, tied])
+    return present[np.lexsort((first[present], -tf[present]))]
+
+
+# ============================================================================
+# TF-IDF VECTORIZER
+# ============================================================================
+
+class TFIDFVectorizer:
+    def __init__(self, max_features=None):
+        self.max_features = max_features
+        self.vocab = Lexicon()
+        self.idf = None
+        self.feature_names = []
+        self.n_features = 0
+        self.n_docs = 0
+    
+    def fit(self, docs):
+        """Fit vectorizer on documents (token lists or TokenIdDocs).
+        
+        Terms are ranked by global frequency, ties by first occurrence;
+        max_features=None keeps every term in order of first occurrence.
+        """
+        if not isinstance(docs, TokenIdDocs):
+            docs = TokenIdDocs.encode(docs)
+        self.n_docs = len(docs)
+        n_terms = len(docs.index)
+        
+        tf = np.bincount(docs.ids, minlength=n_terms)  # Global term frequency
+        first = docs.first_positions(n_terms)
+        if self.max_features is None:
+            present = np.flatnonzero(tf)
+            selected = present[np.argsort(first[present], kind="stable")]
+        else:
+            selected = _top_terms(tf, first, self.max_features)
+        
+        # Document frequency of the selected terms: distinct (document, feature) pairs
+        feature = np.full(n_terms, -1, dtype=np.int64)
+        feature[selected] = np.arange(selected.size)
+        cols = feature[docs.ids]
+        keep = cols >= 0
+        pairs = np.unique(docs.row_ids()[keep] * max(selected.size, 1) + cols[keep])
+        df = np.bincount(pairs % max(selected.size, 1), minlength=selected.size)
+        
+        terms = docs.terms()
+        self._set_features([terms[i] for i in selected.tolist()], df)
+        return self
+    
+    def partial_fit(self, docs, positions=None):
+        """Accumulate term statistics for one batch, call finalize() after the last.
+        
+        positions gives each document's index in the order fit would have
+        seen it; frequency ties are broken by first occurrence in that order,
+        matching the stable sort in fit. Defaults to arrival order.
+        """
+        if getattr(self, '_partial', None) is None:
+            self._partial = {'df': {}, 'tf': {}, 'first': {}, 'n_docs': 0}
+        stats = self._partial
+        df, tf_global, first = stats['df'], stats['tf'], stats['first']
+        
+        if positions is None:
+            positions = range(stats['n_docs'], stats['n_docs'] + len(docs))
+        
+        for pos, doc in zip(positions, docs):
+            stats['n_docs'] += 1
+            if not doc:
+                continue
+            
+            seen = {}
+            for i, term in enumerate(doc):
+                tf_global[term] = tf_global.get(term, 0) + 1
+                if term not in seen:
+                    seen[term] = i
+            
+            for term, i in seen.items():
+                df[term] = df.get(term, 0) + 1
+                key = (int(pos), i)
+                if term not in first or key < first[term]:
+                    first[term] = key
+        
+        return self
+    
+    def finalize(self):
+        """Build vocab and idf from the statistics collected by partial_fit"""
+        stats = getattr(self, '_partial', None)
+        if stats is None:
+            raise ValueError("partial_fit must be called before finalize")
+        
+        self.n_docs = stats['n_docs']
+        tf_global, first = stats['tf'], stats['first']
+        if self.max_features is None:
+            terms = sorted(tf_global, key=lambda t: first[t])
+        else:
+            terms = sorted(tf_global, key=lambda t: (-tf_global[t], first[t]))[:self.max_features]
+        
+        self._set_terms(terms, stats['df'])
+        self._partial = None
+        return self
+    
+    def _set_terms(self, terms, df):
+        """Set the feature vocabulary and idf weights (df: term -> document count)"""
+        self._set_features(terms, [df.get(term, 0) for term in terms])
+    
+    def _set_features(self, terms, df):
+        """Set the feature vocabulary and idf weights (df: document count per feature)"""
+        # term -> column, packed like the correction vocabulary
+        self.vocab = Lexicon.build(terms, {term: idx for idx, term in enumerate(terms)})
+        self.feature_names = terms
+        self.n_features = len(terms)
+        self.df = np.asarray(df, dtype=np.int64)
+        self._set_idf()
+    
+    def _set_idf(self):
+        """Recompute idf from the stored document frequencies"""
+        N = self.n_docs
+        self.idf = (np.log((N + 1) / (self.df + 1)) + 1.0).astype(np.float32)
+    
+    def document_frequencies(self):
+        """Per-feature document counts (recovered from idf for older artifacts)"""
+        df = getattr(self, 'df', None)
+        if df is None:
+            df = np.rint((self.n_docs + 1) / np.exp(self.idf.astype(np.float64) - 1.0) - 1.0)
+            df = df.astype(np.int64)
+        return df
+    
+    def partial_update(self, docs):
+        """Add new documents to n_docs/df and refresh idf; the feature set stays fixed"""
+        df = self.document_frequencies().copy()
+        for doc in docs:
+            present = {self.vocab[t] for t in doc if t in self.vocab}
+            for j in present:
+                df[j] += 1
+        
+        self.df = df
+        self.n_docs += len(docs)
+        self._set_idf()
+        return self
+    
+    def _feature_ids(self, docs):
+        """Feature index of every token (-1 if not a feature), its document, and document lengths"""
+        if isinstance(docs, TokenIdDocs):
+            lookup = np.full(len(docs.index) + 1, -1, dtype=np.int64)
+            index = docs.index
+            for term, j in self.vocab.items():
+                i = index.get(term)
+                if i is not None:
+                    lookup[i] = j
+            return lookup[docs.ids], docs.row_ids(), docs.lengths
+        
+        lengths = np.fromiter(map(len, docs), dtype=np.int64, count=len(docs))
+        if isinstance(self.vocab, Lexicon):
+            cols = self.vocab.get_many(chain.from_iterable(docs), -1)
+        else:
+            cols = np.fromiter(map(self.vocab.get, chain.from_iterable(docs), repeat(-1)), dtype=np.int64,
+                               count=int(lengths.sum()))
+        return cols, np.repeat(np.arange(len(docs)), lengths), lengths
+    
+    def transform(self, docs, sparse=False):
+        """Transform documents (token lists or TokenIdDocs) to TF-IDF matrix (CSRMatrix if sparse)"""
+        cols, rows, lengths = self._feature_ids(docs)
+        keep = cols >= 0
+        cols, rows = cols[keep], rows[keep]
+        # Term frequency is count / document length (out-of-vocabulary tokens included)
+        lengths = np.maximum(lengths, 1).astype(np.float32)
+        n_samples = len(lengths)
+        # Sorting the flat (row, column) positions gives CSR order; runs of equal keys are the counts
+        keys, counts = np.unique(rows * self.n_features + cols, return_counts=True)
+        
+        if sparse:
+            return self._transform_sparse(keys, counts, lengths)
+        
+        X = np.zeros((n_samples, self.n_features), dtype=np.float32)
+        X.reshape(-1)[keys] = counts
+        X /= lengths[:, None]
+        X *= self.idf
+        return X
+    
+    def _transform_sparse(self, keys, counts, lengths):
+        """Same values as transform, stored as CSR"""
+        n_samples = len(lengths)
+        rows, cols = np.divmod(keys, max(self.n_features, 1))
+        indptr = np.zeros(n_samples + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_samples), out=indptr[1:])
+        
+        indices = cols.astype(np.int32)
+        data = counts.astype(np.float32)
+        data /= lengths[rows]
+        data *= self.idf[indices]
+        
+        return CSRMatrix(data, indices, indptr, (n_samples, self.n_features))
+    
+    def fit_transform(self, docs, sparse=False):
+        """Fit and transform"""
+        self.fit(docs)
+        return self.transform(docs, sparse=sparse)
+    
+    def to_dict(self):
+        """Export to dictionary for JavaScript"""
+        return {
+            'vocab': dict(self.vocab.items()),
+            'idf': self.idf.tolist(),
+            'feature_names': self.feature_names,
+            'n_features': self.n_features,
+            'max_features': self.max_features
+        }
+
+
+# ============================================================================
+# MULTINOMIAL NAIVE BAYES
+# ============================================================================
+
+class MultinomialNB:
+    def __init__(self, alpha=1.0):
+        self.alpha = float(alpha)
+        self.classes_ = None
+        self.class_log_prior_ = None
+        self.class_count_ = None
+        self.feature_count_ = None
+        self.feature_prob_ = None
+        self.feature_log_prob_ = None
+        self.n_features_ = None
+    
+    def fit(self, X, y):
+        """Fit the model (dense array or CSR matrix)"""
+        y = np.asarray(y).ravel()
+        self.classes_, y_enc = np.unique(y, return_inverse=True)
+        n_classes = self.classes_.size
+        self.n_features_ = X.shape[1]
+        
+        self.class_count_ = np.bincount(y_enc, minlength=n_classes).astype(np.float64)
+        self.feature_count_ = self._count_features(X, y_enc)
+        self._update_log_probs()
+        
+        return self
+    
+    def partial_fit(self, X, y, classes=None):
+        """Add a batch of samples to the counts (classes required on first call)"""
+        y = np.asarray(y).ravel()
+        
+        if self.class_count_ is None:
+            if classes is None:
+                raise ValueError("classes must be passed on the first call to partial_fit")
+            self.classes_ = np.unique(np.asarray(classes))
+            self.n_features_ = X.shape[1]
+            self.class_count_ = np.zeros(self.classes_.size, dtype=np.float64)
+            self.feature_count_ = np.zeros((self.classes_.size, self.n_features_), dtype=np.float64)
+        elif X.shape[1] != self.n_features_:
+            raise ValueError(f"Expected {self.n_features_} features, got {X.shape[1]}")
+        
+        y_enc = np.searchsorted(self.classes_, y)
+        y_enc = np.minimum(y_enc, self.classes_.size - 1)
+        if y.size and not np.array_equal(self.classes_[y_enc], y):
+            raise ValueError(f"y contains labels not in classes {self.classes_.tolist()}")
+        
+        self.class_count_ += np.bincount(y_enc, minlength=self.classes_.size)
+        self.feature_count_ += self._count_features(X, y_enc)
+        self._update_log_probs()
+        
+        return self
+    
+    def _count_features(self, X, y_enc):
+        """Per-class feature sums for one batch"""
+        n_samples, n_features = X.shape
+        n_classes = self.classes_.size
+        
+        if _is_sparse(X):
+            data = np.asarray(X.data, dtype=np.float64)
+            if (data < 0).any():
+                raise ValueError("Multinomial Naive Bayes requires non-negative feature values")
+            
+            # Per-class column sums over the stored values only
+            rows = np.repeat(np.arange(n_samples), np.diff(X.indptr))
+            flat = y_enc[rows] * n_features + np.asarray(X.indices)
+            return np.bincount(
+                flat, weights=data, minlength=n_classes * n_features
+            ).reshape(n_classes, n_features)
+        
+        X = np.asarray(X, dtype=np.float64)
+        if (X < 0).any():
+            raise ValueError("Multinomial Naive Bayes requires non-negative feature values")
+        
+        Y_onehot = np.zeros((n_samples, n_classes), dtype=np.float64)
+        Y_onehot[np.arange(n_samples), y_enc] = 1.0
+        return Y_onehot.T @ X
+    
+    def _update_log_probs(self):
+        """Recompute priors and smoothed feature probabilities from the counts"""
+        self.class_log_prior_ = np.log(self.class_count_ / self.class_count_.sum())
+        
+        smoothed_fc = self.feature_count_ + self.alpha
+        smoothed_total = smoothed_fc.sum(axis=1, keepdims=True)
+        
+        self.feature_prob_ = smoothed_fc / smoothed_total
+        self.feature_log_prob_ = np.log(self.feature_prob_)
+    
+    def predict_log_proba(self, X):
+        """Predict log probabilities"""
+        if not _is_sparse(X):
+            X = np.asarray(X, dtype=np.float64)
+        
+        if X.shape[1] != self.n_features_:
+            raise ValueError(f"Expected {self.n_features_} features, got {X.shape[1]}")
+        
+        if _is_sparse(X):
+            n_samples = X.shape[0]
+            rows = np.repeat(np.arange(n_samples), np.diff(X.indptr))
+            # (n_classes, nnz) contributions, summed back per row
+            contrib = self.feature_log_prob_[:, X.indices] * np.asarray(X.data, dtype=np.float64)
+            log_likelihood = np.empty((n_samples, self.classes_.size), dtype=np.float64)
+            for k in range(self.classes_.size):
+                log_likelihood[:, k] = np.bincount(rows, weights=contrib[k], minlength=n_samples)
+        else:
+            log_likelihood = X @ self.feature_log_prob_.T
+        log_joint = log_likelihood + self.class_log_prior_
+        
+        return log_joint
+    
+    def predict_proba(self, X):
+        """Predict probabilities"""
+        return self._proba_from_log_joint(self.predict_log_proba(X))
+    
+    def predict(self, X):
+        """Predict classes"""
+        log_joint = self.predict_log_proba(X)
+        best_indices = np.argmax(log_joint, axis=1)
+        return self.classes_[best_indices]
+    
+    def predict_with_proba(self, X):
+        """Predict classes and probabilities from one log-joint computation"""
+        log_joint = self.predict_log_proba(X)
+        return self.classes_[np.argmax(log_joint, axis=1)], self._proba_from_log_joint(log_joint)
+    
+    @staticmethod
+    def _proba_from_log_joint(log_joint):
+        """Normalize log-joint scores into probabilities"""
+        log_joint_stable = log_joint - log_joint.max(axis=1, keepdims=True)
+        proba = np.exp(log_joint_stable)
+        proba /= proba.sum(axis=1, keepdims=True)
+        
+        return proba
+    
+    def to_dict(self):
+        """Export to dictionary for JavaScript"""
+        return {
+            'alpha': self.alpha,
+            'classes': self.classes_.tolist(),
+            'class_log_prior': self.class_log_prior_.tolist(),
+            'feature_log_prob': self.feature_log_prob_.tolist(),
+            'n_features': self.n_features_
+        }
+
+
+# ============================================================================
+# PREPROCESSING PIPELINE
+# ============================================================================
+
+def preprocess_text(text, vocab=None, word_freq=None, index=None):
+    """Complete preprocessing pipeline"""
+    rec = instrumentation.recorder
+    if rec is not None:
+        return _preprocess_text_recorded(text, vocab, word_freq, index, rec)
+    
+    # 1. Text cleaning
+    cleaned = text_cleaning(text)
+    
+    # 2. Tokenization
+    tokens = cleaned.split()
+    
+    # 3. Spelling correction (if vocab provided)
+    if vocab and word_freq:
+        tokens = spelling_correction(tokens, vocab, word_freq, max_dist=2, index=index)
+    
+    # 4-6. Normalize slang, remove stopwords, stemming (and filter empty tokens)
+    return process_tokens(tokens, drop_empty=True)
+
+
+def _preprocess_text_recorded(text, vocab, word_freq, index, rec):
+    """preprocess_text with per-stage timings and token counters"""
+    clock = time.perf_counter
+    start = clock()
+    tokens = text_cleaning(text).split()
+    cleaned = clock()
+    rec.observe("preprocess.clean", cleaned - start)
+    
+    if vocab and word_freq:
+        corrected = spelling_correction(tokens, vocab, word_freq, max_dist=2, index=index)
+        rec.observe("preprocess.spelling", clock() - cleaned)
+        rec.add("preprocess.oov_tokens", sum(1 for w in tokens if w not in vocab))
+        rec.add("preprocess.corrected_tokens", sum(1 for a, b in zip(tokens, corrected) if a != b))
+    else:
+        corrected = tokens
+    
+    start = clock()
+    out = process_tokens(corrected, drop_empty=True)
+    rec.observe("preprocess.normalize", clock() - start)
+    rec.add("preprocess.texts")
+    rec.add("preprocess.tokens", len(tokens))
+    rec.add("preprocess.output_tokens", len(out))
+    return out
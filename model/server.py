@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+"""
+HTTP inference server with dynamic micro-batching
+
+The model is loaded once at startup and swapped for a new version when
+the artifact file is replaced (see registry.py). Concurrent /predict
+requests are queued and scored together: the batcher thread takes the
+first waiting text, collects more until max_batch_size texts or
+max_wait_ms have passed, and scores them as one sparse matrix (one
+vectorizer.transform and one predict_log_proba per batch).
+
+    python model/server.py
+    python model/server.py --model model/model.bin --port 5000 --max-batch-size 64 --max-wait-ms 5
+
+    curl -X POST localhost:5000/predict -H 'Content-Type: application/json' -d '{"text": "..."}'
+"""
+
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import Future
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import instrumentation
+from predict import predict_text, predict_batch
+from registry import ModelRegistry
+
+MAX_BATCH_TEXTS = 10000
+
+# Scored through every newly loaded model before it starts serving
+WARM_TEXTS = [
+    "Saya suka makan nasi goreng",
+    "Agama itu penting untuk kehidupan",
+    "Semua ras manusia sama derajatnya"
+]
+
+
+class MicroBatcher:
+    """Coalesce single-text requests into batches scored on one thread.
+    
+    score is called with a list of texts and must return one result per
+    text, in order. submit() blocks the calling request thread until its
+    text has been scored.
+    """
+    def __init__(self, score, max_batch_size=64, max_wait_ms=5.0):
+        self.score = score
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = {}  # histogram keyed by power-of-two upper bound
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+    
+    def submit(self, text, timeout=None):
+        """Score one text through the next batch"""
+        future = Future()
+        self._queue.put((text, future))
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+        return future.result(timeout)
+    
+    def _collect(self, first):
+        """First item plus whatever arrives before the batch is full or the wait is over"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+    
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            
+            try:
+                results = self.score([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                with self._lock:
+                    self.errors += 1
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            
+            bucket = 1 << (len(batch) - 1).bit_length()
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batch_sizes[bucket] = self.batch_sizes.get(bucket, 0) + 1
+    
+    def stats(self):
+        """Queue depth and batch-size histogram"""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'batch_size_histogram': {f"<={k}": v for k, v in sorted(self.batch_sizes.items())}
+            }
+    
+    def close(self):
+        """Finish queued requests and stop the batcher thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _error(message, status=400):
+    return jsonify({'success': False, 'error': message}), status
+
+
+def _stamp(model_data):
+    """Which model produced a response"""
+    return {'version': model_data.get('version', 1), 'generation': model_data.get('generation')}
+
+
+def _score(registry, texts):
+    """Score texts on one snapshot of the current model, returns (model_data, results)"""
+    model_data = registry.current()
+    return model_data, predict_batch(texts, model_data, batch_size=max(1, len(texts)))
+
+
+def create_app(model_path="model/model.pkl", max_batch_size=64, max_wait_ms=5.0, batching=True,
+               reload_interval=2.0, instrument=False):
+    """Flask app serving the artifact at model_path.
+    
+    batching=False scores each /predict request on its own. The artifact is
+    checked every reload_interval seconds (0 disables it; POST /reload
+    checks immediately) and a new version is swapped in without downtime.
+    instrument=True records per-stage timings and counters (see
+    instrumentation.py), served by /metrics and /metrics/prometheus.
+    """
+    if instrument and instrumentation.recorder is None:
+        instrumentation.enable()
+    
+    model_path = Path(model_path)
+    registry = ModelRegistry(model_path, poll_interval=reload_interval,
+                             warm_texts=WARM_TEXTS).start()
+    
+    app = Flask(__name__)
+    CORS(app)
+    
+    batcher = None
+    if batching:
+        def score_batch(texts):
+            model_data, results = _score(registry, texts)
+            return [(model_data, result) for result in results]
+        
+        batcher = MicroBatcher(score_batch, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    app.extensions['registry'] = registry
+    app.extensions['batcher'] = batcher
+    
+    served = {'requests': 0, 'batch_requests': 0, 'batch_texts': 0}
+    served_lock = threading.Lock()
+    
+    @app.post("/predict")
+    def predict():
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return _error("JSON body must contain a 'text' string")
+        text = payload.get('text')
+        if not isinstance(text, str):
+            return _error("JSON body must contain a 'text' string")
+        
+        if batcher is not None:
+            model_data, result = batcher.submit(text)
+        else:
+            model_data = registry.current()
+            result = predict_text(text, model_data)
+        with served_lock:
+            served['requests'] += 1
+        return jsonify({'success': True, 'data': result, 'model': _stamp(model_data)})
+    
+    @app.post("/predict/batch")
+    def predict_many():
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return _error("JSON body must contain a 'texts' list of strings")
+        texts = payload.get('texts')
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return _error("JSON body must contain a 'texts' list of strings")
+        if len(texts) > MAX_BATCH_TEXTS:
+            return _error(f"At most {MAX_BATCH_TEXTS} texts per request", status=413)
+        
+        model_data, results = _score(registry, texts)
+        with served_lock:
+            served['batch_requests'] += 1
+            served['batch_texts'] += len(texts)
+        return jsonify({'success': True, 'data': results, 'model': _stamp(model_data)})
+    
+    @app.post("/reload")
+    def reload():
+        swapped = registry.reload()
+        return jsonify({'success': True, 'reloaded': swapped, 'data': registry.stats()})
+    
+    @app.get("/metrics")
+    def metrics():
+        with served_lock:
+            data = dict(served)
+        data['batching'] = batcher.stats() if batcher is not None else None
+        data['model'] = registry.stats()
+        model_data = registry.current()
+        corrector = model_data.get('corrector')
+        data['correction_cache'] = corrector.stats() if corrector is not None else None
+        result_cache = model_data.get('result_cache')
+        data['result_cache'] = result_cache.stats() if result_cache is not None else None
+        rec = instrumentation.recorder
+        data['instrumentation'] = rec.report() if rec is not None else None
+        return jsonify({'success': True, 'data': data})
+    
+    @app.get("/metrics/prometheus")
+    def metrics_prometheus():
+        rec = instrumentation.recorder
+        if rec is None:
+            return _error("Instrumentation is off, start the server with --instrument", status=404)
+        return Response(rec.to_prometheus(), mimetype="text/plain; version=0.0.4")
+    
+    @app.get("/api/model-status")
+    def model_status():
+        model_data = registry.current()
+        json_path = model_path.with_name("model.json")
+        return jsonify({
+            'success': True,
+            'status': 'ready',
+            'message': 'Model sudah di-fit dan siap digunakan.',
+            'data': {'version': model_data.get('version', 1), 'created_at': model_data.get('created_at')},
+            'json_exists': json_path.exists(),
+            'pickle_exists': model_path.exists(),
+            'pickle_valid': True
+        })
+    
+    @app.get("/api/model-info")
+    def model_info():
+        json_path = model_path.with_name("model.json")
+        if not json_path.exists():
+            return _error("model.json not found", status=404)
+        with open(json_path, encoding="utf-8") as f:
+            return jsonify({'success': True, 'data': json.load(f)})
+    
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the hate speech model over HTTP")
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--max-batch-size", type=int, default=64,
+                        help="most /predict requests scored together")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="how long the first request of a batch waits for more")
+    parser.add_argument("--no-batching", action="store_true",
+                        help="score every /predict request on its own thread")
+    parser.add_argument("--reload-interval", type=float, default=2.0,
+                        help="seconds between checks for a new artifact (0 = only on POST /reload)")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record per-stage timings and counters (/metrics/prometheus)")
+    args = parser.parse_args()
+    
+    app = create_app(args.model, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+                     batching=not args.no_batching, reload_interval=args.reload_interval,
+                     instrument=args.instrument)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+"""
+Hyperparameter sweep over alpha and max_features
+
+The CSV is cleaned, spelling-corrected and split once (the token lists can
+also be kept on disk with --cache). The vectorizer is then fitted once with
+every training term, ranked by global frequency exactly as TFIDFVectorizer
+ranks them, so the vocabulary of max_features=m is the first m columns.
+idf and the document-length normalization do not depend on m either, so
+every configuration's TF-IDF matrix is a column slice of one shared matrix,
+and its NB and 5-fold CV counts are a slice of one shared FoldCounts.
+Each alpha only re-applies the smoothing. Configurations with the same
+max_features run as one task, spread over --workers processes.
+
+    python model/sweep.py
+    python model/sweep.py --alpha 0.1 0.5 1 2 5 --max-features 100 200 500 1000 0 --workers 4
+"""
+
+import sys
+import json
+import time
+import pickle
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from train_model import (
+    prepare_dataset, TFIDFVectorizer, TokenIdDocs, CSRMatrix, evaluate, kfold_assignment,
+    ALPHA, MAX_FEATURES, MIN_COUNT, SEED
+)
+from parallel import resolve_workers
+from cross_validation import FoldCounts, cross_validate
+from metrics import precision_recall_f1
+
+RANK_BY = {
+    'cv_accuracy': "mean 5-fold CV accuracy on the training split",
+    'test_accuracy': "accuracy on the test split",
+    'test_macro_f1': "macro F1 on the test split",
+    'test_auc': "OvR AUC on the test split",
+}
+
+# Shared matrices and counts, set by _init_worker (or directly when running serially)
+_state = {}
+
+
+def first_columns(X, n_columns):
+    """CSR matrix with only the columns below n_columns"""
+    if n_columns >= X.shape[1]:
+        return X
+    keep = X.indices < n_columns
+    # Kept values before each row start
+    indptr = np.concatenate([[0], np.cumsum(keep)])[X.indptr]
+    return CSRMatrix(X.data[keep], X.indices[keep], indptr, (X.shape[0], n_columns))
+
+
+def load_prepared(csv_path, workers=1, cache=None):
+    """prepare_dataset on the CSV, reusing the token lists stored in cache if the CSV is unchanged"""
+    with open(csv_path, "rb") as f:
+        key = hashlib.sha256(f.read()).hexdigest() + f":{MIN_COUNT}:{SEED}"
+    if cache and Path(cache).exists():
+        with open(cache, "rb") as f:
+            cached = pickle.load(f)
+        if cached.get('key') == key:
+            print(f"Using preprocessed tokens from {cache}")
+            return cached['prepared']
+    
+    dataset = pd.read_csv(csv_path, sep=";", header=None)
+    dataset.columns = ["usn", "text", "class"]
+    prepared = prepare_dataset(dataset, workers=workers)
+    if cache:
+        keep = ('train_docs', 'test_docs', 'y_train', 'y_test', 'cleaned_count')
+        temp = Path(str(cache) + ".tmp")
+        with open(temp, "wb") as f:
+            pickle.dump({'key': key, 'prepared': {k: prepared[k] for k in keep}}, f)
+        temp.replace(cache)
+    return prepared
+
+
+def shared_state(prepared, n_folds=5):
+    """Full ranked TF-IDF matrices and per-fold counts every configuration is sliced from"""
+    train_ids = TokenIdDocs.encode(prepared['train_docs'])
+    y_train = prepared['y_train']
+    n_terms = len(train_ids.index)
+    vectorizer = TFIDFVectorizer(max_features=n_terms).fit(train_ids)
+    X_train = vectorizer.transform(train_ids, sparse=True)
+    folds = kfold_assignment(len(y_train), n_folds=n_folds)
+    counts = FoldCounts(np.unique(y_train), vectorizer.n_features, n_folds).add(X_train, y_train, folds)
+    return {
+        'X_train': X_train,
+        'X_test': vectorizer.transform(prepared['test_docs'], sparse=True),
+        'y_train': y_train,
+        'y_test': prepared['y_test'],
+        'folds': folds,
+        'counts': counts,
+    }
+
+
+def _init_worker(state):
+    """Pool initializer: keep the shared matrices in the worker"""
+    _state.clear()
+    _state.update(state)
+
+
+def _run_max_features(max_features, alphas):
+    """Evaluate every alpha for one max_features, returns one result dict per alpha"""
+    n_terms = _state['counts'].n_features
+    m = n_terms if not max_features else min(max_features, n_terms)
+    X_train = first_columns(_state['X_train'], m)
+    X_test = first_columns(_state['X_test'], m)
+    counts = _state['counts'].first_features(m)
+    y_train, y_test = _state['y_train'], _state['y_test']
+    
+    results = []
+    for alpha in alphas:
+        start = time.perf_counter()
+        model = counts.total_model(alpha)
+        pred, proba = model.predict_with_proba(X_test)
+        test = evaluate(y_test, pred, proba, classes=model.classes_)
+        cv = cross_validate(X_train, y_train, alpha=alpha, folds=_state['folds'], counts=counts)
+        results.append({
+            'max_features': max_features or None,
+            'n_features': m,
+            'alpha': alpha,
+            'cv_accuracy': cv['mean']['accuracy'],
+            'cv_std': cv['std']['accuracy'],
+            'cv_macro_f1': cv['mean']['macro_f1'],
+            'test_accuracy': test['accuracy'],
+            'test_macro_f1': float(precision_recall_f1(y_test, pred, average="macro")[2]),
+            'test_auc': test['auc'],
+            'seconds': time.perf_counter() - start
+        })
+    return results
+
+
+def run_sweep(state, alphas, max_features, workers=1):
+    """All (max_features, alpha) results, in grid order"""
+    workers = min(resolve_workers(workers), len(max_features))
+    if workers == 1:
+        _init_worker(state)
+        return [row for m in max_features for row in _run_max_features(m, alphas)]
+    
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(state,)) as pool:
+        futures = [pool.submit(_run_max_features, m, alphas) for m in max_features]
+        return [row for future in futures for row in future.result()]
+
+
+def print_table(results, rank_by, top=None):
+    """Ranked results, the current defaults marked with *"""
+    ranked = sorted(results, key=lambda r: (-r[rank_by], r['n_features'], r['alpha']))
+    print(f"\nRanked by {RANK_BY[rank_by]}")
+    print(f"{'rank':>5} {'max_features':>12} {'alpha':>7} {'CV acc':>16} {'CV F1':>7} "
+          f"{'test acc':>9} {'test F1':>8} {'AUC':>7} {'ms':>8}")
+    for i, r in enumerate(ranked[:top] if top else ranked, 1):
+        mark = "*" if r['max_features'] == MAX_FEATURES and r['alpha'] == ALPHA else " "
+        features = str(r['max_features']) if r['max_features'] else f"all ({r['n_features']})"
+        print(f"{i:>4}{mark} {features:>12} {r['alpha']:>7g} {r['cv_accuracy']:>8.4f} ± {r['cv_std']:.4f} "
+              f"{r['cv_macro_f1']:>7.4f} {r['test_accuracy']:>9.4f} {r['test_macro_f1']:>8.4f} "
+              f"{r['test_auc']:>7.4f} {r['seconds'] * 1000:>8.1f}")
+    return ranked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep alpha and max_features with one preprocessing pass")
+    parser.add_argument("csv", nargs="?", default=str(project_root / "TABEL DATA LATIH HATESPEECH RISET.csv"),
+                        help="usn;text;class training CSV")
+    parser.add_argument("--alpha", type=float, nargs="+", default=[0.1, 0.25, 0.5, 1.0, 2.0, 5.0])
+    parser.add_argument("--max-features", type=int, nargs="+", default=[50, 100, 200, 500, 1000, 2000, 0],
+                        help="vocabulary sizes to try (0 = every training term)")
+    parser.add_argument("--workers", type=int, default=1, help="processes (0 = all cores)")
+    parser.add_argument("--cache", help="pickle file for the preprocessed token lists")
+    parser.add_argument("--rank-by", choices=sorted(RANK_BY), default="cv_accuracy")
+    parser.add_argument("--top", type=int, default=None, help="only print the best N configurations")
+    parser.add_argument("--output", help="write every result as JSON")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    prepared = load_prepared(args.csv, workers=args.workers, cache=args.cache)
+    t_prepare = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    state = shared_state(prepared)
+    t_shared = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    results = run_sweep(state, args.alpha, args.max_features, workers=args.workers)
+    t_sweep = time.perf_counter() - start
+    
+    print(f"\n{len(results)} configurations on {len(state['y_train'])} train / {len(state['y_test'])} test "
+          f"texts, {state['counts'].n_features} terms")
+    print(f"  preprocessing {t_prepare:.2f}s, shared matrices and counts {t_shared:.2f}s, "
+          f"sweep {t_sweep:.2f}s ({resolve_workers(args.workers)} worker(s))")
+    ranked = print_table(results, args.rank_by, args.top)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({'rank_by': args.rank_by, 'results': ranked}, f, indent=2)
+        print(f"\n✓ {args.output} saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,422 +6,409 @@ Rewrite dari notebook 03012026.ipynb
 import numpy as np
 import pandas as pd
 import json
+import gzip
+import base64
+import shutil
 import pickle
+import hashlib
+import tempfile
+import time
+from collections import Counter
+from contextlib import nullcontext
+from itertools import chain
 from pathlib import Path
 
+import instrumentation
+from metrics import confusion_matrix, precision_recall_f1, roc_auc_score_ovr
+# Inference code lives in runtime (no pandas); re-exported for training, scripts and older pickles
+from runtime import (
+    PUNCT_EDGES, URL_PREFIXES, _WORD_RE, _DROP_ASCII, KAMUS_SLANG, STOPWORDS,
+    text_cleaning, edit_distance, correct_word, spelling_correction, normalize, remove_stopwords, stem,
+    process_tokens, Lexicon, compact_lexicon, _deletes, SpellingIndex, CorrectionCache, CSRMatrix, _is_sparse, TokenIdDocs,
+    _top_terms, TFIDFVectorizer, MultinomialNB, preprocess_text, _preprocess_text_recorded
+)
+
 # ============================================================================
-# TEXT PREPROCESSING
+# TRAINING LEXICON
 # ============================================================================
 
-def text_cleaning(text: str) -> str:
-    """Clean text from social media format"""
-    text = text.lower()
-    
-    punct_edges = ".,!?;:\"'()[]{}<>`~|\\/"
-    tokens = text.split()
-    kept = []
-    
-    for tok in tokens:
-        core = tok.strip(punct_edges)
-        
-        if not core:
-            continue
-        
-        # Remove mentions
-        if core.startswith("@"):
-            u = core[1:]
-            if u and all(c.isalnum() or c == "_" for c in u):
-                continue
-        
-        # Remove hashtags
-        if core.startswith("#"):
-            h = core[1:]
-            if h and all(c.isalnum() or c == "_" for c in h):
-                continue
-        
-        # Remove URLs
-        if core.startswith(("http://", "https://", "www.")):
-            continue
-        
-        kept.append(tok)
-    
-    text = " ".join(kept)
-    text = "".join(c for c in text if ord(c) < 128)  # Remove non-ASCII
-    text = "".join(c for c in text if not c.isdigit())  # Remove numbers
-    text = "".join(c for c in text if c.isalnum() or c == "_" or c.isspace())
-    text = " ".join(text.split())  # Remove extra spaces
+def build_word_freq(text_series):
+    """Build word frequency dictionary (words in order of first occurrence)"""
+    return dict(Counter(chain.from_iterable(text_series)))
+
+
+def build_correction_table(word_freq, index, max_dist=2):
+    """Correct every distinct out-of-vocabulary token in word_freq once"""
+    return {w: index.lookup(w, max_dist=max_dist) for w in word_freq if w not in index}
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def nb_kfold(X, y, alpha=2.0, n_folds=5, random_state=42):
+    """Mean and std of the k-fold accuracy (see cross_validation.cross_validate)"""
+    from cross_validation import cross_validate
     
-    return text
+    result = cross_validate(X, y, alpha=alpha, n_folds=n_folds, random_state=random_state)
+    return result['mean']['accuracy'], result['std']['accuracy']
 
 
-def build_word_freq(text_series):
-    """Build word frequency dictionary"""
-    freq = {}
-    for doc in text_series:
-        for w in doc:
-            freq[w] = freq.get(w, 0) + 1
-    return freq
-
-
-def edit_distance(a, b):
-    """Calculate edit distance between two strings"""
-    dp = np.zeros((len(a) + 1, len(b) + 1), dtype=int)
-    dp[:, 0] = np.arange(len(a) + 1)
-    dp[0, :] = np.arange(len(b) + 1)
-    
-    for i in range(1, len(a) + 1):
-        for j in range(1, len(b) + 1):
-            cost = 0 if a[i - 1] == b[j - 1] else 1
-            dp[i, j] = min(
-                dp[i - 1, j] + 1,
-                dp[i, j - 1] + 1,
-                dp[i - 1, j - 1] + cost
-            )
-    return dp[-1, -1]
-
-
-def correct_word(word, vocab, word_freq, max_dist=2):
-    """Correct word spelling using vocabulary"""
-    if word in vocab:
-        return word
-    
-    best = word
-    best_dist = max_dist + 1
-    best_freq = -1
-    
-    for v in vocab:
-        if abs(len(v) - len(word)) > max_dist:
-            continue
-        d = edit_distance(word, v)
-        if d <= max_dist:
-            f = word_freq.get(v, 0)
-            if (d < best_dist) or (d == best_dist and f > best_freq):
-                best = v
-                best_dist = d
-                best_freq = f
-    
-    return best
-
-
-def spelling_correction(tokens, vocab, word_freq, max_dist=2):
-    """Apply spelling correction to tokens"""
-    return [correct_word(w, vocab, word_freq, max_dist=max_dist) for w in tokens]
-
-
-def normalize(tokens):
-    """Normalize slang words"""
-    if tokens is None or (isinstance(tokens, float) and pd.isna(tokens)):
-        return tokens
-    
-    kamus_slang = {
-        'yg': 'yang', 'gk': 'tidak', 'ga': 'tidak', 'tdk': 'tidak',
-        'bgt': 'banget', 'dr': 'dari', 'dlm': 'dalam', 'utk': 'untuk',
-        'gw': 'saya', 'gue': 'saya', 'lu': 'kamu', 'lo': 'kamu',
-        'org': 'orang', 'dg': 'dengan', 'dgn': 'dengan', 'klo': 'kalau',
-        'krn': 'karena', 'jg': 'juga', 'sdh': 'sudah', 'udh': 'sudah',
-        'blm': 'belum', 'tp': 'tapi', 'sm': 'sama', 'bs': 'bisa',
-        'aj': 'saja', 'aja': 'saja', 'bkn': 'bukan', 'hrs': 'harus', 'si': 'sih',
-        'kek': 'seperti', 'tu': 'itu', 'ni': 'ini', 'tak': 'tidak', 'dah': 'sudah',
-        'makin': 'semakin', "gak": "tidak", "kalo": "kalau", "kaya": "seperti", "udah": "sudah",
-        "keknya": "sepertinya", "emang": "memang", "kau": "kamu"
+def evaluate(y_true, y_pred, proba, classes=None):
+    """Accuracy, micro precision/recall/F1 and exact OvR AUC (proba columns follow classes)"""
+    prec, rec, f1 = precision_recall_f1(y_true, y_pred, average="micro")
+    return {
+        'accuracy': float(np.mean(np.asarray(y_pred) == np.asarray(y_true))),
+        'precision': float(prec),
+        'recall': float(rec),
+        'f1': float(f1),
+        'auc': float(roc_auc_score_ovr(y_true, proba, labels=classes))
     }
-    
-    return [kamus_slang.get(w, w) for w in tokens]
 
 
-def remove_stopwords(tokens):
-    """Remove stopwords"""
-    if tokens is None or (isinstance(tokens, float) and pd.isna(tokens)):
-        return tokens
-    
-    stopwords = {
-        "yang", "dan", "di", "ke", "dari", "untuk", "adalah", "dengan", "para",
-        "itu", "ini", "nya", "pun", "sih", "kamu", "kok", "kau", "makin",
-        "kalau", "kan", "kst", "dob", "lah", "buat", "pas", "jadi", "apa",
-        "sama", "beda", "bukan", "mau", "banyak", "kstp", "aku", "iya", "tau",
-        "pak", "dulu", "gua", "semua", "mana", "memang", "tuh"
+# ============================================================================
+# SAVE MODEL
+# ============================================================================
+
+def build_export_data(model, vectorizer, vocab, map_target, reverse, train_metrics,
+                      test_metrics, cv_mean, cv_std, train_size, test_size, total_data):
+    """Assemble the model.json payload for JavaScript"""
+    # Convert numpy arrays to lists for JSON
+    # Skip word_freq in JSON to speed up saving (it's filtered in API anyway)
+    return {
+        'model': model.to_dict(),
+        'vectorizer': vectorizer.to_dict(),
+        'vocab': list(vocab),
+        # 'word_freq': {k: int(v) for k, v in word_freq.items()},  # Skip to speed up
+        'map_target': map_target,
+        'reverse': reverse,
+        'training_accuracy': train_metrics['accuracy'],
+        'testing_accuracy': test_metrics['accuracy'],
+        'train_size': int(train_size),
+        'test_size': int(test_size),
+        'total_data': int(total_data),
+        'train_ratio': TRAIN_RATIO,
+        'test_ratio': round(1 - TRAIN_RATIO, 10),
+        'alpha': model.alpha,
+        'max_features': vectorizer.max_features,
+        'training_metrics': train_metrics,
+        'testing_metrics': test_metrics,
+        'cv_metrics': {
+            'accuracy': float(cv_mean),
+            'std': float(cv_std)
+        }
     }
-    
-    return [w for w in tokens if w not in stopwords]
 
 
-def stem(tokens):
-    """Simple stemming - in production use Sastrawi"""
-    if tokens is None or (isinstance(tokens, float) and pd.isna(tokens)):
-        return tokens
+# Arrays in model.json that encode_export may round, quantize or pack
+EXPORT_ARRAYS = (('model', 'class_log_prior'), ('model', 'feature_log_prob'), ('vectorizer', 'idf'))
+
+
+def encode_export(export_data, indent=None, precision=None, float16=False, pack=False,
+                  include_vocab=True):
+    """Serialize export_data to model.json bytes (once, for every destination).
     
-    # Basic Indonesian stemming rules
-    stemmed = []
-    for w in tokens:
-        if w.endswith('kan'):
-            stemmed.append(w[:-3])
-        elif w.endswith('an'):
-            stemmed.append(w[:-2])
-        elif w.endswith('i'):
-            stemmed.append(w[:-1])
+    precision rounds the exported arrays to that many decimals, float16
+    quantizes them, pack stores them as base64 little-endian buffers
+    ({"dtype", "shape", "data"}) instead of JSON number lists. The options
+    are recorded under 'encoding' so decode_export can undo the packing.
+    """
+    data = dict(export_data)
+    for section, key in EXPORT_ARRAYS:
+        if section not in data or key not in data[section]:
+            continue
+        values = np.asarray(decode_array(data[section][key]), dtype=np.float64)
+        if precision is not None:
+            values = np.round(values, precision)
+        if float16:
+            values = values.astype(np.float16)
+        
+        data[section] = dict(data[section])
+        if pack:
+            values = values.astype('<f2' if float16 else '<f8')
+            data[section][key] = {
+                'dtype': values.dtype.name,
+                'shape': list(values.shape),
+                'data': base64.b64encode(values.tobytes()).decode("ascii")
+            }
+        elif float16:
+            # Shortest decimal that rounds back to the same float16
+            shortest = [float(str(v)) for v in values.ravel()]
+            data[section][key] = np.array(shortest, dtype=np.float64).reshape(values.shape).tolist()
         else:
-            stemmed.append(w)
+            data[section][key] = values.tolist()
     
-    return stemmed
+    if not include_vocab:
+        data.pop('vocab', None)
+    data['encoding'] = {'precision': precision, 'float16': bool(float16), 'packed': bool(pack)}
+    
+    separators = (",", ":") if indent is None else None
+    return json.dumps(data, indent=indent, separators=separators, ensure_ascii=False).encode("utf-8")
 
 
-# ============================================================================
-# TF-IDF VECTORIZER
-# ============================================================================
+def decode_array(value):
+    """Exported array as nested lists, whether packed or plain"""
+    if isinstance(value, dict) and 'data' in value:
+        raw = base64.b64decode(value['data'])
+        return np.frombuffer(raw, dtype=np.dtype(value['dtype']).newbyteorder('<')) \
+            .astype(np.float64).reshape(value['shape']).tolist()
+    return value
 
-class TFIDFVectorizer:
-    def __init__(self, max_features=None):
-        self.max_features = max_features
-        self.vocab = {}
-        self.idf = None
-        self.feature_names = []
-        self.n_features = 0
-        self.n_docs = 0
-    
-    def fit(self, docs):
-        """Fit vectorizer on documents"""
-        self.n_docs = len(docs)
-        
-        df = {}  # Document frequency
-        tf_global = {}  # Global term frequency
-        
-        for doc in docs:
-            if not doc:
-                continue
-            
-            unique_terms = set(doc)
-            for term in unique_terms:
-                df[term] = df.get(term, 0) + 1
-            
-            for term in doc:
-                tf_global[term] = tf_global.get(term, 0) + 1
-        
-        if self.max_features is None:
-            terms = list(tf_global.keys())
-        else:
-            terms = sorted(tf_global.keys(),
-                          key=lambda t: tf_global[t],
-                          reverse=True)[:self.max_features]
-        
-        self.vocab = {term: idx for idx, term in enumerate(terms)}
-        self.feature_names = terms
-        self.n_features = len(terms)
-        
-        N = self.n_docs
-        idf_vals = np.zeros(self.n_features, dtype=np.float32)
-        for term, idx in self.vocab.items():
-            df_t = df.get(term, 0)
-            idf_vals[idx] = np.log((N + 1) / (df_t + 1)) + 1.0
-        
-        self.idf = idf_vals
-        return self
-    
-    def transform(self, docs):
-        """Transform documents to TF-IDF matrix"""
-        n_samples = len(docs)
-        X = np.zeros((n_samples, self.n_features), dtype=np.float32)
-        
-        for i, doc in enumerate(docs):
-            if not doc:
-                continue
-            doc_len = len(doc)
-            
-            for term in doc:
-                j = self.vocab.get(term)
-                if j is not None:
-                    X[i, j] += 1.0
-            
-            if doc_len > 0:
-                X[i] /= float(doc_len)
-        
-        X *= self.idf
-        return X
-    
-    def fit_transform(self, docs):
-        """Fit and transform"""
-        self.fit(docs)
-        return self.transform(docs)
-    
-    def to_dict(self):
-        """Export to dictionary for JavaScript"""
-        return {
-            'vocab': self.vocab,
-            'idf': self.idf.tolist(),
-            'feature_names': self.feature_names,
-            'n_features': self.n_features,
-            'max_features': self.max_features
-        }
 
+def decode_export(data):
+    """Inverse of encode_export's packing (rounding/quantization is kept)"""
+    data = dict(data)
+    for section, key in EXPORT_ARRAYS:
+        if section in data and key in data[section]:
+            data[section] = dict(data[section])
+            data[section][key] = decode_array(data[section][key])
+    return data
 
-# ============================================================================
-# MULTINOMIAL NAIVE BAYES
-# ============================================================================
 
-class MultinomialNB:
-    def __init__(self, alpha=1.0):
-        self.alpha = float(alpha)
-        self.classes_ = None
-        self.class_log_prior_ = None
-        self.class_count_ = None
-        self.feature_count_ = None
-        self.feature_prob_ = None
-        self.feature_log_prob_ = None
-        self.n_features_ = None
-    
-    def fit(self, X, y):
-        """Fit the model"""
-        X = np.asarray(X, dtype=np.float64)
-        y = np.asarray(y).ravel()
-        
-        if (X < 0).any():
-            raise ValueError("Multinomial Naive Bayes requires non-negative feature values")
-        
-        self.classes_, y_enc = np.unique(y, return_inverse=True)
-        n_samples, n_features = X.shape
-        n_classes = self.classes_.size
-        self.n_features_ = n_features
-        
-        self.class_count_ = np.bincount(y_enc, minlength=n_classes).astype(np.float64)
-        self.class_log_prior_ = np.log(self.class_count_ / n_samples)
-        
-        Y_onehot = np.zeros((n_samples, n_classes), dtype=np.float64)
-        Y_onehot[np.arange(n_samples), y_enc] = 1.0
-        self.feature_count_ = Y_onehot.T @ X
-        
-        smoothed_fc = self.feature_count_ + self.alpha
-        smoothed_total = smoothed_fc.sum(axis=1, keepdims=True)
-        
-        self.feature_prob_ = smoothed_fc / smoothed_total
-        self.feature_log_prob_ = np.log(self.feature_prob_)
-        
-        return self
+def precompress(payload):
+    """Precompressed siblings of a payload: {'.gz': bytes, '.br': bytes (if brotli is installed)}"""
+    variants = {'.gz': gzip.compress(payload, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    if brotli is not None:
+        variants['.br'] = brotli.compress(payload, quality=11)
+    return variants
+
+
+def _write_atomic(path, payload):
+    """Write bytes to path through a .tmp file"""
+    temp = path.with_name(path.name + ".tmp")
+    with open(temp, "wb") as f:
+        f.write(payload)
+    temp.replace(path)
+
+
+def _copy_atomic(src, dst):
+    """Copy a file to dst through a .tmp file"""
+    temp = dst.with_name(dst.name + ".tmp")
+    shutil.copyfile(src, temp)
+    temp.replace(dst)
+
+
+def write_export(payload, output_dir="model", public_dir="public", compress=True):
+    """Write model.json (+ .gz/.br) once, then copy the files to public/.
     
-    def predict_log_proba(self, X):
-        """Predict log probabilities"""
-        X = np.asarray(X, dtype=np.float64)
-        
-        if X.shape[1] != self.n_features_:
-            raise ValueError(f"Expected {self.n_features_} features, got {X.shape[1]}")
+    Returns {filename: size in bytes} for the files in output_dir.
+    """
+    output_dir = Path(output_dir)
+    public_dir = Path(public_dir)
+    
+    # Save to model directory (with progress print and error handling)
+    print("\nMenyimpan model.json...")
+    try:
+        # Ensure directory exists
+        output_dir.mkdir(parents=True, exist_ok=True)
         
-        log_likelihood = X @ self.feature_log_prob_.T
-        log_joint = log_likelihood + self.class_log_prior_
+        files = {"model.json": payload}
+        if compress:
+            for suffix, data in precompress(payload).items():
+                files["model.json" + suffix] = data
         
-        return log_joint
+        # Siblings first, model.json last, so a reader never sees a newer .gz than .json
+        for name in sorted(files, key=lambda n: n == "model.json"):
+            _write_atomic(output_dir / name, files[name])
+        print(f"✓ model.json saved to {output_dir}/ " +
+              ", ".join(f"{name} {len(data) / 1024:.1f} KB" for name, data in files.items()))
+    except OSError as e:
+        print(f"✗ Error saving model.json: {e}")
+        print(f"  Disk space or permission issue. Check PythonAnywhere disk quota.")
+        raise
+    except Exception as e:
+        print(f"✗ Error saving model.json: {e}")
+        raise
     
-    def predict_proba(self, X):
-        """Predict probabilities"""
-        log_joint = self.predict_log_proba(X)
-        
-        log_joint_stable = log_joint - log_joint.max(axis=1, keepdims=True)
-        proba = np.exp(log_joint_stable)
-        proba /= proba.sum(axis=1, keepdims=True)
+    # Stale siblings would be served with an older model
+    for suffix in ('.gz', '.br'):
+        name = "model.json" + suffix
+        if name not in files and (output_dir / name).exists():
+            (output_dir / name).unlink()
+    
+    # Also copy to public directory for web access
+    print("Menyalin ke public/model.json...")
+    try:
+        # Ensure directory exists
+        public_dir.mkdir(parents=True, exist_ok=True)
         
-        return proba
-    
-    def predict(self, X):
-        """Predict classes"""
-        log_joint = self.predict_log_proba(X)
-        best_indices = np.argmax(log_joint, axis=1)
-        return self.classes_[best_indices]
-    
-    def to_dict(self):
-        """Export to dictionary for JavaScript"""
-        return {
-            'alpha': self.alpha,
-            'classes': self.classes_.tolist(),
-            'class_log_prior': self.class_log_prior_.tolist(),
-            'feature_log_prob': self.feature_log_prob_.tolist(),
-            'n_features': self.n_features_
-        }
-
+        for name in sorted(files, key=lambda n: n == "model.json"):
+            _copy_atomic(output_dir / name, public_dir / name)
+        for suffix in ('.gz', '.br'):
+            name = "model.json" + suffix
+            if name not in files and (public_dir / name).exists():
+                (public_dir / name).unlink()
+        print("✓ model.json copied to public/")
+    except OSError as e:
+        print(f"✗ Error copying to public/model.json: {e}")
+        print(f"  Disk space or permission issue. Check PythonAnywhere disk quota.")
+        # Don't raise here, model is already saved to model/ directory
+        print("  Warning: Model saved to model/ but not copied to public/")
+    except Exception as e:
+        print(f"✗ Error copying to public/model.json: {e}")
+        print("  Warning: Model saved to model/ but not copied to public/")
+    
+    return {name: len(data) for name, data in files.items()}
 
-# ============================================================================
-# PREPROCESSING PIPELINE
-# ============================================================================
 
-def preprocess_text(text, vocab=None, word_freq=None):
-    """Complete preprocessing pipeline"""
-    # 1. Text cleaning
-    cleaned = text_cleaning(text)
-    
-    # 2. Tokenization
-    tokens = cleaned.split()
-    tokens = [t for t in tokens if t]
+def save_model(artifact, export_data, output_dir="model", public_dir="public", **encoding):
+    """Write model.pkl and model.json (also copied to public/) atomically.
     
-    # 3. Spelling correction (if vocab provided)
-    if vocab and word_freq:
-        tokens = spelling_correction(tokens, vocab, word_freq, max_dist=2)
-    
-    # 4. Normalize slang
-    tokens = normalize(tokens)
+    encoding is passed to encode_export (default: compact, lossless).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True)
     
-    # 5. Remove stopwords
-    tokens = remove_stopwords(tokens)
+    # Also create public directory for web access
+    public_dir = Path(public_dir)
+    public_dir.mkdir(parents=True, exist_ok=True)
     
-    # 6. Stemming
-    tokens = stem(tokens)
+    # Save as pickle with error handling
+    print("\nMenyimpan model.pkl...")
+    try:
+        # Ensure directory exists
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Save to temporary file first (atomic write)
+        temp_pkl = output_dir / "model.pkl.tmp"
+        with open(temp_pkl, "wb") as f:
+            # vocab + word_freq as one packed Lexicon (singleton tokens dropped); the
+            # spelling index is left out, load_model rebuilds it from the Lexicon
+            pickle.dump({k: v for k, v in compact_lexicon(artifact).items() if k != 'spelling_index'}, f)
+        
+        # Atomic rename
+        temp_pkl.replace(output_dir / "model.pkl")
+        print("✓ model.pkl saved")
+    except OSError as e:
+        print(f"✗ Error saving model.pkl: {e}")
+        print(f"  Disk space or permission issue. Check PythonAnywhere disk quota.")
+        raise
+    except Exception as e:
+        print(f"✗ Error saving model.pkl: {e}")
+        raise
     
-    # Filter empty tokens
-    tokens = [t for t in tokens if t]
+    start = time.perf_counter()
+    payload = encode_export(export_data, **encoding)
+    t_encode = time.perf_counter() - start
+    start = time.perf_counter()
+    write_export(payload, output_dir, public_dir)
+    t_write = time.perf_counter() - start
+    print(f"  Export: encode {t_encode * 1000:.1f} ms, write + copy {t_write * 1000:.1f} ms")
     
-    return tokens
+    print(f"\nModel saved to {output_dir / 'model.pkl'}")
+    print(f"Model exported to {output_dir / 'model.json'}")
+    print(f"Model copied to {public_dir / 'model.json'} for web access")
 
 
 # ============================================================================
 # TRAIN MODEL
 # ============================================================================
 
-def train_model(csv_path="TABEL DATA LATIH HATESPEECH RISET.csv"):
-    """Train the model from CSV dataset"""
-    print("Loading dataset...")
-    dataset = pd.read_csv(csv_path, sep=";", header=None)
-    dataset.columns = ["usn", "text", "class"]
+MIN_COUNT = 2
+TRAIN_RATIO = 0.8
+SEED = 42
+ALPHA = 2.0
+MAX_FEATURES = 200
+MAP_TARGET = {'Netral': 0, 'Ras': 1, 'Agama': 2}
+REVERSE_TARGET = {0: 'Netral', 1: 'Ras', 2: 'Agama'}
+
+
+def train_model(csv_path="TABEL DATA LATIH HATESPEECH RISET.csv", chunksize=None, workers=1, cache=None):
+    """Train the model from CSV dataset (streamed in chunks if chunksize is set).
     
-    print("Cleaning data...")
-    # Remove NaN values (handle all columns)
-    initial_count = len(dataset)
-    dataset = dataset.dropna(subset=['text', 'class'])
-    dataset = dataset[dataset['text'].notna() & dataset['class'].notna()]
+    cache is the path of a SQLite preprocessing cache (preprocess_cache.py):
+    rows and spelling corrections unchanged since the last run are loaded
+    from it instead of being preprocessed again.
+    """
+    from preprocess_cache import PreprocessCache
     
-    # Remove duplicates
-    dataset = dataset.drop_duplicates(subset=['text', 'class'])
+    with (PreprocessCache(cache) if cache else nullcontext()) as preprocess_cache:
+        if chunksize:
+            return train_model_streaming(csv_path, chunksize=chunksize, workers=workers,
+                                         cache=preprocess_cache)
+        
+        print("Loading dataset...")
+        with instrumentation.phase("load_csv"):
+            dataset = pd.read_csv(csv_path, sep=";", header=None)
+            dataset.columns = ["usn", "text", "class"]
+        
+        artifact, export_data = fit_dataset(dataset, workers=workers, cache=preprocess_cache)
+        with instrumentation.phase("save"):
+            save_model(artifact, export_data)
     
-    # Remove empty text
-    dataset = dataset[dataset['text'].str.strip() != '']
+    return (artifact['model'], artifact['vectorizer'], artifact['vocab'], artifact['word_freq'],
+            artifact['map_target'], artifact['reverse'])
+
+
+def prepare_dataset(dataset, workers=1, cache=None):
+    """Clean, preprocess and split a usn/text/class DataFrame.
     
-    cleaned_count = len(dataset)
-    removed_count = initial_count - cleaned_count
-    print(f"  Removed {removed_count} rows (NaN/duplicates/empty): {initial_count} -> {cleaned_count}")
+    Returns the train/test token lists (also as TokenIdDocs) and encoded
+    labels together with the spelling-correction lexicon built from the
+    corpus; fit_dataset and the hyperparameter sweep (sweep.py) both start
+    from this. With a PreprocessCache only new or affected rows and tokens
+    are preprocessed.
+    """
+    from parallel import PreprocessPool, resolve_workers
     
-    print("Preprocessing text...")
-    # Text cleaning
-    dataset["text"] = dataset["text"].apply(text_cleaning)
+    print("Cleaning data...")
+    with instrumentation.phase("clean_rows"):
+        # Remove NaN values (handle all columns)
+        initial_count = len(dataset)
+        dataset = dataset.dropna(subset=['text', 'class'])
+        dataset = dataset[dataset['text'].notna() & dataset['class'].notna()]
+        
+        # Remove duplicates
+        dataset = dataset.drop_duplicates(subset=['text', 'class'])
+        
+        # Remove empty text
+        dataset = dataset[dataset['text'].str.strip() != '']
+        
+        cleaned_count = len(dataset)
+        removed_count = initial_count - cleaned_count
+        instrumentation.add("train.rows", initial_count)
+        instrumentation.add("train.rows_removed", removed_count)
+    print(f"  Removed {removed_count} rows (NaN/duplicates/empty): {initial_count} -> {cleaned_count}")
     
-    # Tokenization
-    dataset["text"] = dataset["text"].apply(lambda x: x.split())
+    print(f"Preprocessing text ({resolve_workers(workers)} worker(s))...")
+    # Text cleaning + tokenization
+    with instrumentation.phase("text_cleaning"), PreprocessPool(workers) as pool:
+        if cache is None:
+            docs = pool.clean(dataset["text"].tolist())
+        else:
+            keys, docs = cache.clean(dataset["text"].tolist(), pool)
     
     # Build vocabulary for spelling correction
-    word_freq = build_word_freq(dataset["text"])
-    MIN_COUNT = 2
-    vocab = {w for w, c in word_freq.items() if c >= MIN_COUNT}
-    
-    # Spelling correction
-    dataset["text"] = dataset["text"].apply(
-        lambda x: spelling_correction(x, vocab, word_freq, max_dist=2)
-    )
-    
-    # Normalize
-    dataset["text"] = dataset["text"].apply(normalize)
-    
-    # Remove stopwords
-    dataset["text"] = dataset["text"].apply(remove_stopwords)
-    
-    # Stemming
-    dataset["text"] = dataset["text"].apply(stem)
+    with instrumentation.phase("lexicon"):
+        word_freq = build_word_freq(docs)
+        vocab = {w for w, c in word_freq.items() if c >= MIN_COUNT}
+        spelling_index = SpellingIndex(max_dist=2).build(vocab, word_freq)
+    
+    # Spelling correction table (each distinct OOV token is corrected once)
+    with instrumentation.phase("correction_table"), \
+            PreprocessPool(workers, vocab, word_freq, spelling_index) as pool:
+        if cache is None:
+            correction_table = pool.correction_table(word_freq)
+        else:
+            correction_table = cache.correction_table(word_freq, spelling_index, pool)
+        _record_corpus(word_freq, vocab, correction_table)
+    print(f"  Corrected {len(correction_table)} distinct OOV tokens")
+    
+    # Spelling correction, normalize, remove stopwords, stemming
+    with instrumentation.phase("correct_and_normalize"), \
+            PreprocessPool(workers, vocab, word_freq, spelling_index, correction_table) as pool:
+        processed = pool.finish(docs) if cache is None else cache.finish(keys, docs, pool)
+        dataset["text"] = pd.Series(processed, index=dataset.index, dtype=object)
+    if cache is not None:
+        print(f"  Preprocessing cache: {cache.summary()}")
     
     print("Splitting data...")
     # Stratified split
-    def stratified_split(data, target, train_size=0.8, seed=42):
+    def stratified_split(data, target, train_size=TRAIN_RATIO, seed=SEED):
         np.random.seed(seed)
         train, test = [], []
         
@@ -433,7 +420,8 @@ def train_model(csv_path="TABEL DATA LATIH HATESPEECH RISET.csv"):
         
         return pd.concat(train).reset_index(drop=True), pd.concat(test).reset_index(drop=True)
     
-    train, test = stratified_split(dataset, "class")
+    with instrumentation.phase("split"):
+        train, test = stratified_split(dataset, "class")
     
     X_train_text = train["text"].tolist()
     X_test_text = test["text"].tolist()
@@ -441,264 +429,351 @@ def train_model(csv_path="TABEL DATA LATIH HATESPEECH RISET.csv"):
     y_test = test["class"].tolist()
     
     # Encode target
-    map_target = {'Netral': 0, 'Ras': 1, 'Agama': 2}
-    reverse = {0: 'Netral', 1: 'Ras', 2: 'Agama'}
+    map_target = dict(MAP_TARGET)
+    reverse = dict(REVERSE_TARGET)
     
     y_train = pd.Series(y_train).map(map_target).astype(int).to_numpy()
     y_test = pd.Series(y_test).map(map_target).astype(int).to_numpy()
     
+    # Interned token ids, shared by vectorizer fit and both transforms
+    train_ids = TokenIdDocs.encode(X_train_text)
+    test_ids = TokenIdDocs.encode(X_test_text, index=dict(train_ids.index))
+    
+    return {
+        'train_docs': X_train_text,
+        'test_docs': X_test_text,
+        'train_ids': train_ids,
+        'test_ids': test_ids,
+        'y_train': y_train,
+        'y_test': y_test,
+        'vocab': vocab,
+        'word_freq': word_freq,
+        'spelling_index': spelling_index,
+        'correction_table': correction_table,
+        'map_target': map_target,
+        'reverse': reverse,
+        'cleaned_count': cleaned_count
+    }
+
+
+def _record_corpus(word_freq, vocab, correction_table):
+    """Token, OOV and correction counters of the training corpus (when instrumentation is on)"""
+    rec = instrumentation.recorder
+    if rec is None:
+        return
+    rec.add("train.tokens", sum(word_freq.values()))
+    rec.set("train.distinct_tokens", len(word_freq))
+    rec.set("train.vocab_size", len(vocab))
+    rec.add("train.oov_distinct", len(correction_table))
+    rec.add("train.oov_tokens", sum(word_freq[w] for w in correction_table))
+    changed = [w for w, c in correction_table.items() if c != w]
+    rec.add("train.corrected_distinct", len(changed))
+    rec.add("train.corrected_tokens", sum(word_freq[w] for w in changed))
+
+
+def fit_dataset(dataset, workers=1, cache=None):
+    """Train on a usn/text/class DataFrame, return (artifact, export_data) without saving"""
+    prepared = prepare_dataset(dataset, workers=workers, cache=cache)
+    y_train, y_test = prepared['y_train'], prepared['y_test']
+    vocab, word_freq = prepared['vocab'], prepared['word_freq']
+    map_target, reverse = prepared['map_target'], prepared['reverse']
+    
     print("Vectorizing...")
     # TF-IDF Vectorization
-    vectorizer = TFIDFVectorizer(max_features=200)
-    X_train_tfidf = vectorizer.fit_transform(X_train_text)
-    X_test_tfidf = vectorizer.transform(X_test_text)
+    with instrumentation.phase("vectorize"):
+        vectorizer = TFIDFVectorizer(max_features=MAX_FEATURES)
+        X_train_tfidf = vectorizer.fit_transform(prepared['train_ids'])
+        X_test_tfidf = vectorizer.transform(prepared['test_ids'])
     
     print("Training model...")
     # Train model
-    model = MultinomialNB(alpha=2.0)
-    model.fit(X_train_tfidf, y_train)
-    
-    # Evaluate
-    y_pred_train = model.predict(X_train_tfidf)
-    y_pred_test = model.predict(X_test_tfidf)
-    y_proba_train = model.predict_proba(X_train_tfidf)
-    y_proba_test = model.predict_proba(X_test_tfidf)
-    
-    train_acc = np.mean(y_pred_train == y_train)
-    test_acc = np.mean(y_pred_test == y_test)
-    
-    # Calculate metrics (custom functions like notebook)
-    def confusion_matrix(y_true, y_pred, labels=None):
-        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
-        if labels is None:
-            labels = np.unique(np.concatenate([y_true, y_pred]))
-        cm = np.zeros((len(labels), len(labels)), dtype=int)
-        idx = {lab: i for i, lab in enumerate(labels)}
-        for t, p in zip(y_true, y_pred):
-            cm[idx[t], idx[p]] += 1
-        return cm, labels
-    
-    def precision_recall_f1(y_true, y_pred, average="micro"):
-        cm, labels = confusion_matrix(y_true, y_pred)
-        tp = np.diag(cm).astype(float)
-        fp = cm.sum(axis=0) - tp
-        fn = cm.sum(axis=1) - tp
-        with np.errstate(divide="ignore", invalid="ignore"):
-            prec = np.where(tp+fp == 0, 0, tp/(tp+fp))
-            rec = np.where(tp+fn == 0, 0, tp/(tp+fn))
-            f1 = np.where(prec+rec == 0, 0, 2*prec*rec/(prec+rec))
-        if average == "micro":
-            TP, FP, FN = tp.sum(), fp.sum(), fn.sum()
-            p = TP/(TP+FP) if TP+FP > 0 else 0
-            r = TP/(TP+FN) if TP+FN > 0 else 0
-            f = 2*p*r/(p+r) if p+r > 0 else 0
-            return p, r, f
-        return prec.mean(), rec.mean(), f1.mean()
-    
-    def roc_auc_score_ovr(y_true, proba, n_thresholds=200):
-        y_true = np.asarray(y_true)
-        proba = np.asarray(proba, float)
-        labels = np.unique(y_true)
-        aucs = []
-        for k, lab in enumerate(labels):
-            y_bin = (y_true == lab).astype(int)
-            scores = proba[:, k]
-            P = y_bin.sum()
-            N = len(y_bin) - P
-            tpr, fpr = [], []
-            for t in np.linspace(0, 1, n_thresholds):
-                pred = scores >= t
-                TP = np.sum(pred & (y_bin == 1))
-                FP = np.sum(pred & (y_bin == 0))
-                tpr.append(TP/P if P else 0)
-                fpr.append(FP/N if N else 0)
-            order = np.argsort(fpr)
-            aucs.append(np.trapz(np.array(tpr)[order], np.array(fpr)[order]))
-        return float(np.mean(aucs))
-    
-    # Training metrics (micro average)
-    train_prec, train_rec, train_f1 = precision_recall_f1(y_train, y_pred_train, average="micro")
-    train_auc = roc_auc_score_ovr(y_train, y_proba_train)
-    
-    # Testing metrics (micro average)
-    test_prec, test_rec, test_f1 = precision_recall_f1(y_test, y_pred_test, average="micro")
-    test_auc = roc_auc_score_ovr(y_test, y_proba_test)
+    with instrumentation.phase("fit"):
+        model = MultinomialNB(alpha=ALPHA)
+        model.fit(X_train_tfidf, y_train)
     
-    # Cross validation
-    def nb_kfold(X, y, alpha=2.0, n_folds=5, random_state=42):
-        X = np.asarray(X, dtype=np.float64)
-        y = np.asarray(y).ravel()
-        n_samples = X.shape[0]
-        
-        np.random.seed(random_state)
-        indices = np.random.permutation(n_samples)
-        X_shuffled = X[indices]
-        y_shuffled = y[indices]
-        
-        fold_sizes = np.full(n_folds, n_samples // n_folds, dtype=int)
-        fold_sizes[:n_samples % n_folds] += 1
-        fold_indices = np.cumsum(np.concatenate([[0], fold_sizes]))
-        
-        fold_accuracies = np.zeros(n_folds)
-        
-        for fold in range(n_folds):
-            val_start = fold_indices[fold]
-            val_end = fold_indices[fold + 1]
-            
-            val_mask = np.zeros(n_samples, dtype=bool)
-            val_mask[val_start:val_end] = True
-            
-            X_train_cv = X_shuffled[~val_mask]
-            y_train_cv = y_shuffled[~val_mask]
-            X_val_cv = X_shuffled[val_mask]
-            y_val_cv = y_shuffled[val_mask]
-            
-            model_cv = MultinomialNB(alpha=alpha)
-            model_cv.fit(X_train_cv, y_train_cv)
-            y_pred_cv = model_cv.predict(X_val_cv)
-            
-            fold_accuracies[fold] = np.mean(y_val_cv == y_pred_cv)
-        
-        mean_accuracy = fold_accuracies.mean()
-        std_accuracy = fold_accuracies.std()
-        return mean_accuracy, std_accuracy
+    # Evaluate (custom metric functions like notebook)
+    with instrumentation.phase("evaluate"):
+        train_metrics = evaluate(y_train, model.predict(X_train_tfidf), model.predict_proba(X_train_tfidf),
+                                 classes=model.classes_)
+        test_metrics = evaluate(y_test, model.predict(X_test_tfidf), model.predict_proba(X_test_tfidf),
+                                classes=model.classes_)
     
-    cv_mean, cv_std = nb_kfold(X_train_tfidf, y_train, alpha=2.0, n_folds=5)
+    # Cross validation
+    with instrumentation.phase("cross_validate"):
+        cv_mean, cv_std = nb_kfold(X_train_tfidf, y_train, alpha=ALPHA, n_folds=5)
     
-    print(f"\nTraining Accuracy: {train_acc:.4f}")
-    print(f"Testing Accuracy: {test_acc:.4f}")
+    print(f"\nTraining Accuracy: {train_metrics['accuracy']:.4f}")
+    print(f"Testing Accuracy: {test_metrics['accuracy']:.4f}")
     print(f"Cross Validation: {cv_mean:.4f} ± {cv_std:.4f}")
     
-    # Save model
-    output_dir = Path("model")
-    output_dir.mkdir(exist_ok=True)
-    
-    # Also create public directory for web access
-    public_dir = Path("public")
-    public_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Save as pickle with error handling
-    print("\nMenyimpan model.pkl...")
-    try:
-        # Ensure directory exists
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save to temporary file first (atomic write)
-        temp_pkl = output_dir / "model.pkl.tmp"
-        with open(temp_pkl, "wb") as f:
-            pickle.dump({
-                'model': model,
-                'vectorizer': vectorizer,
-                'vocab': vocab,
-                'word_freq': word_freq,
-                'map_target': map_target,
-                'reverse': reverse
-            }, f)
-        
-        # Atomic rename
-        temp_pkl.replace(output_dir / "model.pkl")
-        print("✓ model.pkl saved")
-    except OSError as e:
-        print(f"✗ Error saving model.pkl: {e}")
-        print(f"  Disk space or permission issue. Check PythonAnywhere disk quota.")
-        raise
-    except Exception as e:
-        print(f"✗ Error saving model.pkl: {e}")
-        raise
-    
-    # Export to JSON for JavaScript
-    model_dict = model.to_dict()
-    vectorizer_dict = vectorizer.to_dict()
-    
-    # Use cleaned data count (after removing NaN/duplicates/empty)
-    total_data = cleaned_count
-    
-    # Convert numpy arrays to lists for JSON
-    # Skip word_freq in JSON to speed up saving (it's filtered in API anyway)
-    export_data = {
-        'model': model_dict,
-        'vectorizer': vectorizer_dict,
-        'vocab': list(vocab),
-        # 'word_freq': {k: int(v) for k, v in word_freq.items()},  # Skip to speed up
+    artifact = {
+        'model': model,
+        'vectorizer': vectorizer,
+        'vocab': vocab,
+        'word_freq': word_freq,
+        'spelling_index': prepared['spelling_index'],
+        'correction_table': prepared['correction_table'],
         'map_target': map_target,
         'reverse': reverse,
-        'training_accuracy': float(train_acc),
-        'testing_accuracy': float(test_acc),
-        'train_size': len(y_train),
-        'test_size': len(y_test),
-        'total_data': int(total_data),
-        'train_ratio': 0.8,
-        'test_ratio': 0.2,
-        'alpha': 2.0,
-        'max_features': 200,
-        'training_metrics': {
-            'accuracy': float(train_acc),
-            'precision': float(train_prec),
-            'recall': float(train_rec),
-            'f1': float(train_f1),
-            'auc': float(train_auc)
-        },
-        'testing_metrics': {
-            'accuracy': float(test_acc),
-            'precision': float(test_prec),
-            'recall': float(test_rec),
-            'f1': float(test_f1),
-            'auc': float(test_auc)
-        },
-        'cv_metrics': {
-            'accuracy': float(cv_mean),
-            'std': float(cv_std)
-        }
+        'version': 1,
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S")
     }
+    # Use cleaned data count (after removing NaN/duplicates/empty)
+    export_data = build_export_data(model, vectorizer, vocab, map_target, reverse,
+                                    train_metrics, test_metrics, cv_mean, cv_std,
+                                    len(y_train), len(y_test), prepared['cleaned_count'])
     
-    # Save to model directory (with progress print and error handling)
-    print("\nMenyimpan model.json...")
-    try:
-        # Ensure directory exists
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save to temporary file first (atomic write)
-        temp_json = output_dir / "model.json.tmp"
-        with open(temp_json, "w", encoding="utf-8") as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
-        
-        # Atomic rename
-        temp_json.replace(output_dir / "model.json")
-        print("✓ model.json saved to model/")
-    except OSError as e:
-        print(f"✗ Error saving model.json: {e}")
-        print(f"  Disk space or permission issue. Check PythonAnywhere disk quota.")
-        raise
-    except Exception as e:
-        print(f"✗ Error saving model.json: {e}")
-        raise
-    
-    # Also copy to public directory for web access
-    print("Menyalin ke public/model.json...")
-    try:
-        # Ensure directory exists
-        public_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Save to temporary file first (atomic write)
-        temp_public_json = public_dir / "model.json.tmp"
-        with open(temp_public_json, "w", encoding="utf-8") as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
-        
-        # Atomic rename
-        temp_public_json.replace(public_dir / "model.json")
-        print("✓ model.json copied to public/")
-    except OSError as e:
-        print(f"✗ Error copying to public/model.json: {e}")
-        print(f"  Disk space or permission issue. Check PythonAnywhere disk quota.")
-        # Don't raise here, model is already saved to model/ directory
-        print("  Warning: Model saved to model/ but not copied to public/")
-    except Exception as e:
-        print(f"✗ Error copying to public/model.json: {e}")
-        print("  Warning: Model saved to model/ but not copied to public/")
+    return artifact, export_data
+
+
+# ============================================================================
+# STREAMING TRAINING
+# ============================================================================
+
+def _read_csv_chunks(csv_path, chunksize):
+    """Iterate over the dataset CSV in DataFrame chunks"""
+    return pd.read_csv(csv_path, sep=";", header=None, names=["usn", "text", "class"],
+                       dtype=str, chunksize=chunksize)
+
+
+def _read_lines(path, chunksize):
+    """Yield (start_row, lines) batches from a spill file"""
+    batch = []
+    start = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            batch.append(line.rstrip("\n"))
+            if len(batch) == chunksize:
+                yield start, batch
+                start += len(batch)
+                batch = []
+    if batch:
+        yield start, batch
+
+
+def stratified_positions(labels, train_size=TRAIN_RATIO, seed=SEED):
+    """Position of every row in the train/test lists built by stratified_split.
+    
+    Returns (train_pos, test_pos) with -1 where the row is in the other split.
+    Uses the same per-class pandas shuffle, so it needs only the label array.
+    """
+    labels = np.asarray(labels)
+    train_pos = np.full(len(labels), -1, dtype=np.int64)
+    test_pos = np.full(len(labels), -1, dtype=np.int64)
+    n_train = n_test = 0
+    
+    _, first = np.unique(labels, return_index=True)
+    for cls in labels[np.sort(first)]:
+        rows = np.flatnonzero(labels == cls)
+        order = pd.Series(rows).sample(frac=1, random_state=seed).to_numpy()
+        s = int(len(rows) * train_size)
+        train_pos[order[:s]] = n_train + np.arange(s)
+        test_pos[order[s:]] = n_test + np.arange(len(rows) - s)
+        n_train += s
+        n_test += len(rows) - s
+    
+    return train_pos, test_pos
+
+
+def kfold_assignment(n_samples, n_folds=5, random_state=SEED):
+    """Fold of every sample under nb_kfold's shuffle"""
+    np.random.seed(random_state)
+    indices = np.random.permutation(n_samples)
+    
+    fold_sizes = np.full(n_folds, n_samples // n_folds, dtype=int)
+    fold_sizes[:n_samples % n_folds] += 1
+    fold_indices = np.cumsum(np.concatenate([[0], fold_sizes]))
+    
+    folds = np.empty(n_samples, dtype=np.int64)
+    folds[indices] = np.searchsorted(fold_indices, np.arange(n_samples), side="right") - 1
+    return folds
+
+
+def train_model_streaming(csv_path="TABEL DATA LATIH HATESPEECH RISET.csv", chunksize=10000, workers=1,
+                          cache=None):
+    """Train from the CSV in chunks, same result as train_model.
+    
+    Rows are cleaned once and spilled to temporary files, so memory holds one
+    chunk of text at a time plus per-row labels, split positions and the
+    vocabulary/count tables. Vectorizer and NB statistics are accumulated
+    with partial_fit; 5-fold CV models are derived by subtracting per-fold
+    counts (cross_validation.FoldCounts) from the totals. cache is an open
+    PreprocessCache (the 16-byte key of every row is kept in memory).
+    """
+    from parallel import PreprocessPool, resolve_workers
+    from cross_validation import FoldCounts, fold_log_joint
+    
+    map_target = dict(MAP_TARGET)
+    reverse = dict(REVERSE_TARGET)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cleaned_path = Path(tmp) / "cleaned.txt"
+        tokens_path = Path(tmp) / "tokens.txt"
+        
+        print(f"Streaming dataset in chunks of {chunksize} rows ({resolve_workers(workers)} worker(s))...")
+        print("Cleaning data...")
+        initial_count = 0
+        seen = set()
+        labels = []
+        word_freq = {}
+        row_keys = bytearray()
+        
+        with instrumentation.phase("stream_clean"), open(cleaned_path, "w", encoding="utf-8") as out, \
+                PreprocessPool(workers) as pool:
+            for chunk in _read_csv_chunks(csv_path, chunksize):
+                initial_count += len(chunk)
+                chunk = chunk.dropna(subset=['text', 'class'])
+                
+                texts = []
+                for text, cls in zip(chunk["text"], chunk["class"]):
+                    # Remove duplicates (first occurrence wins) and empty text
+                    key = hashlib.blake2b(f"{cls}\0{text}".encode("utf-8"), digest_size=16).digest()
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if text.strip() == '':
+                        continue
+                    texts.append(text)
+                    labels.append(map_target[cls])
+                
+                if cache is None:
+                    cleaned = pool.clean(texts)
+                else:
+                    keys, cleaned = cache.clean(texts, pool)
+                    row_keys += b"".join(keys)
+                for tokens in cleaned:
+                    for w in tokens:
+                        word_freq[w] = word_freq.get(w, 0) + 1
+                    out.write(" ".join(tokens) + "\n")
+        
+        del seen
+        labels = np.array(labels, dtype=np.int64)
+        cleaned_count = len(labels)
+        removed_count = initial_count - cleaned_count
+        instrumentation.add("train.rows", initial_count)
+        instrumentation.add("train.rows_removed", removed_count)
+        print(f"  Removed {removed_count} rows (NaN/duplicates/empty): {initial_count} -> {cleaned_count}")
+        
+        print("Preprocessing text...")
+        with instrumentation.phase("lexicon"):
+            vocab = {w for w, c in word_freq.items() if c >= MIN_COUNT}
+            spelling_index = SpellingIndex(max_dist=2).build(vocab, word_freq)
+        with instrumentation.phase("correction_table"), \
+                PreprocessPool(workers, vocab, word_freq, spelling_index) as pool:
+            if cache is None:
+                correction_table = pool.correction_table(word_freq)
+            else:
+                correction_table = cache.correction_table(word_freq, spelling_index, pool)
+            _record_corpus(word_freq, vocab, correction_table)
+        print(f"  Corrected {len(correction_table)} distinct OOV tokens")
+        
+        print("Splitting data...")
+        with instrumentation.phase("split"):
+            train_pos, test_pos = stratified_positions(labels)
+            is_train = train_pos >= 0
+            y_train = np.empty(int(is_train.sum()), dtype=np.int64)
+            y_test = np.empty(len(labels) - len(y_train), dtype=np.int64)
+            y_train[train_pos[is_train]] = labels[is_train]
+            y_test[test_pos[~is_train]] = labels[~is_train]
+        
+        print("Vectorizing...")
+        vectorizer = TFIDFVectorizer(max_features=MAX_FEATURES)
+        with instrumentation.phase("correct_normalize_vectorize"), \
+                open(tokens_path, "w", encoding="utf-8") as out, \
+                PreprocessPool(workers, vocab, word_freq, spelling_index, correction_table) as pool:
+            for start, lines in _read_lines(cleaned_path, chunksize):
+                docs = [line.split() for line in lines]
+                if cache is None:
+                    docs = pool.finish(docs)
+                else:
+                    keys = [bytes(row_keys[16 * r:16 * r + 16]) for r in range(start, start + len(docs))]
+                    docs = cache.finish(keys, docs, pool)
+                for tokens in docs:
+                    out.write(" ".join(tokens) + "\n")
+                
+                rows = np.arange(start, start + len(docs))
+                train_rows = rows[is_train[rows]]
+                vectorizer.partial_fit([docs[r - start] for r in train_rows],
+                                       positions=train_pos[train_rows])
+            vectorizer.finalize()
+        if cache is not None:
+            print(f"  Preprocessing cache: {cache.summary()}")
+        
+        print("Training model...")
+        classes = np.unique(y_train)
+        folds = kfold_assignment(len(y_train), n_folds=5)
+        model = MultinomialNB(alpha=ALPHA)
+        fold_counts = FoldCounts(classes, vectorizer.n_features, n_folds=5)
+        
+        with instrumentation.phase("fit"):
+            for start, lines in _read_lines(tokens_path, chunksize):
+                rows = np.arange(start, start + len(lines))
+                train_rows = rows[is_train[rows]]
+                if train_rows.size == 0:
+                    continue
+                X = vectorizer.transform([lines[r - start].split() for r in train_rows], sparse=True)
+                y = labels[train_rows]
+                model.partial_fit(X, y, classes=classes)
+                
+                fold_counts.add(X, y, folds[train_pos[train_rows]])
+        
+        # Evaluate and cross-validate in one more pass over the tokens
+        with instrumentation.phase("evaluate_and_cross_validate"):
+            cv_models = fold_counts.fold_models(ALPHA)
+            n_classes = classes.size
+            pred_train = np.empty(len(y_train), dtype=classes.dtype)
+            pred_test = np.empty(len(y_test), dtype=classes.dtype)
+            proba_train = np.empty((len(y_train), n_classes))
+            proba_test = np.empty((len(y_test), n_classes))
+            fold_correct = np.zeros(5)
+            fold_total = np.zeros(5)
+            
+            for start, lines in _read_lines(tokens_path, chunksize):
+                rows = np.arange(start, start + len(lines))
+                X = vectorizer.transform([line.split() for line in lines], sparse=True)
+                pred = model.predict(X)
+                proba = model.predict_proba(X)
+                
+                train_mask = is_train[rows]
+                pred_train[train_pos[rows[train_mask]]] = pred[train_mask]
+                proba_train[train_pos[rows[train_mask]]] = proba[train_mask]
+                pred_test[test_pos[rows[~train_mask]]] = pred[~train_mask]
+                proba_test[test_pos[rows[~train_mask]]] = proba[~train_mask]
+                
+                train_local = np.flatnonzero(train_mask)
+                if train_local.size:
+                    chunk_folds = folds[train_pos[rows[train_local]]]
+                    cv_log_joint = fold_log_joint(X.take_rows(train_local), chunk_folds, cv_models)
+                    correct = classes[np.argmax(cv_log_joint, axis=1)] == labels[rows[train_local]]
+                    fold_correct += np.bincount(chunk_folds, weights=correct, minlength=5)
+                    fold_total += np.bincount(chunk_folds, minlength=5)
+    
+    train_metrics = evaluate(y_train, pred_train, proba_train, classes=model.classes_)
+    test_metrics = evaluate(y_test, pred_test, proba_test, classes=model.classes_)
+    fold_accuracies = fold_correct / np.maximum(fold_total, 1)
+    cv_mean, cv_std = fold_accuracies.mean(), fold_accuracies.std()
+    
+    print(f"\nTraining Accuracy: {train_metrics['accuracy']:.4f}")
+    print(f"Testing Accuracy: {test_metrics['accuracy']:.4f}")
+    print(f"Cross Validation: {cv_mean:.4f} ± {cv_std:.4f}")
     
-    print(f"\nModel saved to {output_dir / 'model.pkl'}")
-    print(f"Model exported to {output_dir / 'model.json'}")
-    print(f"Model copied to {public_dir / 'model.json'} for web access")
+    artifact = {
+        'model': model,
+        'vectorizer': vectorizer,
+        'vocab': vocab,
+        'word_freq': word_freq,
+        'spelling_index': spelling_index,
+        'correction_table': correction_table,
+        'map_target': map_target,
+        'reverse': reverse,
+        'version': 1,
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    export_data = build_export_data(model, vectorizer, vocab, map_target, reverse,
+                                    train_metrics, test_metrics, cv_mean, cv_std,
+                                    len(y_train), len(y_test), cleaned_count)
+    with instrumentation.phase("save"):
+        save_model(artifact, export_data)
     
     return model, vectorizer, vocab, word_freq, map_target, reverse
 
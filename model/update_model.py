@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Fold newly labeled texts into an existing model without a full retrain
+
+MultinomialNB only keeps per-class feature sums, so moderator feedback can
+be added with partial_fit in time proportional to the batch. The feature
+set and the spelling-correction lexicon stay as trained; with --update-idf
+the stored document frequencies are updated too and the existing feature
+counts are rescaled to the new idf (exact up to float32 rounding, since
+every TF-IDF column is linear in its idf weight).
+    
+    python model/update_model.py feedback.csv
+    python model/update_model.py feedback.csv --update-idf --holdout holdout.csv \\
+        --retrain-csv "TABEL DATA LATIH HATESPEECH RISET.csv"
+"""
+
+import sys
+import copy
+import json
+import time
+import pickle
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path so artifacts pickled by run_training.py resolve
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from train_model import preprocess_text, fit_dataset, save_model
+from predict import load_model, ResultCache
+from artifact import is_artifact
+
+
+def read_labeled_csv(csv_path):
+    """Read a usn;text;class CSV (same format as the training data)"""
+    dataset = pd.read_csv(csv_path, sep=";", header=None, names=["usn", "text", "class"], dtype=str)
+    dataset = dataset.dropna(subset=['text', 'class'])
+    dataset = dataset[dataset['text'].str.strip() != '']
+    return dataset
+
+
+def preprocess_batch(texts, model_data):
+    """Preprocess texts with the artifact's correction lexicon"""
+    corrector = model_data.get('corrector', model_data.get('spelling_index'))
+    return [preprocess_text(t, model_data['vocab'], model_data['word_freq'], index=corrector)
+            for t in texts]
+
+
+def update_model(model_data, texts, labels, update_idf=False):
+    """Return a new model_data with the labeled batch folded in.
+    
+    model_data itself is left untouched, so a serving process can keep
+    using it while the update is written.
+    """
+    map_target = model_data['map_target']
+    unknown = sorted(set(labels) - set(map_target))
+    if unknown:
+        raise ValueError(f"Unknown labels {unknown}, expected one of {list(map_target)}")
+    y = np.array([map_target[label] for label in labels])
+    
+    model = copy.deepcopy(model_data['model'])
+    vectorizer = copy.deepcopy(model_data['vectorizer'])
+    docs = preprocess_batch(texts, model_data)
+    
+    if update_idf:
+        old_idf = vectorizer.idf.astype(np.float64)
+        vectorizer.partial_update(docs)
+        # Existing counts were accumulated with the old weights
+        model.feature_count_ = model.feature_count_ * (vectorizer.idf / old_idf)
+    
+    X = vectorizer.transform(docs, sparse=True)
+    model.partial_fit(X, y)
+    
+    updated = dict(model_data)
+    updated['model'] = model
+    updated['vectorizer'] = vectorizer
+    updated['parent_version'] = model_data.get('version', 1)
+    updated['version'] = updated['parent_version'] + 1
+    updated['created_at'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    updated['update_samples'] = model_data.get('update_samples', 0) + len(texts)
+    if model_data.get('result_cache') is not None:
+        # Results of the previous version must not be served for this one
+        updated['result_cache'] = ResultCache(model_data['result_cache'].maxsize,
+                                              ttl=model_data['result_cache'].ttl)
+    return updated
+
+
+def prediction_divergence(model_a, model_b, texts):
+    """Compare two models on the same texts (labels and probabilities)"""
+    X_a = model_a['vectorizer'].transform(preprocess_batch(texts, model_a), sparse=True)
+    X_b = model_b['vectorizer'].transform(preprocess_batch(texts, model_b), sparse=True)
+    proba_a = model_a['model'].predict_proba(X_a)
+    proba_b = model_b['model'].predict_proba(X_b)
+    pred_a = model_a['model'].classes_[proba_a.argmax(axis=1)]
+    pred_b = model_b['model'].classes_[proba_b.argmax(axis=1)]
+    diff = np.abs(proba_a - proba_b)
+    
+    return {
+        'n_samples': len(texts),
+        'label_agreement': float(np.mean(pred_a == pred_b)) if len(texts) else 1.0,
+        'mean_abs_proba_diff': float(diff.mean()) if len(texts) else 0.0,
+        'max_abs_proba_diff': float(diff.max()) if len(texts) else 0.0
+    }
+
+
+# spelling_index is rebuilt from the Lexicon by load_model
+RUNTIME_KEYS = ('corrector', 'result_cache', 'scorer', 'generation', 'spelling_index')
+
+
+def _artifact(model_data):
+    """Strip runtime-only entries before pickling"""
+    return {k: v for k, v in model_data.items() if k not in RUNTIME_KEYS}
+
+
+def write_versioned(model_data, model_path, public_dir="public"):
+    """Write model.v<N>.pkl, then swap model.pkl (and model.json copies) atomically"""
+    model_path = Path(model_path)
+    artifact = _artifact(model_data)
+    
+    versioned = model_path.with_name(f"{model_path.stem}.v{model_data['version']}{model_path.suffix}")
+    temp = versioned.with_name(versioned.name + ".tmp")
+    with open(temp, "wb") as f:
+        pickle.dump(artifact, f)
+    temp.replace(versioned)
+    print(f"✓ {versioned} saved")
+    
+    json_path = model_path.with_name("model.json")
+    if json_path.exists() and model_path.name == "model.pkl":
+        with open(json_path, encoding="utf-8") as f:
+            export_data = json.load(f)
+        # Keep the encoding the current export was written with
+        encoding = export_data.pop('encoding', None) or {}
+        export_data['model'] = model_data['model'].to_dict()
+        export_data['vectorizer'] = model_data['vectorizer'].to_dict()
+        export_data['version'] = model_data['version']
+        save_model(artifact, export_data, output_dir=model_path.parent, public_dir=public_dir,
+                   precision=encoding.get('precision'), float16=encoding.get('float16', False),
+                   pack=encoding.get('packed', False))
+    else:
+        temp = model_path.with_name(model_path.name + ".tmp")
+        with open(temp, "wb") as f:
+            pickle.dump(artifact, f)
+        temp.replace(model_path)
+        print(f"✓ {model_path} saved")
+    
+    return versioned
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold labeled feedback into an existing model")
+    parser.add_argument("feedback_csv", help="usn;text;class CSV with the new labels")
+    parser.add_argument("--model", default="model/model.pkl")
+    parser.add_argument("--public-dir", default="public")
+    parser.add_argument("--update-idf", action="store_true",
+                        help="also update document frequencies and idf")
+    parser.add_argument("--holdout", help="usn;text;class CSV used to report divergence")
+    parser.add_argument("--retrain-csv", help="original training CSV; with --holdout, compare "
+                                              "against a full retrain on it plus the feedback")
+    parser.add_argument("--dry-run", action="store_true", help="do not write any artifact")
+    args = parser.parse_args()
+    
+    if is_artifact(args.model):
+        parser.error(f"{args.model} is a binary artifact, update the model.pkl it was converted from")
+    
+    model_data = load_model(args.model)
+    feedback = read_labeled_csv(args.feedback_csv)
+    print(f"Updating model v{model_data.get('version', 1)} with {len(feedback)} labeled texts...")
+    
+    start = time.perf_counter()
+    updated = update_model(model_data, feedback['text'].tolist(), feedback['class'].tolist(),
+                           update_idf=args.update_idf)
+    print(f"  Update took {time.perf_counter() - start:.3f}s -> v{updated['version']}")
+    
+    if args.holdout:
+        holdout = read_labeled_csv(args.holdout)['text'].tolist()
+        report = {'previous': prediction_divergence(model_data, updated, holdout)}
+        
+        if args.retrain_csv:
+            print("Retraining from scratch for comparison...")
+            full = pd.read_csv(args.retrain_csv, sep=";", header=None)
+            full.columns = ["usn", "text", "class"]
+            retrained, _ = fit_dataset(pd.concat([full, feedback], ignore_index=True))
+            report['full_retrain'] = prediction_divergence(retrained, updated, holdout)
+        
+        print("\nDivergence on held-out sample:")
+        for name, stats in report.items():
+            print(f"  vs {name}: label agreement {stats['label_agreement']:.4f}, "
+                  f"mean |Δp| {stats['mean_abs_proba_diff']:.4f}, "
+                  f"max |Δp| {stats['max_abs_proba_diff']:.4f} (n={stats['n_samples']})")
+    
+    if not args.dry_run:
+        write_versioned(updated, args.model, public_dir=args.public_dir)
+
+
+if __name__ == "__main__":
+    main()
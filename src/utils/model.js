@@ -16,7 +16,7 @@ export const loadModel = async () => {
     if (!response.ok) {
       throw new Error('Failed to load model');
     }
-    modelData = await response.json();
+    modelData = unpackModel(await response.json());
     modelLoaded = true;
     console.log('Model loaded successfully from /model.json');
     return modelData;
@@ -28,6 +28,52 @@ export const loadModel = async () => {
   }
 };
 
+// Decode one IEEE 754 half-precision value
+function halfToFloat(h) {
+  const sign = h & 0x8000 ? -1 : 1;
+  const exp = (h >> 10) & 0x1f;
+  const frac = h & 0x3ff;
+  if (exp === 0) return sign * Math.pow(2, -14) * (frac / 1024);
+  if (exp === 0x1f) return frac ? NaN : sign * Infinity;
+  return sign * Math.pow(2, exp - 15) * (1 + frac / 1024);
+}
+
+// Packed arrays ({dtype, shape, data: base64 little-endian}) back to nested arrays
+function unpackArray(value) {
+  if (!value || typeof value !== 'object' || Array.isArray(value) || !value.data) {
+    return value;
+  }
+
+  const bytes = Uint8Array.from(atob(value.data), c => c.charCodeAt(0));
+  const view = new DataView(bytes.buffer);
+  const flat = [];
+  if (value.dtype === 'float16') {
+    for (let i = 0; i < bytes.length; i += 2) flat.push(halfToFloat(view.getUint16(i, true)));
+  } else if (value.dtype === 'float32') {
+    for (let i = 0; i < bytes.length; i += 4) flat.push(view.getFloat32(i, true));
+  } else {
+    for (let i = 0; i < bytes.length; i += 8) flat.push(view.getFloat64(i, true));
+  }
+
+  if (value.shape.length < 2) return flat;
+  const cols = value.shape[1];
+  const rows = [];
+  for (let r = 0; r < value.shape[0]; r++) rows.push(flat.slice(r * cols, (r + 1) * cols));
+  return rows;
+}
+
+// Undo the array packing of model/export_model.py --pack
+function unpackModel(data) {
+  if (!data || !data.encoding || !data.encoding.packed) {
+    return data;
+  }
+
+  data.model.class_log_prior = unpackArray(data.model.class_log_prior);
+  data.model.feature_log_prob = unpackArray(data.model.feature_log_prob);
+  data.vectorizer.idf = unpackArray(data.vectorizer.idf);
+  return data;
+}
+
 // TF-IDF Vectorizer in JavaScript
 class TFIDFVectorizerJS {
   constructor(config) {